@@ -0,0 +1,129 @@
+"""
+Benchmark block registry memory and lookup cost.
+
+Registers N copies of the default R1 blocks (under new type names) and
+compares the compact BlockDefinition registry against the previous storage
+of free-form nested dicts.
+
+Usage:
+    python benchmarks/bench_registry.py [--blocks 5000]
+"""
+
+import argparse
+import copy
+import gc
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from creations_builder.blocks.registry import BlockRegistry  # noqa: E402
+
+
+def default_definitions():
+    """Get the default block definitions as (category, type, dict) tuples."""
+    registry = BlockRegistry()
+    return [
+        (category, block_type, definition)
+        for category, blocks in registry.get_all_blocks().items()
+        for block_type, definition in blocks.items()
+    ]
+
+
+def synthetic_definitions(count):
+    """Build ``count`` definitions as fresh dicts, like JSON-loaded block packs."""
+    templates = default_definitions()
+    definitions = []
+    for i in range(count):
+        category, block_type, template = templates[i % len(templates)]
+        definition = copy.deepcopy(template)
+        definition['type'] = f'{block_type}_{i}'
+        definitions.append((category, definition['type'], definition))
+    return definitions
+
+
+class LegacyRegistry:
+    """The previous nested-dict registry storage, for comparison."""
+
+    def __init__(self):
+        self.blocks = {}
+
+    def register_block(self, category, block_type, block_definition):
+        if category not in self.blocks:
+            self.blocks[category] = {}
+        self.blocks[category][block_type] = block_definition
+
+    def get_block(self, category, block_type):
+        return self.blocks.get(category, {}).get(block_type, {})
+
+
+def measure(factory, definitions):
+    """
+    Measure memory retained by a registry after registering definitions.
+
+    Returns the registry and the bytes retained after registration, after a
+    ``get_block`` call for every block and after a ``get_all_blocks`` call
+    whose result is dropped.
+    """
+    gc.collect()
+    tracemalloc.start()
+    registry = factory()
+    for category, block_type, definition in copy.deepcopy(definitions):
+        registry.register_block(category, block_type, definition)
+    gc.collect()
+    retained = [tracemalloc.get_traced_memory()[0]]
+
+    for category, block_type, _ in definitions:
+        registry.get_block(category, block_type)
+    gc.collect()
+    retained.append(tracemalloc.get_traced_memory()[0])
+
+    if hasattr(registry, 'get_all_blocks'):
+        registry.get_all_blocks()
+    gc.collect()
+    retained.append(tracemalloc.get_traced_memory()[0])
+    tracemalloc.stop()
+    return registry, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--blocks', type=int, default=5000, help='Number of blocks to register')
+    parser.add_argument('--lookups', type=int, default=200000, help='Number of lookups to time')
+    args = parser.parse_args()
+
+    definitions = synthetic_definitions(args.blocks)
+    probes = [(category, block_type) for category, block_type, _ in definitions[::97]]
+
+    legacy, legacy_bytes = measure(LegacyRegistry, definitions)
+    compact, compact_bytes = measure(lambda: BlockRegistry(load_defaults=False), definitions)
+
+    print(f'Blocks registered: {args.blocks}')
+    print('Retained bytes/block: after registering, after get_block on every block, '
+          'after get_all_blocks')
+    print(f'{"":24}{"registered":>12}{"get_block":>12}{"get_all":>12}')
+    for label, retained in (('nested dicts', legacy_bytes), ('BlockDefinition', compact_bytes)):
+        print(f'{label:24}' + ''.join(f'{size / args.blocks:>12.0f}' for size in retained))
+    print(f'Memory saved after all accessors: {100 * (1 - compact_bytes[-1] / legacy_bytes[-1]):.0f}%')
+    print()
+
+    def time_lookups(label, lookup, keys=probes):
+        rounds = max(1, args.lookups // len(keys))
+        seconds = timeit.timeit(
+            lambda: [lookup(category, block_type) for category, block_type in keys],
+            number=rounds
+        )
+        print(f'{label:48}{seconds / (rounds * len(keys)) * 1e9:>8.0f} ns/lookup')
+
+    time_lookups('nested dicts get_block', legacy.get_block)
+    time_lookups('BlockRegistry.get_definition', lambda _, block_type: compact.get_definition(block_type))
+    time_lookups('BlockRegistry.get_block (bounded dict cache)', compact.get_block)
+    # Cycling through every block misses the bounded cache on each lookup
+    every_block = [(category, block_type) for category, block_type, _ in definitions]
+    time_lookups('BlockRegistry.get_block (every block)', compact.get_block, every_block)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Check cold-start import time against a budget.
+
+Each scenario runs in a fresh interpreter, so nothing is cached between
+runs. The CLI and command-line builds must not import Flask; the median
+import time of each scenario must stay within its budget. Exits non-zero
+on a regression, so it can run as a CI check.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 7] [--scale 1.0]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# name -> (code to time, budget in ms, modules that must not be imported)
+SCENARIOS = {
+    'cli': ('import creations_builder.cli', 60, ('flask', 'creations_builder.app')),
+    'build': ('import creations_builder.build', 80, ('flask', 'creations_builder.app')),
+    'app': ('from creations_builder.app import create_app; create_app()', 400, ()),
+}
+
+PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"ms": elapsed * 1000, "modules": sorted(sys.modules)}}))
+'''
+
+
+def run_once(code):
+    """Time ``code`` in a fresh interpreter and list the modules it imported."""
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE.format(code=code)],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=7, help='Fresh interpreters per scenario')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='Multiply every budget (for slow CI machines)')
+    args = parser.parse_args()
+
+    failures = []
+    print(f'{"scenario":10}{"median ms":>12}{"budget ms":>12}')
+    for name, (code, budget, forbidden) in SCENARIOS.items():
+        results = [run_once(code) for _ in range(args.runs)]
+        median = statistics.median(result['ms'] for result in results)
+        budget *= args.scale
+        print(f'{name:10}{median:>12.1f}{budget:>12.0f}')
+
+        if median > budget:
+            failures.append(f'{name}: {median:.1f} ms exceeds budget of {budget:.0f} ms')
+        loaded = set(results[0]['modules'])
+        for module in forbidden:
+            if module in loaded:
+                failures.append(f'{name}: imports {module}')
+
+    for failure in failures:
+        print(f'FAIL {failure}')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
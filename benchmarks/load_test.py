@@ -0,0 +1,302 @@
+"""
+Load-test a Creations Builder instance with simulated editor sessions.
+
+Each session does what the editor frontend does: on page load it fetches
+the block manifest and bundle and the template list and categories, then
+it loops until the test ends. Each iteration picks an action by its
+session type's weights, with think time between actions:
+
+- edit: open a template or change the workspace, then refresh the preview
+  through ``/api/export/html`` as ``preview.js`` does
+- export: export as HTML, JSON or XML
+- browse: look at templates
+
+Every session also autosaves every 30 seconds, like ``setupAutoSave``.
+The frontend autosave only writes localStorage, so it is sent to
+``POST /api/workspace/save``, the server-side save path.
+
+Session mixes are given as ``type=weight`` pairs, e.g.
+``--mix editor=70,exporter=20,browser=10``. ``--time-scale`` shrinks think
+times and the autosave interval, to compress a long session into a short
+run. Uses only the standard library. Without ``--url`` a local instance is
+started in-process, with export rate limits disabled because all sessions
+share one client address.
+
+Usage:
+    python benchmarks/load_test.py --sessions 50 --duration 60 [--url http://127.0.0.1:5000]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from creations_builder.blocks.compiler import compile_workspace  # noqa: E402
+
+AUTOSAVE_INTERVAL = 30.0
+
+# Session type -> action weights and think time range in seconds
+SESSION_TYPES = {
+    'editor': {'actions': {'edit': 8, 'export': 1, 'browse': 1}, 'think': (2.0, 8.0)},
+    'exporter': {'actions': {'edit': 3, 'export': 6, 'browse': 1}, 'think': (1.0, 4.0)},
+    'browser': {'actions': {'edit': 1, 'export': 0, 'browse': 9}, 'think': (3.0, 10.0)},
+}
+
+EXPORT_FORMATS = ('html', 'json', 'xml')
+
+
+class Recorder:
+    """Thread-safe per-endpoint latency and status collection."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, seconds, status):
+        with self._lock:
+            self.samples[endpoint].append(seconds)
+            self.statuses[endpoint][status] += 1
+
+    def report(self, elapsed):
+        """Per-endpoint throughput, latency percentiles (ms) and error rates."""
+        rows = {}
+        for endpoint in sorted(self.samples):
+            latencies = sorted(self.samples[endpoint])
+            statuses = self.statuses[endpoint]
+            count = len(latencies)
+            errors = sum(n for status, n in statuses.items() if not 200 <= status < 400)
+            rows[endpoint] = {
+                'requests': count,
+                'throughput': count / elapsed,
+                'p50': percentile(latencies, 50) * 1000,
+                'p90': percentile(latencies, 90) * 1000,
+                'p99': percentile(latencies, 99) * 1000,
+                'max': latencies[-1] * 1000,
+                'mean': statistics.fmean(latencies) * 1000,
+                'error_rate': errors / count,
+                'statuses': dict(sorted(statuses.items())),
+            }
+        return rows
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+class Session:
+    """One simulated editor tab."""
+
+    def __init__(self, base_url, session_type, recorder, deadline, time_scale, seed):
+        self.base_url = base_url.rstrip('/')
+        self.config = SESSION_TYPES[session_type]
+        self.recorder = recorder
+        self.deadline = deadline
+        self.time_scale = time_scale
+        self.random = random.Random(seed)
+        self.template_ids = []
+        self.name = f'Load Test {seed}'
+        self.workspace_xml = '<xml xmlns="https://developers.google.com/blockly/xml"></xml>'
+        self.generated_code = ''
+        self.next_autosave = time.monotonic() + AUTOSAVE_INTERVAL * time_scale
+
+    def request(self, endpoint, path, payload=None, headers=None):
+        """Send a request, recording its latency under ``endpoint``."""
+        data = json.dumps(payload).encode('utf-8') if payload is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers or {})
+        if data is not None:
+            request.add_header('Content-Type', 'application/json')
+
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                body = response.read()
+                status = response.status
+        except urllib.error.HTTPError as error:
+            error.read()
+            body, status = None, error.code
+        except (urllib.error.URLError, OSError):
+            body, status = None, 0
+        self.recorder.record(endpoint, time.perf_counter() - started, status)
+
+        if body is None or status != 200:
+            return None
+        try:
+            return json.loads(body)
+        except ValueError:
+            return None
+
+    def run(self):
+        self.load_page()
+        while True:
+            think = self.random.uniform(*self.config['think']) * self.time_scale
+            wake = time.monotonic() + think
+            # Autosaves fire on their own timer, including during think time
+            while self.next_autosave <= min(wake, self.deadline):
+                self.sleep_until(self.next_autosave)
+                self.autosave()
+            if wake >= self.deadline:
+                return
+            self.sleep_until(wake)
+
+            action = self.random.choices(
+                list(self.config['actions']), weights=list(self.config['actions'].values())
+            )[0]
+            getattr(self, action)()
+
+    @staticmethod
+    def sleep_until(moment):
+        delay = moment - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def load_page(self):
+        manifest = self.request('GET /api/blocks', '/api/blocks')
+        if manifest and manifest.get('bundle'):
+            # Script tag load; browsers revalidate immutable bundles rarely
+            self.request('GET /api/blocks/bundle', manifest['bundle']['url'])
+        templates = self.request('GET /api/templates/list', '/api/templates/list')
+        if templates:
+            self.template_ids = [template['id'] for template in templates.get('templates', [])]
+        self.request('GET /api/templates/categories', '/api/templates/categories')
+
+    def open_template(self):
+        if not self.template_ids:
+            return
+        template_id = self.random.choice(self.template_ids)
+        result = self.request('GET /api/templates/<id>', f'/api/templates/{template_id}')
+        if result and result.get('template'):
+            self.workspace_xml = result['template']['workspace_xml']
+            self.generated_code = compile_workspace(self.workspace_xml)
+
+    def edit(self):
+        if self.random.random() < 0.3 or not self.generated_code:
+            self.open_template()
+        else:
+            # A field edit: same workspace size, new content
+            self.generated_code += f'\n// edit {self.random.random()}\n'
+        self.request('POST /api/export/html (preview)', '/api/export/html', self.export_data())
+
+    def export(self):
+        fmt = self.random.choice(EXPORT_FORMATS)
+        self.request(f'POST /api/export/{fmt}', f'/api/export/{fmt}', self.export_data())
+
+    def browse(self):
+        self.request('GET /api/templates/list', '/api/templates/list')
+        self.open_template()
+
+    def autosave(self):
+        self.next_autosave += AUTOSAVE_INTERVAL * self.time_scale
+        self.request('POST /api/workspace/save', '/api/workspace/save', {
+            'name': self.name,
+            'workspace_xml': self.workspace_xml,
+        })
+
+    def export_data(self):
+        return {
+            'name': self.name,
+            'workspace_xml': self.workspace_xml,
+            'generated_code': self.generated_code,
+        }
+
+
+def parse_mix(text):
+    """Parse ``type=weight,...`` into a dict, validating session types."""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in SESSION_TYPES:
+            raise argparse.ArgumentTypeError(
+                f"unknown session type {name!r} (choose from {', '.join(SESSION_TYPES)})"
+            )
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def start_local_server():
+    """Start the app in-process on a free port and return its base URL."""
+    import logging
+    from werkzeug.serving import make_server
+    from creations_builder.app import create_app
+
+    # Per-request access logs would drown the report
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    os.environ.setdefault('EXPORT_RATE_LIMIT', '0')
+    app = create_app()
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help='Base URL of a running instance (default: start one in-process)')
+    parser.add_argument('--sessions', type=int, default=20, help='Concurrent editor sessions')
+    parser.add_argument('--duration', type=float, default=60, help='Test length in seconds')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('editor=70,exporter=20,browser=10'),
+                        help='Session mix as type=weight pairs')
+    parser.add_argument('--time-scale', type=float, default=1.0,
+                        help='Multiply think times and the autosave interval')
+    parser.add_argument('--ramp-up', type=float, default=5, help='Seconds over which sessions start')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args()
+
+    base_url = args.url or start_local_server()
+    picker = random.Random(args.seed)
+    types = picker.choices(list(args.mix), weights=list(args.mix.values()), k=args.sessions)
+
+    recorder = Recorder()
+    started = time.monotonic()
+    deadline = started + args.ramp_up + args.duration
+    threads = []
+    for index, session_type in enumerate(types):
+        session = Session(base_url, session_type, recorder, deadline, args.time_scale, args.seed * 100003 + index)
+        delay = args.ramp_up * index / max(1, args.sessions)
+        thread = threading.Timer(delay, session.run)
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    report = recorder.report(elapsed)
+    if args.json:
+        print(json.dumps({
+            'url': base_url,
+            'sessions': dict(sorted((t, types.count(t)) for t in set(types))),
+            'elapsed': elapsed,
+            'endpoints': report,
+        }, indent=2))
+        return
+
+    print(f'{args.sessions} sessions ({", ".join(f"{t}={types.count(t)}" for t in sorted(set(types)))}) '
+          f'against {base_url} for {elapsed:.1f}s\n')
+    print(f'{"endpoint":34}{"reqs":>7}{"req/s":>8}{"p50":>8}{"p90":>8}{"p99":>8}{"max":>8}{"err%":>7}')
+    for endpoint, row in report.items():
+        print(f'{endpoint:34}{row["requests"]:>7}{row["throughput"]:>8.1f}'
+              f'{row["p50"]:>8.1f}{row["p90"]:>8.1f}{row["p99"]:>8.1f}{row["max"]:>8.1f}'
+              f'{row["error_rate"] * 100:>7.1f}')
+    print('\nLatencies in ms; errors are non-2xx/3xx responses and connection failures.')
+    total = sum(row['requests'] for row in report.values())
+    print(f'Total: {total} requests, {total / elapsed:.1f} req/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Admission control for expensive endpoints.
+
+Request bodies over ``MAX_CONTENT_LENGTH`` are refused before they are read.
+Protected requests (by default ``POST`` requests to the protected blueprints
+and endpoints) must take a token from their client's bucket and a slot from
+a per-worker concurrency limit. Requests that cannot are rejected at
+once (429 when rate limited, 503 when the worker is busy) with a
+``Retry-After`` header, so load beyond capacity is shed instead of queued.
+State is in-process, so limits apply per worker process.
+"""
+
+import math
+import time
+from collections import OrderedDict
+from threading import BoundedSemaphore, Lock
+from typing import Dict, Iterable, Optional, Tuple
+
+from flask import Flask, abort, g, jsonify, request
+
+
+class TokenBucketStore:
+    """Per-client token buckets, kept in memory with a bounded client count."""
+
+    def __init__(self, rate: float, burst: float, max_clients: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: 'OrderedDict[str, Tuple[float, float]]' = OrderedDict()
+        self._lock = Lock()
+
+    def take(self, client: str, now: Optional[float] = None) -> float:
+        """
+        Take a token for ``client``.
+
+        Returns 0 when a token was taken, otherwise the number of seconds
+        until one is available.
+        """
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / self.rate if self.rate > 0 else float('inf')
+            self._buckets[client] = (tokens, now)
+            # Least recently seen clients are dropped first; a dropped client
+            # simply starts again with a full bucket
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class AdmissionController:
+    """Rate limit and cap concurrency for requests to the protected blueprints."""
+
+    def __init__(self, blueprints: Iterable[str] = ('export',), endpoints: Iterable[str] = (),
+                 methods: Iterable[str] = ('POST',),
+                 max_concurrent: int = 4, rate: float = 2.0, burst: float = 10,
+                 busy_retry_after: int = 1):
+        self.blueprints = frozenset(blueprints)
+        self.endpoints = frozenset(endpoints)
+        # Long-lived GETs such as preview streams must not hold a slot
+        self.methods = frozenset(methods)
+        self.max_concurrent = max_concurrent
+        self.buckets = TokenBucketStore(rate, burst) if rate > 0 else None
+        self.busy_retry_after = busy_retry_after
+        self._slots = BoundedSemaphore(max_concurrent) if max_concurrent > 0 else None
+        self._active = 0
+        self._counter_lock = Lock()
+        self.rejected = {'rate_limited': 0, 'busy': 0}
+
+    def init_app(self, app: Flask):
+        """Install the admission checks on ``app``."""
+        app.before_request(self.admit)
+        app.teardown_request(self.release)
+
+    def protects(self) -> bool:
+        """Whether the current request is subject to rate and concurrency limits."""
+        if request.method not in self.methods:
+            return False
+        return request.blueprint in self.blueprints or request.endpoint in self.endpoints
+
+    @staticmethod
+    def client_key() -> str:
+        """Identify the client a request is charged to."""
+        return request.remote_addr or 'unknown'
+
+    def admit(self):
+        """Reject the request if it is too large, its client is over its rate or the worker is full."""
+        # Flask only enforces MAX_CONTENT_LENGTH once the body is read; a
+        # declared length is checked up front, before any work is done
+        limit = request.max_content_length
+        if limit is not None and request.content_length is not None and request.content_length > limit:
+            abort(413)
+
+        if not self.protects():
+            return None
+
+        if self.buckets is not None:
+            wait = self.buckets.take(self.client_key())
+            if wait:
+                self._count('rate_limited')
+                return self._reject(429, 'Too many requests', wait)
+
+        if self._slots is not None:
+            if not self._slots.acquire(blocking=False):
+                self._count('busy')
+                return self._reject(503, 'Server busy, try again shortly', self.busy_retry_after)
+            g.admission_slot = True
+            with self._counter_lock:
+                self._active += 1
+        return None
+
+    def release(self, error=None):
+        """Return the request's concurrency slot, if it holds one."""
+        if g.pop('admission_slot', False):
+            with self._counter_lock:
+                self._active -= 1
+            self._slots.release()
+
+    def _count(self, reason: str):
+        with self._counter_lock:
+            self.rejected[reason] += 1
+
+    @staticmethod
+    def _reject(status: int, message: str, retry_after: float):
+        response = jsonify({'success': False, 'error': message})
+        response.status_code = status
+        response.headers['Retry-After'] = str(max(1, math.ceil(min(retry_after, 3600))))
+        return response
+
+    def stats(self) -> Dict[str, int]:
+        """Current load and rejection counts."""
+        return {
+            'active': self._active,
+            'max_concurrent': self.max_concurrent,
+            'clients': len(self.buckets) if self.buckets is not None else 0,
+            'rate_limited': self.rejected['rate_limited'],
+            'busy': self.rejected['busy'],
+        }
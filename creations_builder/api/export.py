@@ -2,10 +2,17 @@
 Export API endpoints for generating R1 creation files.
 """
 
-import json
 import os
-from flask import Blueprint, request, jsonify, render_template_string, current_app
-from datetime import datetime
+from flask import Blueprint, request, jsonify, render_template_string, current_app, has_app_context
+from ..blocks.analysis import (
+    DEFAULT_BUDGETS, BudgetError, WorkspaceAnalyzer, check_budgets, validate_budgets,
+)
+from ..blocks.workspace import WorkspaceParseError, parse_workspace
+from .. import exports
+from ..exports import (
+    DEFAULT_TEMPLATE_FOLDER, export_filename, get_default_r1_template,
+    render_creation_json, render_creation_xml,
+)
 
 export_bp = Blueprint('export', __name__)
 
@@ -18,26 +25,21 @@ def export_html():
     workspace_name = data.get('name', 'Untitled Creation')
     generated_code = data.get('generated_code', '')
     
-    # Load the R1 creation HTML template
-    template_path = os.path.join(current_app.template_folder, 'exports', 'r1_creation_template.html')
-    
-    try:
-        with open(template_path, 'r', encoding='utf-8') as f:
-            template_content = f.read()
-    except FileNotFoundError:
-        # Fallback to inline template
-        template_content = get_default_r1_template()
-    
-    # Replace placeholders in template
-    html_content = template_content.replace('{{CREATION_NAME}}', workspace_name)
-    html_content = html_content.replace('{{GENERATED_CODE}}', generated_code)
-    html_content = html_content.replace('{{CREATION_DATE}}', datetime.now().isoformat())
-    
-    return jsonify({
+    html_content = render_creation_html(workspace_name, generated_code)
+    payload = {
         'success': True,
         'html_content': html_content,
-        'filename': f"{workspace_name.replace(' ', '_').lower()}.html"
-    })
+        'filename': export_filename(workspace_name, 'html')
+    }
+    
+    if data.get('optimize_assets', current_app.config.get('EXPORT_OPTIMIZE_ASSETS')):
+        # The editor saves html_content on its own, so every image is inlined;
+        # export jobs ship larger images as separate files instead
+        html_content, _, report = current_app.asset_pipeline.process_html(html_content, inline_all=True)
+        payload['html_content'] = html_content
+        payload['asset_report'] = report
+    
+    return export_response(data, payload, html_content)
 
 
 @export_bp.route('/json', methods=['POST'])
@@ -48,23 +50,13 @@ def export_json():
     workspace_name = data.get('name', 'Untitled Creation')
     generated_code = data.get('generated_code', '')
     
-    export_data = {
-        'name': workspace_name,
-        'version': '1.0.0',
-        'created_at': datetime.now().isoformat(),
-        'workspace_xml': workspace_xml,
-        'generated_code': generated_code,
-        'metadata': {
-            'creator': 'Creations Builder',
-            'format_version': '1.0'
-        }
-    }
+    json_content = render_creation_json(workspace_name, workspace_xml, generated_code)
     
-    return jsonify({
+    return export_response(data, {
         'success': True,
-        'json_content': json.dumps(export_data, indent=2),
-        'filename': f"{workspace_name.replace(' ', '_').lower()}.json"
-    })
+        'json_content': json_content,
+        'filename': export_filename(workspace_name, 'json')
+    }, json_content)
 
 
 @export_bp.route('/xml', methods=['POST'])
@@ -74,158 +66,95 @@ def export_xml():
     workspace_xml = data.get('workspace_xml', '')
     workspace_name = data.get('name', 'Untitled Creation')
     
-    # Wrap the workspace XML with metadata
-    full_xml = f'''<?xml version="1.0" encoding="UTF-8"?>
-<r1_creation name="{workspace_name}" version="1.0" created_at="{datetime.now().isoformat()}">
-    <metadata>
-        <creator>Creations Builder</creator>
-        <format_version>1.0</format_version>
-    </metadata>
-    <workspace>
-        {workspace_xml}
-    </workspace>
-</r1_creation>'''
+    xml_content = render_creation_xml(workspace_name, workspace_xml)
+    
+    return export_response(data, {
+        'success': True,
+        'xml_content': xml_content,
+        'filename': export_filename(workspace_name, 'xml')
+    }, xml_content)
+
+
+@export_bp.route('/analyze', methods=['POST'])
+def analyze_export():
+    """Estimate a creation's runtime costs and check them against the budgets."""
+    data = request.json
+    workspace_xml = data.get('workspace_xml', '')
+    workspace_name = data.get('name', 'Untitled Creation')
+    
+    try:
+        generated_code = data.get('generated_code') or current_app.stack_compiler.compile(workspace_xml)['code']
+        html_content = render_creation_html(workspace_name, generated_code)
+        analysis = analyze_creation(workspace_xml, len(html_content.encode('utf-8')), data.get('budgets'))
+    except (WorkspaceParseError, BudgetError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     
     return jsonify({
         'success': True,
-        'xml_content': full_xml,
-        'filename': f"{workspace_name.replace(' ', '_').lower()}.xml"
+        'within_budget': not analysis['violations'],
+        'analysis': analysis
     })
 
 
-def get_default_r1_template():
-    """Get the default R1 creation HTML template."""
-    return '''<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=240, height=282, initial-scale=1.0">
-    <title>{{CREATION_NAME}}</title>
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-        
-        body {
-            width: 240px;
-            height: 282px;
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Arial, sans-serif;
-            font-size: 12px;
-            background: #0a0a0a;
-            color: #fff;
-            overflow: hidden;
-            position: relative;
-        }
-        
-        #app {
-            width: 100%;
-            height: 100%;
-            border: 5px solid #00ff00;
-            display: flex;
-            flex-direction: column;
-            position: relative;
-            transition: border-color 0.3s ease;
-        }
-        
-        header {
-            background: #1a1a1a;
-            padding: 8px;
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            height: 40px;
-            border-bottom: 1px solid #333;
-        }
-        
-        header h1 {
-            font-size: 16px;
-            font-weight: bold;
-        }
-        
-        main {
-            flex: 1;
-            overflow-y: auto;
-            padding: 10px;
-            background: #0a0a0a;
-        }
-        
-        .status {
-            text-align: center;
-            padding: 20px;
-            color: #888;
-        }
-        
-        .active {
-            color: #00ff00;
-        }
-    </style>
-</head>
-<body>
-    <div id="app">
-        <header>
-            <h1>{{CREATION_NAME}}</h1>
-        </header>
-        <main>
-            <div class="status" id="status">R1 Creation Active</div>
-        </main>
-    </div>
-
-    <script>
-        // Generated R1 Creation Code
-        // Created: {{CREATION_DATE}}
-        
-        console.log('R1 Creation: {{CREATION_NAME}} starting...');
-        
-        // Initialize creation
-        document.addEventListener('DOMContentLoaded', function() {
-            console.log('R1 Creation loaded');
-            document.getElementById('status').classList.add('active');
-            
-            // Check if running as R1 plugin
-            if (typeof PluginMessageHandler !== 'undefined') {
-                console.log('Running as R1 Creation');
-            } else {
-                console.log('Running in browser mode');
-            }
-            
-            // Initialize generated code
-            initializeCreation();
-        });
-        
-        // Plugin message handler
-        window.onPluginMessage = function(data) {
-            console.log('Received plugin message:', data);
-            // Handle incoming messages here
-        };
-        
-        // Main creation logic
-        async function initializeCreation() {
-            try {
-                // Generated code will be inserted here
-                {{GENERATED_CODE}}
-                
-                console.log('R1 Creation initialized successfully');
-            } catch (error) {
-                console.error('Error initializing R1 Creation:', error);
-            }
-        }
-        
-        // Utility functions
-        function updateAppBorderColor(hexColor) {
-            const app = document.getElementById('app');
-            if (app) {
-                app.style.borderColor = hexColor;
-            }
-        }
-        
-        function showStatus(message) {
-            const status = document.getElementById('status');
-            if (status) {
-                status.textContent = message;
-            }
-        }
-    </script>
-</body>
-</html>'''
+def analyze_creation(workspace_xml, output_bytes, budgets=None):
+    """
+    Analyze a workspace's runtime costs.
+    
+    ``budgets`` overrides individual entries of the app's ``CREATION_BUDGETS``;
+    raises ``BudgetError`` if it is malformed. The report lists the budgets
+    used and any that were exceeded.
+    """
+    limits = dict(current_app.config.get('CREATION_BUDGETS', DEFAULT_BUDGETS))
+    limits.update(validate_budgets(budgets))
+    
+    analyzer = WorkspaceAnalyzer(current_app.block_registry, current_app.stack_compiler)
+    analysis = analyzer.analyze(parse_workspace(workspace_xml), output_bytes)
+    analysis['budgets'] = limits
+    analysis['violations'] = check_budgets(analysis, limits)
+    return analysis
+
+
+def export_response(data, payload, content):
+    """
+    Build an export response, analyzing it first when the request sets ``analyze``.
+    
+    Exports that exceed a budget fail with 422 and the analysis.
+    """
+    if not data.get('analyze'):
+        return jsonify(payload)
+    
+    try:
+        analysis = analyze_creation(
+            data.get('workspace_xml', ''), len(content.encode('utf-8')), data.get('budgets')
+        )
+    except (WorkspaceParseError, BudgetError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    if analysis['violations']:
+        return jsonify({
+            'success': False,
+            'error': 'Creation exceeds its performance budget',
+            'analysis': analysis
+        }), 422
+    
+    payload['analysis'] = analysis
+    return jsonify(payload)
+
+
+def get_template_folder():
+    """Get the absolute template folder of the current app, or the default one."""
+    if has_app_context():
+        return os.path.join(current_app.root_path, current_app.template_folder)
+    return DEFAULT_TEMPLATE_FOLDER
+
+
+def load_creation_template(template_folder=None):
+    """Load the R1 creation template from the app's template folder."""
+    return exports.load_creation_template(template_folder or get_template_folder())
+
+
+def render_creation_html(workspace_name, generated_code, created_at=None, template_content=None):
+    """Render a creation's HTML from the app's R1 creation template."""
+    if template_content is None:
+        template_content = load_creation_template()
+    return exports.render_creation_html(workspace_name, generated_code, created_at, template_content)
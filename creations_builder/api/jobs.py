@@ -0,0 +1,202 @@
+"""
+Export job API: batch exports and packaging run in the background.
+
+``POST /api/export/jobs`` queues an export of one or more creations and
+returns a job id at once. The job renders each creation in each requested
+format, like the synchronous export endpoints, and stores the files (or a
+single zip when ``package`` is set) as artifacts that can be streamed once
+the job has produced them.
+"""
+
+import io
+import os
+import zipfile
+from typing import Any, Dict
+
+from flask import Blueprint, Response, current_app, jsonify, request, url_for
+
+from ..assets import IMAGE_TYPES
+from ..blocks.workspace import WorkspaceParseError
+from ..exports import export_filename, render_creation_json, render_creation_xml
+from ..jobs import JobContext, QueueFull
+from .export import render_creation_html
+
+jobs_bp = Blueprint('export_jobs', __name__)
+
+EXPORT_JOB = 'export'
+EXPORT_FORMATS = ('html', 'json', 'xml')
+PACKAGE_NAME = 'creations.zip'
+
+MIMETYPES = {
+    'html': 'text/html; charset=utf-8',
+    'json': 'application/json',
+    'xml': 'application/xml',
+}
+
+
+def validate_export_params(data: Any) -> Dict[str, Any]:
+    """Check an export job request and normalize it to job parameters."""
+    if not isinstance(data, dict):
+        raise ValueError('Expected a JSON object')
+
+    creations = data.get('creations')
+    if not isinstance(creations, list) or not creations:
+        raise ValueError('"creations" must be a non-empty list')
+    for index, creation in enumerate(creations):
+        if not isinstance(creation, dict):
+            raise ValueError(f'creations[{index}] must be an object')
+
+    formats = data.get('formats') or ['html']
+    if not isinstance(formats, list) or any(fmt not in EXPORT_FORMATS for fmt in formats):
+        raise ValueError(f"\"formats\" must be a list of {', '.join(EXPORT_FORMATS)}")
+
+    return {
+        'creations': [{
+            'name': creation.get('name') or 'Untitled Creation',
+            'workspace_xml': creation.get('workspace_xml', ''),
+            'generated_code': creation.get('generated_code'),
+        } for creation in creations],
+        'formats': list(dict.fromkeys(formats)),
+        'optimize_assets': bool(data.get('optimize_assets')),
+        'package': bool(data.get('package')),
+    }
+
+
+def run_export_job(app: Any, job: JobContext):
+    """Render every creation of an export job and store the results."""
+    params = job.params
+    creations = params['creations']
+    formats = params['formats']
+    total = len(creations) * len(formats)
+
+    with app.app_context():
+        files: Dict[str, bytes] = {}
+        done = 0
+        job.progress(done, total, 'Starting')
+        for creation in creations:
+            name = creation['name']
+            code = creation['generated_code']
+            if code is None:
+                try:
+                    code = app.stack_compiler.compile(creation['workspace_xml'])['code']
+                except WorkspaceParseError as error:
+                    raise ValueError(f'{name}: {error}') from error
+
+            for fmt in formats:
+                if fmt == 'html':
+                    content = render_creation_html(name, code)
+                    if params['optimize_assets']:
+                        content, assets, _ = app.asset_pipeline.process_html(content)
+                        # Content-addressed, so creations share them
+                        files.update(assets)
+                elif fmt == 'json':
+                    content = render_creation_json(name, creation['workspace_xml'], code)
+                else:
+                    content = render_creation_xml(name, creation['workspace_xml'])
+
+                filename = unique_name(export_filename(name, fmt), files)
+                files[filename] = content.encode('utf-8')
+                if not params['package']:
+                    job.add_artifact(filename, files[filename], MIMETYPES[fmt])
+                done += 1
+                job.progress(done, total, f'Exported {filename}')
+
+        if params['package']:
+            job.progress(done, total, 'Packaging')
+            job.add_artifact(PACKAGE_NAME, package_files(files), 'application/zip')
+        else:
+            for path, data in files.items():
+                if path.startswith('assets/'):
+                    mimetype = IMAGE_TYPES.get(os.path.splitext(path)[1], 'application/octet-stream')
+                    job.add_artifact(path, data, mimetype)
+
+
+def unique_name(filename: str, taken: Dict[str, bytes]) -> str:
+    """Suffix ``filename`` so it does not replace an earlier output."""
+    if filename not in taken:
+        return filename
+    stem, dot, extension = filename.rpartition('.')
+    index = 2
+    while f'{stem}-{index}{dot}{extension}' in taken:
+        index += 1
+    return f'{stem}-{index}{dot}{extension}'
+
+
+def package_files(files: Dict[str, bytes]) -> bytes:
+    """Zip exported files."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for path in sorted(files):
+            archive.writestr(path, files[path])
+    return buffer.getvalue()
+
+
+def job_response(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Add artifact download URLs to a job's state."""
+    for artifact in job['artifacts']:
+        artifact['url'] = url_for('export_jobs.download_artifact', job_id=job['id'], name=artifact['name'])
+    return job
+
+
+@jobs_bp.route('', methods=['POST'])
+def create_job():
+    """Queue a batch export and return its job id."""
+    try:
+        params = validate_export_params(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    try:
+        job_id = current_app.export_jobs.submit(EXPORT_JOB, params)
+    except QueueFull:
+        response = jsonify({'success': False, 'error': 'Export queue is full, try again later'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '5'
+        return response
+
+    response = jsonify({'success': True, 'job': job_response(current_app.export_jobs.store.get(job_id))})
+    response.status_code = 202
+    response.headers['Location'] = url_for('export_jobs.get_job', job_id=job_id)
+    return response
+
+
+@jobs_bp.route('/<job_id>')
+def get_job(job_id):
+    """Get a job's status, progress and artifacts."""
+    job = current_app.export_jobs.store.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job_response(job)})
+
+
+@jobs_bp.route('/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a queued job, or ask a running one to stop."""
+    store = current_app.export_jobs.store
+    if store.cancel(job_id) is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job_response(store.get(job_id))})
+
+
+@jobs_bp.route('/<job_id>/artifacts/<path:name>')
+def download_artifact(job_id, name):
+    """Stream a job artifact."""
+    store = current_app.export_jobs.store
+    artifact = store.artifact(job_id, name)
+    if artifact is None:
+        return jsonify({'success': False, 'error': 'Artifact not found'}), 404
+
+    etag = artifact['sha256']
+    if etag in request.if_none_match:
+        return Response(status=304, headers={'ETag': f'"{etag}"'})
+
+    filename = name.rsplit('/', 1)[-1]
+    return Response(
+        store.read_artifact(job_id, name),
+        mimetype=artifact['mimetype'],
+        headers={
+            'Content-Length': str(artifact['size']),
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'ETag': f'"{etag}"',
+        }
+    )
@@ -0,0 +1,268 @@
+"""
+Live preview API streaming rendered creations over server-sent events.
+
+The editor opens one long-lived event stream per preview session and pushes
+small updates (name and generated code) to it. The server renders the
+creation and sends the full HTML once, then only a patch describing the
+changed span of the page, which for a code edit is the script section.
+"""
+
+import json
+import time
+import uuid
+from datetime import datetime
+from threading import Condition, Lock
+from typing import Any, Dict, Optional, Tuple
+
+from flask import Blueprint, Response, current_app, jsonify, request
+
+from .export import render_creation_html
+
+preview_bp = Blueprint('preview', __name__)
+
+# Seconds between keepalive comments on an idle stream
+KEEPALIVE_INTERVAL = 15
+
+# Sessions without updates or connected streams for this long are dropped
+SESSION_IDLE_TIMEOUT = 600
+
+MAX_SESSIONS = 64
+
+# Sessions one client may hold open, so a single client cannot fill the hub
+MAX_SESSIONS_PER_CLIENT = 4
+
+
+def utf16_length(text: str) -> int:
+    """Length of ``text`` in UTF-16 code units, as JavaScript counts it."""
+    return len(text.encode('utf-16-le')) // 2
+
+
+def diff_text(old: str, new: str) -> Tuple[int, int, str]:
+    """
+    Get the minimal single-span edit turning ``old`` into ``new``.
+
+    Returns ``(start, end, text)``: replace ``old[start:end]`` with ``text``,
+    with ``start`` and ``end`` in UTF-16 code units so the editor can apply
+    the patch with ``String.slice``.
+    """
+    limit = min(len(old), len(new))
+    start = 0
+    while start < limit and old[start] == new[start]:
+        start += 1
+
+    old_end = len(old)
+    new_end = len(new)
+    while old_end > start and new_end > start and old[old_end - 1] == new[new_end - 1]:
+        old_end -= 1
+        new_end -= 1
+
+    # Characters outside the BMP are two code units in JavaScript strings
+    utf16_start = utf16_length(old[:start])
+    return utf16_start, utf16_start + utf16_length(old[start:old_end]), new[start:new_end]
+
+
+class PreviewSession:
+    """Latest rendered preview for one editor, plus stream wakeups."""
+
+    def __init__(self, session_id: str, owner: str = ''):
+        self.id = session_id
+        self.owner = owner
+        # Pinned so successive renders differ only where the creation changed
+        self.created_at = datetime.now().isoformat()
+        self.html: Optional[str] = None
+        self.revision = 0
+        self.streams = 0
+        self.closed = False
+        self.last_active = time.monotonic()
+        self.condition = Condition()
+
+    def update(self, workspace_name: str, generated_code: str) -> int:
+        """Render a new revision and wake any connected streams."""
+        html_content = render_creation_html(workspace_name, generated_code, self.created_at)
+        with self.condition:
+            if html_content != self.html:
+                self.html = html_content
+                self.revision += 1
+            self.last_active = time.monotonic()
+            self.condition.notify_all()
+            return self.revision
+
+    def close(self):
+        """Close the session and end its streams."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def stream(self):
+        """Yield server-sent events for each new revision."""
+        sent_html = None
+        sent_revision = 0
+
+        with self.condition:
+            self.streams += 1
+        try:
+            # Tell EventSource how long to wait before reconnecting
+            yield 'retry: 2000\n\n'
+
+            while True:
+                with self.condition:
+                    if not self.closed and self.revision == sent_revision:
+                        self.condition.wait(KEEPALIVE_INTERVAL)
+                    if self.closed:
+                        return
+                    html_content = self.html
+                    revision = self.revision
+                    self.last_active = time.monotonic()
+
+                if revision == sent_revision or html_content is None:
+                    yield ': keepalive\n\n'
+                    continue
+
+                if sent_html is None:
+                    yield _event('html', {'revision': revision, 'html': html_content})
+                else:
+                    start, end, text = diff_text(sent_html, html_content)
+                    yield _event('patch', {
+                        'revision': revision,
+                        'base': sent_revision,
+                        'start': start,
+                        'end': end,
+                        'text': text
+                    })
+
+                sent_html = html_content
+                sent_revision = revision
+        finally:
+            with self.condition:
+                self.streams -= 1
+                self.last_active = time.monotonic()
+
+
+class PreviewHub:
+    """In-process registry of live preview sessions."""
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS,
+                 idle_timeout: float = SESSION_IDLE_TIMEOUT,
+                 max_sessions_per_client: int = MAX_SESSIONS_PER_CLIENT):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.max_sessions_per_client = max_sessions_per_client
+        self.sessions: Dict[str, PreviewSession] = {}
+        self._lock = Lock()
+
+    def create(self, owner: str = '') -> Optional[PreviewSession]:
+        """Create a session for ``owner``, or return None when the hub or the owner's share is full."""
+        with self._lock:
+            self._expire()
+            if len(self.sessions) >= self.max_sessions:
+                return None
+            owned = sum(1 for session in self.sessions.values() if session.owner == owner)
+            if owned >= self.max_sessions_per_client:
+                return None
+            session = PreviewSession(uuid.uuid4().hex, owner)
+            self.sessions[session.id] = session
+            return session
+
+    def get(self, session_id: str) -> Optional[PreviewSession]:
+        """Get a session by id."""
+        with self._lock:
+            return self.sessions.get(session_id)
+
+    def close(self, session_id: str) -> bool:
+        """Close and remove a session."""
+        with self._lock:
+            session = self.sessions.pop(session_id, None)
+        if session is None:
+            return False
+        session.close()
+        return True
+
+    def _expire(self):
+        """Drop idle sessions with no connected streams. Caller holds the lock."""
+        now = time.monotonic()
+        for session_id, session in list(self.sessions.items()):
+            if session.streams == 0 and now - session.last_active > self.idle_timeout:
+                del self.sessions[session_id]
+                session.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get session counts."""
+        with self._lock:
+            return {
+                'sessions': len(self.sessions),
+                'streams': sum(session.streams for session in self.sessions.values()),
+                'max_sessions': self.max_sessions
+            }
+
+
+def _event(name: str, payload: Dict[str, Any]) -> str:
+    """Format a server-sent event."""
+    return f'event: {name}\ndata: {json.dumps(payload)}\n\n'
+
+
+def _session_not_found(session_id):
+    return jsonify({
+        'success': False,
+        'error': f'Preview session {session_id} not found'
+    }), 404
+
+
+@preview_bp.route('/sessions', methods=['POST'])
+def create_session():
+    """Open a live preview session."""
+    session = current_app.preview_hub.create(current_app.admission.client_key())
+    if session is None:
+        return jsonify({
+            'success': False,
+            'error': 'Too many live preview sessions'
+        }), 503
+
+    return jsonify({
+        'success': True,
+        'session_id': session.id
+    })
+
+
+@preview_bp.route('/<session_id>/stream')
+def stream_session(session_id):
+    """Stream rendered preview updates as server-sent events."""
+    session = current_app.preview_hub.get(session_id)
+    if session is None:
+        return _session_not_found(session_id)
+
+    return Response(
+        session.stream(),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+
+@preview_bp.route('/<session_id>/update', methods=['POST'])
+def update_session(session_id):
+    """Push new creation code to a live preview session."""
+    session = current_app.preview_hub.get(session_id)
+    if session is None:
+        return _session_not_found(session_id)
+
+    data = request.json
+    workspace_name = data.get('name', 'Untitled Creation')
+    generated_code = data.get('generated_code', '')
+
+    revision = session.update(workspace_name, generated_code)
+
+    return jsonify({
+        'success': True,
+        'revision': revision
+    }), 202
+
+
+@preview_bp.route('/<session_id>', methods=['DELETE'])
+def close_session(session_id):
+    """Close a live preview session."""
+    if not current_app.preview_hub.close(session_id):
+        return _session_not_found(session_id)
+
+    return jsonify({'success': True})
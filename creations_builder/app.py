@@ -4,18 +4,71 @@ Main Flask application for Creations Builder.
 
 import os
 import json
-from flask import Flask, render_template, request, jsonify, send_from_directory
-from flask_cors import CORS
-from .api.export import export_bp
-from .api.templates import templates_bp
+from functools import cached_property
+from flask import Flask, Response, render_template, request, jsonify, send_from_directory, url_for
 from .blocks.registry import BlockRegistry
 
 
+class CreationsBuilderApp(Flask):
+    """Flask application whose block registry is built on first use."""
+    
+    # Cross-worker cache (SharedCache), or None
+    shared_cache = None
+    
+    @cached_property
+    def block_registry(self):
+        """
+        The block registry, loaded from BLOCK_REGISTRY_SNAPSHOT when set.
+        
+        With a shared cache, the first worker stores its registry snapshot
+        and the other workers load that instead, so all serve the same blocks.
+        """
+        snapshot = self.config.get('BLOCK_REGISTRY_SNAPSHOT')
+        if self.shared_cache is None:
+            registry = BlockRegistry.from_snapshot(snapshot) if snapshot else BlockRegistry()
+        else:
+            key = f'registry:{self.block_registry_source}'
+            cached = self.shared_cache.get(key)
+            if cached is not None:
+                registry = BlockRegistry.from_snapshot_data(json.loads(cached))
+            else:
+                registry = BlockRegistry.from_snapshot(snapshot) if snapshot else BlockRegistry()
+                self.shared_cache.put(key, json.dumps(registry.to_snapshot()).encode('utf-8'))
+        self.block_registry_loaded_revision = registry.revision
+        return registry
+    
+    @cached_property
+    def block_registry_source(self):
+        """Identify where the registry comes from, for shared cache keys."""
+        snapshot = self.config.get('BLOCK_REGISTRY_SNAPSHOT')
+        if snapshot:
+            stat = os.stat(snapshot)
+            return f'snapshot:{os.path.abspath(snapshot)}:{stat.st_mtime_ns}:{stat.st_size}'
+        from . import __version__
+        from .blocks import registry
+        return f'defaults:{__version__}:{os.stat(registry.__file__).st_mtime_ns}'
+
+
 def create_app():
     """Create and configure the Flask application."""
-    app = Flask(__name__, 
-                static_folder='../static',
-                template_folder='../templates')
+    # Imported here so importing this module (e.g. by the CLI) stays cheap
+    from flask_cors import CORS
+    from .api.export import export_bp
+    from .api.templates import templates_bp
+    from .api.preview import preview_bp, PreviewHub
+    from .api.jobs import jobs_bp, run_export_job
+    from .jobs import JobQueue
+    from .blocks.analysis import DEFAULT_BUDGETS
+    from .admission import AdmissionController
+    from .assets import AssetPipeline
+    from .profiling import RequestProfiler
+    from .blocks.bundle import BlockBundle, build_block_bundle
+    from .blocks.compiler import CompileCache, StackCompiler
+    from .blocks.workspace import WorkspaceParseError
+    
+    app = CreationsBuilderApp(__name__, 
+                              static_folder='../static',
+                              template_folder='../templates')
     
     # Enable CORS for all routes
     CORS(app)
@@ -24,28 +77,185 @@ def create_app():
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-key-change-in-production')
     app.config['DEBUG'] = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
     
-    # Initialize block registry
-    block_registry = BlockRegistry()
-    app.block_registry = block_registry
+    # Runtime budgets enforced by exports requested with "analyze"
+    app.config['CREATION_BUDGETS'] = dict(DEFAULT_BUDGETS)
+    
+    # Admission control: request size, concurrent exports per worker and
+    # per-client rate limit (requests/second refill, burst size)
+    app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_CONTENT_LENGTH', 2 * 1024 * 1024))
+    app.config['EXPORT_MAX_CONCURRENT'] = int(os.environ.get('EXPORT_MAX_CONCURRENT', 4))
+    app.config['EXPORT_RATE_LIMIT'] = float(os.environ.get('EXPORT_RATE_LIMIT', 2))
+    app.config['EXPORT_RATE_BURST'] = float(os.environ.get('EXPORT_RATE_BURST', 10))
+    
+    # Block registry, built lazily (see CreationsBuilderApp.block_registry)
+    app.config['BLOCK_REGISTRY_SNAPSHOT'] = os.environ.get('BLOCK_REGISTRY_SNAPSHOT')
+    
+    # Optional cache file shared by all worker processes on this machine
+    app.config['SHARED_CACHE_PATH'] = os.environ.get('SHARED_CACHE_PATH')
+    app.config['SHARED_CACHE_MAX_BYTES'] = int(os.environ.get('SHARED_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    
+    if app.config['SHARED_CACHE_PATH']:
+        from .shared_cache import SharedCache
+        app.shared_cache = SharedCache(
+            app.config['SHARED_CACHE_PATH'],
+            max_bytes=app.config['SHARED_CACHE_MAX_BYTES']
+        )
+    
+    # Incremental workspace compiler, shared across requests
+    app.stack_compiler = StackCompiler(CompileCache(shared=app.shared_cache))
+    
+    # Image optimization for HTML exports: downscaled to the R1 screen,
+    # inlined below ASSET_INLINE_LIMIT bytes and cached in ASSET_CACHE_DIR.
+    # Remote images are only fetched when ASSET_FETCH_REMOTE is set.
+    app.config['EXPORT_OPTIMIZE_ASSETS'] = os.environ.get('EXPORT_OPTIMIZE_ASSETS', 'False').lower() == 'true'
+    app.config['ASSET_CACHE_DIR'] = os.environ.get('ASSET_CACHE_DIR', 'build/asset-cache')
+    app.config['ASSET_INLINE_LIMIT'] = int(os.environ.get('ASSET_INLINE_LIMIT', 8 * 1024))
+    app.config['ASSET_FETCH_REMOTE'] = os.environ.get('ASSET_FETCH_REMOTE', 'False').lower() == 'true'
+    
+    app.asset_pipeline = AssetPipeline(
+        app.config['ASSET_CACHE_DIR'],
+        asset_roots=[app.static_folder],
+        inline_limit=app.config['ASSET_INLINE_LIMIT'],
+        fetch_remote=app.config['ASSET_FETCH_REMOTE']
+    )
+    
+    # Background export jobs: a bounded worker pool per process, with job
+    # state and artifacts in a SQLite file shared by all workers
+    app.config['EXPORT_JOBS_DB'] = os.environ.get('EXPORT_JOBS_DB', 'build/export-jobs.sqlite3')
+    app.config['EXPORT_JOB_WORKERS'] = int(os.environ.get('EXPORT_JOB_WORKERS', 2))
+    app.config['EXPORT_JOB_QUEUE_SIZE'] = int(os.environ.get('EXPORT_JOB_QUEUE_SIZE', 32))
+    app.config['EXPORT_JOB_RETENTION'] = float(os.environ.get('EXPORT_JOB_RETENTION', 24 * 3600))
+    
+    app.export_jobs = JobQueue(
+        app.config['EXPORT_JOBS_DB'],
+        runner=lambda job: run_export_job(app, job),
+        workers=app.config['EXPORT_JOB_WORKERS'],
+        max_pending=app.config['EXPORT_JOB_QUEUE_SIZE'],
+        retention=app.config['EXPORT_JOB_RETENTION']
+    )
+    
+    # Live preview sessions streamed over server-sent events
+    app.preview_hub = PreviewHub()
+    
+    # Endpoints that render or compile on every call; export jobs have
+    # their own bounded queue
+    app.admission = AdmissionController(
+        blueprints=('export', 'preview'),
+        endpoints=('compile_workspace',),
+        max_concurrent=app.config['EXPORT_MAX_CONCURRENT'],
+        rate=app.config['EXPORT_RATE_LIMIT'],
+        burst=app.config['EXPORT_RATE_BURST']
+    )
+    app.admission.init_app(app)
+    
+    # Opt-in request profiling: sampled when enabled, or forced with the
+    # X-Profile-Request header when it matches PROFILE_HEADER_TOKEN
+    app.config['PROFILE_REQUESTS'] = os.environ.get('PROFILE_REQUESTS', 'False').lower() == 'true'
+    app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', 0.01))
+    app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR', 'profiles')
+    app.config['PROFILE_HEADER_TOKEN'] = os.environ.get('PROFILE_HEADER_TOKEN')
+    
+    app.profiler = RequestProfiler(
+        app.config['PROFILE_DIR'],
+        blueprints=('export', 'templates'),
+        enabled=app.config['PROFILE_REQUESTS'],
+        sample_rate=app.config['PROFILE_SAMPLE_RATE'],
+        header_token=app.config['PROFILE_HEADER_TOKEN']
+    )
+    app.profiler.init_app(app)
     
     # Register blueprints
     app.register_blueprint(export_bp, url_prefix='/api/export')
+    app.register_blueprint(jobs_bp, url_prefix='/api/export/jobs')
     app.register_blueprint(templates_bp, url_prefix='/api/templates')
+    app.register_blueprint(preview_bp, url_prefix='/api/preview')
     
     @app.route('/')
     def index():
         """Main application page."""
         return render_template('index.html')
     
+    block_bundle = {'revision': None, 'bundle': None}
+    
+    def get_block_bundle():
+        """Get the compiled block bundle, rebuilding it after registry changes."""
+        if block_bundle['revision'] != app.block_registry.revision:
+            block_bundle['bundle'] = load_shared_bundle() or build_block_bundle(app.block_registry)
+            block_bundle['revision'] = app.block_registry.revision
+        return block_bundle['bundle']
+    
+    def load_shared_bundle():
+        """Get the bundle from the shared cache, storing it there on a miss."""
+        # Blocks registered at runtime are specific to this worker
+        if app.shared_cache is None or app.block_registry.revision != app.block_registry_loaded_revision:
+            return None
+        
+        key = f'bundle:{app.block_registry_source}'
+        cached = app.shared_cache.get(key)
+        if cached is not None:
+            data = json.loads(cached)
+            return BlockBundle(data['content'], data['digest'], data['categories'])
+        
+        bundle = build_block_bundle(app.block_registry)
+        app.shared_cache.put(key, json.dumps({
+            'content': bundle.content,
+            'digest': bundle.digest,
+            'categories': bundle.categories
+        }).encode('utf-8'))
+        return bundle
+    
+    app.get_block_bundle = get_block_bundle
+    
     @app.route('/api/blocks')
     def get_blocks():
-        """Get all available custom blocks."""
-        return jsonify(block_registry.get_all_blocks())
+        """Get the manifest of available custom blocks and their bundle."""
+        bundle = get_block_bundle()
+        response = jsonify(bundle.manifest(url_for('serve_block_bundle', filename=bundle.filename)))
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    
+    @app.route('/api/blocks/bundle/<filename>')
+    def serve_block_bundle(filename):
+        """Serve the compiled block bundle with immutable caching."""
+        bundle = get_block_bundle()
+        if filename != bundle.filename:
+            return jsonify({'error': 'Not found'}), 404
+        
+        headers = {
+            'Cache-Control': 'public, max-age=31536000, immutable',
+            'ETag': bundle.etag
+        }
+        if bundle.digest in request.if_none_match:
+            return Response(status=304, headers=headers)
+        
+        return Response(bundle.content, mimetype='application/javascript', headers=headers)
     
     @app.route('/api/blocks/<category>')
     def get_blocks_by_category(category):
         """Get blocks by category."""
-        return jsonify(block_registry.get_blocks_by_category(category))
+        return jsonify(app.block_registry.get_blocks_by_category(category))
+    
+    @app.route('/api/compile', methods=['POST'])
+    def compile_workspace():
+        """Compile workspace XML/JSON to creation JavaScript."""
+        data = request.json
+        workspace_xml = data.get('workspace_xml', '')
+        
+        try:
+            result = app.stack_compiler.compile(workspace_xml)
+        except WorkspaceParseError as error:
+            return jsonify({
+                'success': False,
+                'error': str(error)
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'generated_code': result['code'],
+            'stacks': result['stacks'],
+            'compiled': result['compiled'],
+            'reused': result['reused']
+        })
     
     @app.route('/api/workspace/save', methods=['POST'])
     def save_workspace():
@@ -85,6 +295,14 @@ def create_app():
         """Handle 404 errors."""
         return jsonify({'error': 'Not found'}), 404
     
+    @app.errorhandler(413)
+    def request_too_large(error):
+        """Handle request bodies over MAX_CONTENT_LENGTH."""
+        return jsonify({
+            'success': False,
+            'error': f"Request body exceeds {app.config['MAX_CONTENT_LENGTH']} bytes"
+        }), 413
+    
     @app.errorhandler(500)
     def internal_error(error):
         """Handle 500 errors."""
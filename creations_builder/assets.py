@@ -0,0 +1,314 @@
+"""
+Image optimization for creation exports.
+
+Creations run on the R1's 240x282 screen, so images referenced by an
+exported page (``<img src>`` and CSS ``url()``) are downscaled to fit it and
+recompressed. Small results are inlined as data URIs; larger ones are
+emitted as separate asset files named by content hash, so an image used
+several times is stored once. Optimized images are cached on disk by a hash
+of their source bytes and the optimization settings, so repeated exports do
+not redo the work.
+
+Resizing and recompression need Pillow (``pip install creations-builder[images]``).
+Without it images are passed through unchanged, but are still deduplicated,
+inlined and cached.
+"""
+
+import base64
+import hashlib
+import io
+import os
+import re
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# Repository static folder, where exports' local image references resolve by default
+DEFAULT_ASSET_ROOT = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'static')
+)
+
+# R1 screen size, matching the viewport of the creation template
+DEVICE_SIZE = (240, 282)
+
+IMAGE_TYPES = {
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp',
+    '.svg': 'image/svg+xml',
+}
+MIME_EXTENSIONS = {
+    'image/png': '.png',
+    'image/jpeg': '.jpg',
+    'image/gif': '.gif',
+    'image/webp': '.webp',
+    'image/svg+xml': '.svg',
+}
+
+IMG_SRC = re.compile(r'''(<(?:img|source)\b[^>]*?\bsrc\s*=\s*)(["'])([^"']+)\2''', re.IGNORECASE)
+CSS_URL = re.compile(r'''(url\(\s*)(["']?)([^"')\s]+)\2(\s*\))''', re.IGNORECASE)
+
+# Bump when optimization output changes, so cached results are not reused
+PIPELINE_VERSION = '1'
+
+_pillow = None
+
+
+def load_pillow():
+    """Import Pillow on first use; returns ``(Image, ImageOps)`` or None."""
+    global _pillow
+    if _pillow is None:
+        try:
+            from PIL import Image, ImageOps  # type: ignore[import-not-found]
+            _pillow = (Image, ImageOps)
+        except ImportError:
+            _pillow = False
+    return _pillow or None
+
+
+def sniff_mime(data: bytes) -> Optional[str]:
+    """Identify an image type from its leading bytes."""
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if data.startswith(b'\xff\xd8'):
+        return 'image/jpeg'
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image/gif'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    if b'<svg' in data[:1024].lower():
+        return 'image/svg+xml'
+    return None
+
+
+class OptimizedImage:
+    """An optimized image and where it came from."""
+
+    __slots__ = ('digest', 'data', 'mime', 'source_digest', 'source_size')
+
+    def __init__(self, digest: str, data: bytes, mime: str, source_digest: str, source_size: int):
+        self.digest = digest
+        self.data = data
+        self.mime = mime
+        self.source_digest = source_digest
+        self.source_size = source_size
+
+    @property
+    def optimized(self) -> bool:
+        return self.digest != self.source_digest
+
+    @property
+    def filename(self) -> str:
+        return f'{self.digest[:16]}{MIME_EXTENSIONS.get(self.mime, ".bin")}'
+
+    def data_uri(self) -> str:
+        return f'data:{self.mime};base64,{base64.b64encode(self.data).decode("ascii")}'
+
+
+class AssetPipeline:
+    """Optimize, deduplicate and inline the images referenced by an export."""
+
+    def __init__(self, cache_dir: str, asset_roots: Iterable[str] = (),
+                 max_size: Tuple[int, int] = DEVICE_SIZE, inline_limit: int = 8 * 1024,
+                 quality: int = 80, fetch_remote: bool = False,
+                 max_source_bytes: int = 10 * 1024 * 1024, fetch_timeout: float = 10):
+        self.cache_dir = cache_dir
+        self.asset_roots = [os.path.realpath(root) for root in asset_roots]
+        self.max_size = tuple(max_size)
+        self.inline_limit = inline_limit
+        self.quality = quality
+        self.fetch_remote = fetch_remote
+        self.max_source_bytes = max_source_bytes
+        self.fetch_timeout = fetch_timeout
+
+    def settings_key(self) -> str:
+        """Identify the settings that affect optimized output."""
+        return f'{PIPELINE_VERSION}:{self.max_size[0]}x{self.max_size[1]}:q{self.quality}'
+
+    # Loading
+
+    def load(self, reference: str) -> Optional[bytes]:
+        """Read a referenced image, or None if it cannot or may not be read."""
+        if reference.startswith(('http://', 'https://')):
+            return self._fetch(reference) if self.fetch_remote else None
+        if reference.startswith(('data:', '//')) or ':' in reference.split('/', 1)[0]:
+            return None
+
+        relative = reference.split('?', 1)[0].split('#', 1)[0].lstrip('/')
+        if relative.startswith('static/'):
+            relative = relative[len('static/'):]
+        for root in self.asset_roots:
+            path = os.path.realpath(os.path.join(root, relative))
+            # Never read outside the asset roots
+            if os.path.commonpath([path, root]) != root or not os.path.isfile(path):
+                continue
+            if os.path.getsize(path) > self.max_source_bytes:
+                return None
+            with open(path, 'rb') as f:
+                return f.read()
+        return None
+
+    def _fetch(self, url: str) -> Optional[bytes]:
+        import urllib.request
+        try:
+            with urllib.request.urlopen(url, timeout=self.fetch_timeout) as response:
+                data = response.read(self.max_source_bytes + 1)
+        except (OSError, ValueError):
+            return None
+        return data if len(data) <= self.max_source_bytes else None
+
+    # Optimization
+
+    def optimize(self, data: bytes) -> Optional[OptimizedImage]:
+        """Optimize image bytes, using the disk cache. Returns None for non-images."""
+        source_mime = sniff_mime(data)
+        if source_mime is None:
+            return None
+
+        source_digest = hashlib.sha256(data).hexdigest()
+        key = hashlib.sha256(f'{self.settings_key()}:{source_digest}'.encode('utf-8')).hexdigest()
+        cached = self._read_cache(key, source_digest, len(data))
+        if cached is not None:
+            return cached
+
+        optimized, mime = self._recompress(data, source_mime)
+        result = OptimizedImage(
+            hashlib.sha256(optimized).hexdigest(), optimized, mime, source_digest, len(data)
+        )
+        self._write_cache(key, result)
+        return result
+
+    def _recompress(self, data: bytes, mime: str) -> Tuple[bytes, str]:
+        """Downscale to the device size and recompress; keeps the original if that is smaller."""
+        pillow = load_pillow()
+        # SVGs scale by themselves and animated GIFs would lose their frames
+        if pillow is None or mime in ('image/svg+xml', 'image/gif'):
+            return data, mime
+
+        Image, ImageOps = pillow
+        try:
+            image = Image.open(io.BytesIO(data))
+            image.load()
+        except Exception:
+            return data, mime
+        if getattr(image, 'is_animated', False):
+            return data, mime
+
+        image = ImageOps.exif_transpose(image)
+        resized = image.width > self.max_size[0] or image.height > self.max_size[1]
+        image.thumbnail(self.max_size, Image.LANCZOS)
+
+        output = io.BytesIO()
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        if has_alpha:
+            image.save(output, format='PNG', optimize=True)
+            new_mime = 'image/png'
+        else:
+            image.convert('RGB').save(output, format='JPEG', quality=self.quality,
+                                      optimize=True, progressive=True)
+            new_mime = 'image/jpeg'
+
+        optimized = output.getvalue()
+        if not resized and len(optimized) >= len(data):
+            return data, mime
+        return optimized, new_mime
+
+    def _cache_path(self, key: str, mime: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + MIME_EXTENSIONS.get(mime, '.bin'))
+
+    def _read_cache(self, key: str, source_digest: str, source_size: int) -> Optional[OptimizedImage]:
+        directory = os.path.join(self.cache_dir, key[:2])
+        for mime, extension in MIME_EXTENSIONS.items():
+            path = os.path.join(directory, key + extension)
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except OSError:
+                continue
+            return OptimizedImage(hashlib.sha256(data).hexdigest(), data, mime, source_digest, source_size)
+        return None
+
+    def _write_cache(self, key: str, image: OptimizedImage):
+        path = self._cache_path(key, image.mime)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so concurrent exports never read a partial file
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(image.data)
+        os.replace(temporary, path)
+
+    # Rewriting
+
+    def process_html(self, html: str, asset_dir: str = 'assets', inline_all: bool = False):
+        """
+        Optimize every image an HTML page references and rewrite the references.
+
+        Returns ``(html, assets, report)``: the rewritten page, the asset files
+        to ship alongside it (relative path -> bytes) and per-reference details.
+        With ``inline_all`` every image is inlined regardless of ``inline_limit``,
+        so the page is self-contained and ``assets`` is empty.
+        """
+        resolved: Dict[str, Optional[str]] = {}
+        assets: Dict[str, bytes] = {}
+        report: Dict[str, Any] = {'images': [], 'source_bytes': 0, 'output_bytes': 0, 'inlined': 0,
+                                  'files': 0, 'skipped': [], 'pillow': load_pillow() is not None}
+
+        def rewrite(reference: str) -> Optional[str]:
+            if reference in resolved:
+                return resolved[reference]
+            resolved[reference] = None
+
+            data = self.load(reference)
+            image = self.optimize(data) if data is not None else None
+            if image is None:
+                if not reference.startswith('data:'):
+                    report['skipped'].append(reference)
+                return None
+
+            if inline_all or len(image.data) <= self.inline_limit:
+                replacement = image.data_uri()
+                report['inlined'] += 1
+                mode = 'inline'
+            else:
+                replacement = f'{asset_dir}/{image.filename}'
+                if replacement not in assets:
+                    assets[replacement] = image.data
+                    report['files'] += 1
+                mode = 'file'
+            report['images'].append({
+                'reference': reference,
+                'source_digest': image.source_digest,
+                'source_bytes': image.source_size,
+                'output_bytes': len(image.data),
+                'mode': mode,
+                'optimized': image.optimized,
+            })
+            report['source_bytes'] += image.source_size
+            report['output_bytes'] += len(image.data)
+            resolved[reference] = replacement
+            return replacement
+
+        def replace_src(match):
+            replacement = rewrite(match.group(3))
+            if replacement is None:
+                return match.group(0)
+            return f'{match.group(1)}{match.group(2)}{replacement}{match.group(2)}'
+
+        def replace_url(match):
+            reference = match.group(3)
+            if os.path.splitext(reference.split('?', 1)[0])[1].lower() not in IMAGE_TYPES:
+                return match.group(0)
+            replacement = rewrite(reference)
+            if replacement is None:
+                return match.group(0)
+            # Keep the original quoting, which may sit inside a style attribute
+            return f'{match.group(1)}{match.group(2)}{replacement}{match.group(2)}{match.group(4)}'
+
+        html = IMG_SRC.sub(replace_src, html)
+        html = CSS_URL.sub(replace_url, html)
+        return html, assets, report
+
+    def optimize_file(self, path: str) -> Optional[OptimizedImage]:
+        """Optimize a single image file."""
+        with open(path, 'rb') as f:
+            return self.optimize(f.read())
@@ -0,0 +1,191 @@
+"""
+Runtime cost analysis for R1 creation workspaces.
+
+Estimates what a creation will cost on the device before it is exported:
+output size, event listeners kept alive, timer and sensor wakeups, and the
+worst-case storage writes and network calls each trigger can cause. Triggers
+are identified from their ``BlockRegistry`` category; per-block costs come
+from ``BLOCK_COSTS`` or a ``runtime`` entry in the block's definition, so
+custom blocks can declare their own.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from .compiler import StackCompiler, _interval_ms
+from .registry import BlockRegistry
+from .workspace import Block, count_blocks
+
+# Accelerometer sampling rate used by the generated code ({ frequency: 10 })
+ACCELEROMETER_HZ = 10
+
+# Runtime costs of the built-in blocks; registry ``runtime`` metadata overrides these
+BLOCK_COSTS: Dict[str, Dict[str, Any]] = {
+    'voice_command': {'listeners': 1},
+    'hardware_button': {'listeners': 1},
+    'timer_trigger': {'timers': 1},
+    'accelerometer_trigger': {'sensors': 1, 'samples_per_minute': ACCELEROMETER_HZ * 60},
+    'web_request': {'network_calls': 1},
+    'store_data': {'storage_writes': 1},
+}
+
+# Budgets checked by ``check_budgets``; None disables a budget
+DEFAULT_BUDGETS: Dict[str, Optional[float]] = {
+    'output_bytes': 512 * 1024,
+    'listeners': 32,
+    'timer_wakeups_per_minute': 60,
+    'sensor_subscriptions': 2,
+    'storage_writes_per_trigger': 10,
+    'network_calls_per_trigger': 5,
+}
+
+TRIGGER_CATEGORY = 'triggers'
+
+
+class BudgetError(ValueError):
+    """Raised when budget overrides are malformed."""
+
+
+def block_costs(block_type: str, registry: BlockRegistry) -> Dict[str, Any]:
+    """Get the runtime costs of a block type."""
+    definition = registry.get_definition(block_type)
+    for key, value in (definition.extra or ()) if definition else ():
+        if key == 'runtime' and isinstance(value, dict):
+            return value
+    return BLOCK_COSTS.get(block_type, {})
+
+
+def timer_wakeups_per_minute(block: Block, costs: Dict[str, Any]) -> float:
+    """Get how often a timer trigger fires per minute."""
+    if 'wakeups_per_minute' in costs:
+        return float(costs['wakeups_per_minute'])
+    milliseconds = float(_interval_ms(
+        block.get_field('INTERVAL', '5'), block.get_field('UNIT', 'SECONDS'), 5
+    ))
+    return 60000 / max(milliseconds, 1)
+
+
+class WorkspaceAnalyzer:
+    """Walk a workspace's stacks and total up their runtime costs."""
+
+    def __init__(self, registry: BlockRegistry, compiler: Optional[StackCompiler] = None):
+        self.registry = registry
+        self.compiler = compiler or StackCompiler()
+
+    def is_trigger(self, block_type: str) -> bool:
+        definition = self.registry.get_definition(block_type)
+        if definition is not None:
+            return definition.category == TRIGGER_CATEGORY
+        return block_type in self.compiler.trigger_types
+
+    def analyze(self, stacks: List[Block], output_bytes: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Analyze parsed stacks.
+
+        ``output_bytes`` is the size of the rendered export, if the caller has
+        one; the size of the linked code is always reported.
+        """
+        report: Dict[str, Any] = {
+            'blocks': count_blocks(stacks),
+            'code_bytes': len(self.compiler.compile_stacks(stacks)['code'].encode('utf-8')),
+            'output_bytes': output_bytes,
+            'listeners': 0,
+            'timer_wakeups_per_minute': 0.0,
+            'sensor_subscriptions': 0,
+            'sensor_samples_per_minute': 0,
+            'storage_writes_per_trigger': 0,
+            'network_calls_per_trigger': 0,
+            'triggers': [],
+            'unknown_blocks': [],
+            'warnings': [],
+        }
+        startup = self._entry(None)
+        for stack in stacks:
+            self._scan(stack, startup, report, nested=False)
+        if startup['storage_writes'] or startup['network_calls'] or startup['blocks']:
+            report['triggers'].insert(0, startup)
+
+        for entry in report['triggers']:
+            report['storage_writes_per_trigger'] = max(
+                report['storage_writes_per_trigger'], entry['storage_writes'])
+            report['network_calls_per_trigger'] = max(
+                report['network_calls_per_trigger'], entry['network_calls'])
+        report['timer_wakeups_per_minute'] = round(report['timer_wakeups_per_minute'], 3)
+        return report
+
+    @staticmethod
+    def _entry(block: Optional[Block]) -> Dict[str, Any]:
+        return {
+            'id': (block.id or None) if block else None,
+            'type': block.type if block else 'startup',
+            'blocks': 0,
+            'storage_writes': 0,
+            'network_calls': 0,
+        }
+
+    def _scan(self, block: Optional[Block], entry: Dict[str, Any],
+              report: Dict[str, Any], nested: bool):
+        """Add the costs of a chain to ``entry``; nested triggers get their own."""
+        for current in block.chain() if block else ():
+            if current.type not in self.registry and current.type not in self.compiler.generators:
+                if current.type not in report['unknown_blocks']:
+                    report['unknown_blocks'].append(current.type)
+            costs = block_costs(current.type, self.registry)
+
+            if self.is_trigger(current.type):
+                if nested:
+                    report['warnings'].append(
+                        f'{current.type} ({current.id or "no id"}) is registered inside a '
+                        'handler and adds another listener every time that handler runs'
+                    )
+                report['listeners'] += costs.get('listeners', 0)
+                report['sensor_subscriptions'] += costs.get('sensors', 0)
+                report['sensor_samples_per_minute'] += costs.get('samples_per_minute', 0)
+                if costs.get('timers'):
+                    report['timer_wakeups_per_minute'] += timer_wakeups_per_minute(current, costs)
+
+                handler = self._entry(current)
+                report['triggers'].append(handler)
+                self._scan(current.next, handler, report, nested=True)
+                for name in sorted(current.inputs):
+                    self._scan(current.inputs[name], handler, report, nested=True)
+                return
+
+            # Worst case: every branch of every input runs
+            entry['blocks'] += 1
+            entry['storage_writes'] += costs.get('storage_writes', 0)
+            entry['network_calls'] += costs.get('network_calls', 0)
+            for name in sorted(current.inputs):
+                self._scan(current.inputs[name], entry, report, nested)
+
+
+def validate_budgets(budgets: Any) -> Dict[str, Optional[float]]:
+    """
+    Check client-supplied budget overrides.
+
+    ``budgets`` must be an object mapping names from ``DEFAULT_BUDGETS`` to
+    non-negative numbers, or null to disable a budget.
+    """
+    if budgets is None:
+        return {}
+    if not isinstance(budgets, dict):
+        raise BudgetError('"budgets" must be an object')
+    for name, value in budgets.items():
+        if name not in DEFAULT_BUDGETS:
+            raise BudgetError(f'Unknown budget {name!r}')
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not value >= 0:
+            raise BudgetError(f'Budget {name!r} must be a non-negative number or null')
+    return budgets
+
+
+def check_budgets(report: Dict[str, Any], budgets: Dict[str, Optional[float]]) -> List[Dict[str, Any]]:
+    """Get the budgets a report exceeds."""
+    violations = []
+    for metric, budget in budgets.items():
+        value = report.get(metric)
+        if budget is None or not isinstance(value, (int, float)):
+            continue
+        if value > budget:
+            violations.append({'metric': metric, 'value': value, 'budget': budget})
+    return violations
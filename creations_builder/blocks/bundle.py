@@ -0,0 +1,118 @@
+"""
+Compiled block bundle built from the block registry.
+
+The registry's block definitions and ``code_generator`` sources are compiled
+into one compact JavaScript module whose filename carries a hash of its
+content, so it can be served with immutable caching and ``/api/blocks`` only
+needs to return a small manifest pointing at it.
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Dict, List
+
+from .registry import BlockRegistry
+
+BUNDLE_PREFIX = 'blocks'
+
+# Bump when the loader code below changes, so bundle hashes change with it
+BUNDLE_FORMAT = '2'
+
+# Blocks the editor page defines itself (static/js/custom-blocks.js and
+# code-generator.js); the bundle only lists them in the manifest
+PAGE_BLOCK_TYPES = frozenset([
+    'voice_command', 'timer_trigger', 'hardware_button', 'accelerometer_trigger',
+    'send_notification', 'speak_text', 'web_request', 'store_data', 'wait_block',
+])
+
+
+class BlockBundle:
+    """A built block bundle and its manifest data."""
+
+    def __init__(self, content: str, digest: str, categories: Dict[str, List[str]]):
+        self.content = content
+        self.digest = digest
+        self.categories = categories
+
+    @property
+    def filename(self) -> str:
+        """Content-hashed bundle filename."""
+        return f'{BUNDLE_PREFIX}.{self.digest}.js'
+
+    @property
+    def etag(self) -> str:
+        """Strong ETag for the bundle content."""
+        return f'"{self.digest}"'
+
+    def manifest(self, url: str) -> Dict[str, Any]:
+        """Get the lightweight manifest describing this bundle."""
+        return {
+            'bundle': {
+                'url': url,
+                'hash': self.digest,
+                'size': len(self.content.encode('utf-8'))
+            },
+            'categories': self.categories
+        }
+
+
+def build_block_bundle(registry: BlockRegistry) -> BlockBundle:
+    """
+    Compile the registry into a single JavaScript module.
+
+    Definitions are emitted as compact JSON. Generator sources are emitted
+    verbatim (trimmed) because they may contain multi-line template literals
+    whose whitespace is significant. Only registry blocks the page does not
+    define (``PAGE_BLOCK_TYPES``) are included, so the core blocks are not
+    downloaded twice; the manifest's categories still list every block.
+    """
+    definitions = []
+    generators = []
+    categories = {}
+
+    for category in sorted(registry.get_categories()):
+        block_types = sorted(registry.get_category_types(category))
+        categories[category] = block_types
+        for block_type in block_types:
+            definition = registry.get_definition(block_type)
+            if definition is None or block_type in PAGE_BLOCK_TYPES:
+                continue
+            definitions.append(definition.to_dict(include_generator=False))
+            if definition.code_generator:
+                generators.append(f'{json.dumps(block_type)}:{definition.code_generator.strip()}')
+
+    definitions_json = json.dumps(definitions, separators=(',', ':'), sort_keys=True)
+    generators_js = ','.join(generators)
+
+    digest_source = '\0'.join([BUNDLE_FORMAT, definitions_json, generators_js])
+    digest = hashlib.sha256(digest_source.encode('utf-8')).hexdigest()[:16]
+
+    content = (
+        f'/* creations-builder block bundle {digest} */\n'
+        '(function(Blockly){'
+        f'var defs={definitions_json};'
+        f'var fns={{{generators_js}}};'
+        'defs.forEach(function(d){if(!Blockly.Blocks[d.type])Blockly.defineBlocksWithJsonArray([d]);});'
+        'var gen=Blockly.JavaScript||window.javascriptGenerator||(Blockly.generators&&Blockly.generators.javascript);'
+        'if(gen){var table=gen.forBlock||gen;Object.keys(fns).forEach(function(t){if(!table[t])table[t]=fns[t];});}'
+        f'window.R1BlockBundle={{hash:{json.dumps(digest)},types:defs.map(function(d){{return d.type;}})}};'
+        '})(Blockly);\n'
+    )
+    return BlockBundle(content, digest, categories)
+
+
+def write_block_bundle(registry: BlockRegistry, output_dir: str) -> Dict[str, Any]:
+    """Build the bundle and write it with a manifest into ``output_dir``."""
+    bundle = build_block_bundle(registry)
+    os.makedirs(output_dir, exist_ok=True)
+
+    bundle_path = os.path.join(output_dir, bundle.filename)
+    with open(bundle_path, 'w', encoding='utf-8') as f:
+        f.write(bundle.content)
+
+    manifest = bundle.manifest(bundle.filename)
+    with open(os.path.join(output_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    return {'path': bundle_path, 'manifest': manifest}
@@ -0,0 +1,460 @@
+"""
+Server-side code generation for R1 creation workspaces.
+
+Mirrors the generators in ``static/js/code-generator.js`` so workspaces can be
+compiled without a browser. Compilation is incremental: each top-level block
+stack is compiled on its own and cached under a hash of its subtree, so an
+edit to one stack only recompiles that stack before the results are linked
+back together.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional
+
+from .workspace import Block, parse_workspace
+
+
+def stack_key(stack: Block) -> str:
+    """Get the cache key for a top-level stack."""
+    canonical = json.dumps(stack.canonical(), separators=(',', ':'))
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+def _interval_ms(value: str, unit: str, default: float) -> str:
+    """Convert a duration field into a millisecond literal."""
+    multiplier = 60000 if unit == 'MINUTES' else 3600000 if unit == 'HOURS' else 1000
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        number = default
+    milliseconds = number * multiplier
+    return str(int(milliseconds)) if milliseconds.is_integer() else str(milliseconds)
+
+
+def _statements(block: Block, compiler: 'StackCompiler') -> str:
+    """Compile the blocks chained after a trigger."""
+    return compiler.compile_chain(block.next) if block.next else ''
+
+
+def generate_voice_command(block: Block, compiler: 'StackCompiler') -> str:
+    """Voice command trigger."""
+    command = block.get_field('COMMAND', 'hello')
+    statements = _statements(block, compiler)
+    return f'''
+// Voice command trigger: "{command}"
+window.addEventListener('voiceCommand', function(event) {{
+    if (event.detail && event.detail.command &&
+        event.detail.command.toLowerCase().includes('{command.lower()}')) {{
+        console.log('Voice command detected: {command}');
+        {statements}
+    }}
+}});
+
+// Mock voice command for browser testing
+if (typeof PluginMessageHandler === 'undefined') {{
+    console.log('Setting up mock voice command for: {command}');
+    setTimeout(() => {{
+        window.dispatchEvent(new CustomEvent('voiceCommand', {{
+            detail: {{ command: '{command}' }}
+        }}));
+    }}, 2000);
+}}
+'''
+
+
+def generate_timer_trigger(block: Block, compiler: 'StackCompiler') -> str:
+    """Timer trigger."""
+    interval = block.get_field('INTERVAL', '5')
+    unit = block.get_field('UNIT', 'SECONDS')
+    statements = _statements(block, compiler)
+    milliseconds = _interval_ms(interval, unit, 5)
+    return f'''
+// Timer trigger: every {interval} {unit.lower()}
+setInterval(function() {{
+    console.log('Timer triggered: {interval} {unit.lower()}');
+    {statements}
+}}, {milliseconds});
+'''
+
+
+HARDWARE_BUTTON_EVENTS = {
+    ('SIDE', 'CLICK'): 'sideClick',
+    ('SIDE', 'PRESS'): 'longPressStart',
+    ('SIDE', 'RELEASE'): 'longPressEnd',
+}
+
+
+def hardware_button_event(button: str, action: str) -> str:
+    """Get the window event a hardware button block listens for."""
+    if button == 'SCROLL_UP':
+        return 'scrollUp'
+    if button == 'SCROLL_DOWN':
+        return 'scrollDown'
+    return HARDWARE_BUTTON_EVENTS.get((button, action), 'sideClick')
+
+
+def generate_hardware_button(block: Block, compiler: 'StackCompiler') -> str:
+    """Hardware button trigger."""
+    button = block.get_field('BUTTON', 'SIDE')
+    action = block.get_field('ACTION', 'CLICK')
+    statements = _statements(block, compiler)
+    event_name = hardware_button_event(button, action)
+    return f'''
+// Hardware button trigger: {button} {action}
+window.addEventListener('{event_name}', function() {{
+    console.log('Hardware button triggered: {button} {action}');
+    {statements}
+}});
+'''
+
+
+def generate_accelerometer_trigger(block: Block, compiler: 'StackCompiler') -> str:
+    """Accelerometer trigger."""
+    direction = block.get_field('DIRECTION', 'LEFT')
+    threshold = block.get_field('THRESHOLD', '0.5')
+    statements = _statements(block, compiler)
+    return f'''
+// Accelerometer trigger: {direction} > {threshold}
+if (window.creationSensors && window.creationSensors.accelerometer) {{
+    window.creationSensors.accelerometer.start(function(data) {{
+        let triggered = false;
+
+        if ('{direction}' === 'LEFT' && data.x < -{threshold}) triggered = true;
+        if ('{direction}' === 'RIGHT' && data.x > {threshold}) triggered = true;
+        if ('{direction}' === 'FORWARD' && data.y > {threshold}) triggered = true;
+        if ('{direction}' === 'BACKWARD' && data.y < -{threshold}) triggered = true;
+
+        if (triggered) {{
+            console.log('Accelerometer triggered: {direction} > {threshold}');
+            {statements}
+        }}
+    }}, {{ frequency: 10 }});
+}} else {{
+    console.log('Accelerometer not available');
+}}
+'''
+
+
+def generate_send_notification(block: Block, compiler: 'StackCompiler') -> str:
+    """Send notification action."""
+    message = block.get_field('MESSAGE', 'Hello from R1!')
+    return f'''
+// Show notification
+console.log('Notification: {message}');
+if (typeof PluginMessageHandler !== 'undefined') {{
+    PluginMessageHandler.postMessage(JSON.stringify({{
+        message: "{message}",
+        useLLM: false
+    }}));
+}} else {{
+    // Browser fallback
+    if (typeof showNotification === 'function') {{
+        showNotification("{message}");
+    }} else {{
+        alert("Notification: {message}");
+    }}
+}}
+'''
+
+
+def generate_speak_text(block: Block, compiler: 'StackCompiler') -> str:
+    """Speak text action."""
+    text = block.get_field('TEXT', 'Hello')
+    save_to_journal = 'true' if block.get_field('SAVE_TO_JOURNAL') == 'TRUE' else 'false'
+    return f'''
+// Speak text
+console.log('Speaking: {text}');
+if (typeof PluginMessageHandler !== 'undefined') {{
+    PluginMessageHandler.postMessage(JSON.stringify({{
+        message: "{text}",
+        useLLM: true,
+        wantsR1Response: true,
+        wantsJournalEntry: {save_to_journal}
+    }}));
+}} else {{
+    // Browser fallback
+    console.log('Speak (mock): {text}');
+    if ('speechSynthesis' in window) {{
+        const utterance = new SpeechSynthesisUtterance("{text}");
+        speechSynthesis.speak(utterance);
+    }}
+}}
+'''
+
+
+def generate_web_request(block: Block, compiler: 'StackCompiler') -> str:
+    """Web request action."""
+    method = block.get_field('METHOD', 'GET')
+    url = block.get_field('URL', 'https://api.example.com')
+    return f'''
+// Web request
+console.log('Making {method} request to: {url}');
+try {{
+    fetch('{url}', {{
+        method: '{method}',
+        headers: {{
+            'Content-Type': 'application/json'
+        }}
+    }})
+    .then(response => {{
+        if (!response.ok) {{
+            throw new Error('HTTP ' + response.status);
+        }}
+        return response.json();
+    }})
+    .then(data => {{
+        console.log('Web request response:', data);
+        // Handle response data here
+    }})
+    .catch(error => {{
+        console.error('Web request error:', error);
+    }});
+}} catch (error) {{
+    console.error('Web request failed:', error);
+}}
+'''
+
+
+def generate_store_data(block: Block, compiler: 'StackCompiler') -> str:
+    """Store data action."""
+    value = block.get_field('VALUE', 'my data')
+    key = block.get_field('KEY', 'my_key')
+    storage_type = block.get_field('STORAGE_TYPE', 'plain')
+    return f'''
+// Store data
+console.log('Storing data: {key} = {value}');
+if (window.creationStorage && window.creationStorage.{storage_type}) {{
+    window.creationStorage.{storage_type}.setItem('{key}', btoa('{value}'))
+        .then(() => {{
+            console.log('Data stored successfully: {key}');
+        }})
+        .catch(error => {{
+            console.error('Error storing data:', error);
+        }});
+}} else {{
+    // Browser fallback
+    localStorage.setItem('r1_{storage_type}_{key}', '{value}');
+    console.log('Data stored to localStorage: {key}');
+}}
+'''
+
+
+def generate_wait_block(block: Block, compiler: 'StackCompiler') -> str:
+    """Wait block."""
+    duration = block.get_field('DURATION', '1')
+    unit = block.get_field('UNIT', 'SECONDS')
+    milliseconds = _interval_ms(duration, 'MINUTES' if unit == 'MINUTES' else 'SECONDS', 1)
+    return f'''
+// Wait {duration} {unit.lower()}
+console.log('Waiting {duration} {unit.lower()}...');
+await new Promise(resolve => setTimeout(resolve, {milliseconds}));
+console.log('Wait complete');
+'''
+
+
+# Trigger blocks consume the rest of their stack as the handler body
+TRIGGER_GENERATORS = {
+    'voice_command': generate_voice_command,
+    'timer_trigger': generate_timer_trigger,
+    'hardware_button': generate_hardware_button,
+    'accelerometer_trigger': generate_accelerometer_trigger,
+}
+
+STATEMENT_GENERATORS = {
+    'send_notification': generate_send_notification,
+    'speak_text': generate_speak_text,
+    'web_request': generate_web_request,
+    'store_data': generate_store_data,
+    'wait_block': generate_wait_block,
+}
+
+
+# Prefix for compiled stacks in a shared cache; bump when generator output changes
+SHARED_KEY_PREFIX = 'stack:1:'
+
+
+class CompileCache:
+    """
+    Thread-safe LRU cache of compiled stack code keyed by subtree hash.
+
+    An optional ``shared`` cache (see ``creations_builder.shared_cache``)
+    acts as a second tier, so stacks compiled by one worker process are
+    reused by the others.
+    """
+
+    def __init__(self, max_entries: int = 4096, shared=None):
+        self.max_entries = max_entries
+        self.shared = shared
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+        self._entries: 'OrderedDict[str, str]' = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        """Get compiled code for a stack key, or None if not cached."""
+        with self._lock:
+            code = self._entries.get(key)
+            if code is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return code
+
+        if self.shared is not None:
+            value: Optional[bytes] = self.shared.get(SHARED_KEY_PREFIX + key)
+            if value is not None:
+                code = value.decode('utf-8')
+                self._store(key, code)
+                with self._lock:
+                    self.shared_hits += 1
+                return code
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, code: str):
+        """Store compiled code for a stack key."""
+        self._store(key, code)
+        if self.shared is not None:
+            self.shared.put(SHARED_KEY_PREFIX + key, code.encode('utf-8'))
+
+    def _store(self, key: str, code: str):
+        with self._lock:
+            self._entries[key] = code
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all cached entries and reset statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.shared_hits = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Get cache size and hit statistics."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class StackCompiler:
+    """Incremental compiler from workspace XML/JSON to creation JavaScript."""
+
+    def __init__(self, cache: Optional[CompileCache] = None):
+        self.cache = cache if cache is not None else CompileCache()
+        self.generators: Dict[str, Callable[[Block, 'StackCompiler'], str]] = {}
+        self.generators.update(TRIGGER_GENERATORS)
+        self.generators.update(STATEMENT_GENERATORS)
+        self.trigger_types = set(TRIGGER_GENERATORS)
+
+    def register_generator(self, block_type: str,
+                           generator: Callable[[Block, 'StackCompiler'], str],
+                           trigger: bool = False):
+        """
+        Register a generator for a block type.
+
+        Changing generators invalidates the cache, since cached stacks may
+        have been compiled with the old one. Code from custom generators is
+        specific to this compiler, so it also stops using a shared cache.
+        """
+        self.generators[block_type] = generator
+        if trigger:
+            self.trigger_types.add(block_type)
+        self.cache.clear()
+        self.cache.shared = None
+
+    def compile_block(self, block: Block) -> str:
+        """Compile a single block, ignoring blocks chained after it."""
+        generator = self.generators.get(block.type)
+        if generator is None:
+            return f'\n// Unsupported block: {block.type}\n'
+        return generator(block, self)
+
+    def compile_chain(self, block: Block) -> str:
+        """Compile a block and the blocks chained after it."""
+        code = []
+        for current in block.chain():
+            code.append(self.compile_block(current))
+            if current.type in self.trigger_types:
+                # Triggers compile their own chain as the handler body
+                break
+        return ''.join(code)
+
+    def unsupported_types(self, stacks: List[Block]) -> List[str]:
+        """Get the block types in ``stacks`` that have no generator, in order of appearance."""
+        found: Dict[str, None] = {}
+        for stack in stacks:
+            for block in stack.walk():
+                if block.type not in self.generators:
+                    found[block.type] = None
+        return list(found)
+
+    def compile_stack(self, stack: Block) -> Dict[str, Any]:
+        """Compile one top-level stack, using the cache when possible."""
+        key = stack_key(stack)
+        code = self.cache.get(key)
+        cached = code is not None
+        if not cached:
+            code = self.compile_chain(stack)
+            self.cache.put(key, code)
+        return {'id': stack.id, 'key': key, 'code': code, 'cached': cached}
+
+    def compile(self, workspace_text: str) -> Dict[str, Any]:
+        """
+        Compile a workspace and link its stacks into the creation program.
+
+        Returns the linked code along with per-stack keys, so callers can see
+        which stacks were served from the cache.
+        """
+        return self.compile_stacks(parse_workspace(workspace_text))
+
+    def compile_stacks(self, stacks: List[Block]) -> Dict[str, Any]:
+        """Compile already parsed stacks; see ``compile``."""
+        compiled = [self.compile_stack(stack) for stack in stacks]
+        return {
+            'code': link([result['code'] for result in compiled]),
+            'stacks': [
+                {'id': result['id'], 'key': result['key'], 'cached': result['cached']}
+                for result in compiled
+            ],
+            'compiled': sum(1 for result in compiled if not result['cached']),
+            'reused': sum(1 for result in compiled if result['cached']),
+        }
+
+
+def link(stack_codes: List[str]) -> str:
+    """Link compiled stacks into the async program wrapper used for export."""
+    code = '\n'.join(stack_codes)
+    return f'''(async function() {{
+    console.log('R1 Creation code starting...');
+
+    try {{
+        {code}
+
+        console.log('R1 Creation code completed successfully');
+    }} catch (error) {{
+        console.error('Error in R1 Creation code:', error);
+    }}
+}})();
+'''
+
+
+def compile_workspace(workspace_text: str, compiler: Optional[StackCompiler] = None) -> str:
+    """Compile a workspace to JavaScript with a shared or fresh compiler."""
+    code: str = (compiler or StackCompiler()).compile(workspace_text)['code']
+    return code
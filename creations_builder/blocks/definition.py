@@ -0,0 +1,243 @@
+"""
+Compact block definition model for the block registry.
+
+Definitions arrive as free-form Blockly JSON dicts. They are validated once
+at registration and stored in ``__slots__`` objects: key and identifier
+strings are interned, and ``args`` and dropdown ``options`` become tuples
+that are shared between blocks with identical arguments. With thousands of
+registered blocks this keeps the per-block footprint small and lookups
+cheap; ``to_dict`` rebuilds the JSON form on demand.
+"""
+
+import re
+import sys
+from typing import Any, Dict, Optional, Tuple
+
+# Keys with their own slot; anything else is kept in ``extra``
+_CONNECTION_KEYS = ('previousStatement', 'nextStatement', 'output')
+_CORE_KEYS = frozenset(('type', 'message0', 'args0', 'colour', 'tooltip',
+                        'helpUrl', 'code_generator') + _CONNECTION_KEYS)
+
+_ARGS_KEY = re.compile(r'^args\d+$')
+_MESSAGE_KEY = re.compile(r'^message\d+$')
+_PLACEHOLDER = re.compile(r'%(\d+)')
+
+# Argument types that must carry a name
+_NAMED_TYPES = frozenset((
+    'field_input', 'field_number', 'field_dropdown', 'field_checkbox',
+    'field_colour', 'field_angle', 'field_variable', 'field_multilinetext',
+    'field_label_serializable', 'input_value', 'input_statement',
+))
+
+
+class BlockDefinitionError(ValueError):
+    """Raised when a block definition is malformed."""
+
+
+def _intern(value: Any) -> Any:
+    """Intern strings, leaving other values untouched."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class BlockDefinition:
+    """A validated, compactly stored block definition."""
+
+    __slots__ = ('type', 'category', 'message0', 'args0', 'colour', 'tooltip',
+                 'help_url', 'connections', 'code_generator', 'extra')
+
+    def __init__(self, category: str, block_type: str, message0: str,
+                 args0: Tuple[Tuple[Tuple[str, Any], ...], ...] = (),
+                 colour: Any = None, tooltip: str = '', help_url: str = '',
+                 connections: Tuple[Tuple[str, Any], ...] = (),
+                 code_generator: Optional[str] = None,
+                 extra: Optional[Tuple[Tuple[str, Any], ...]] = None):
+        self.category = category
+        self.type = block_type
+        self.message0 = message0
+        self.args0 = args0
+        self.colour = colour
+        self.tooltip = tooltip
+        self.help_url = help_url
+        self.connections = connections
+        self.code_generator = code_generator
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, category: str, block_type: str, data: Dict[str, Any],
+                  shared: Optional[Dict[Any, Any]] = None) -> 'BlockDefinition':
+        """
+        Validate a Blockly JSON definition and build a compact definition.
+
+        ``shared`` is a registry-wide table used to reuse identical argument
+        and option tuples across definitions.
+        """
+        if shared is None:
+            shared = {}
+
+        if not isinstance(category, str) or not category:
+            raise BlockDefinitionError('Block category must be a non-empty string')
+        if not isinstance(block_type, str) or not block_type:
+            raise BlockDefinitionError('Block type must be a non-empty string')
+        if not isinstance(data, dict):
+            raise BlockDefinitionError(f'Definition for {block_type} must be a dict')
+        if data.get('type', block_type) != block_type:
+            raise BlockDefinitionError(
+                f"Definition type {data.get('type')!r} does not match {block_type!r}"
+            )
+
+        message0 = data.get('message0')
+        if not isinstance(message0, str):
+            raise BlockDefinitionError(f'{block_type}: message0 must be a string')
+
+        args0 = _freeze_args(block_type, 'args0', data.get('args0', ()), shared)
+        _check_placeholders(block_type, 'message0', message0, args0)
+
+        code_generator = data.get('code_generator')
+        if code_generator is not None and not isinstance(code_generator, str):
+            raise BlockDefinitionError(f'{block_type}: code_generator must be a string')
+
+        colour = data.get('colour')
+        if colour is not None and not isinstance(colour, (int, str)):
+            raise BlockDefinitionError(f'{block_type}: colour must be a number or string')
+
+        connections = tuple(
+            (sys.intern(key), _intern(data[key]))
+            for key in _CONNECTION_KEYS
+            if key in data
+        )
+
+        extra = []
+        for key, value in data.items():
+            if key in _CORE_KEYS:
+                continue
+            if _ARGS_KEY.match(key):
+                value = _freeze_args(block_type, key, value, shared)
+            elif isinstance(value, list):
+                value = _share(shared, _freeze(value))
+            extra.append((sys.intern(key), _intern(value)))
+
+        for key, value in extra:
+            if _MESSAGE_KEY.match(key):
+                index = key[len('message'):]
+                args = dict(extra).get(f'args{index}', ())
+                _check_placeholders(block_type, key, value, args)
+
+        return cls(
+            sys.intern(category),
+            sys.intern(block_type),
+            message0,
+            args0,
+            _intern(colour),
+            data.get('tooltip', ''),
+            _intern(data.get('helpUrl', '')),
+            _share(shared, connections),
+            code_generator,
+            tuple(extra) or None,
+        )
+
+    def to_dict(self, include_generator: bool = True) -> Dict[str, Any]:
+        """Rebuild the Blockly JSON form of this definition."""
+        data = {
+            'type': self.type,
+            'message0': self.message0,
+            'args0': [dict(arg) for arg in self.args0],
+        }
+        for key, value in self.extra or ():
+            if _ARGS_KEY.match(key):
+                value = [dict(arg) for arg in value]
+            data[key] = value
+        for key, value in self.connections:
+            data[key] = value
+        data['colour'] = self.colour
+        data['tooltip'] = self.tooltip
+        data['helpUrl'] = self.help_url
+        if include_generator and self.code_generator is not None:
+            data['code_generator'] = self.code_generator
+        return data
+
+    def field_names(self) -> Tuple[str, ...]:
+        """Get the names of all named arguments."""
+        all_args = [self.args0]
+        all_args.extend(value for key, value in self.extra or () if _ARGS_KEY.match(key))
+        return tuple(
+            value
+            for args in all_args
+            for arg in args
+            for name, value in arg
+            if name == 'name'
+        )
+
+    def has_connection(self, key: str) -> bool:
+        """Whether the block has a ``previousStatement``/``nextStatement``/``output``."""
+        return any(name == key for name, _ in self.connections)
+
+    def __repr__(self) -> str:
+        return f'BlockDefinition({self.category!r}, {self.type!r})'
+
+
+def _freeze(value: Any) -> Any:
+    """Convert nested lists to tuples and intern strings."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return _intern(value)
+
+
+def _share(shared: Dict[Any, Any], value: Any) -> Any:
+    """Reuse an identical, previously seen immutable value."""
+    try:
+        hash(value)
+    except TypeError:
+        # Unhashable (e.g. contains a dict), keep this copy
+        return value
+    # Keyed by repr so equal but distinct values (True/1, 1.0/1) stay apart
+    return shared.setdefault(repr(value), value)
+
+
+def _freeze_args(block_type: str, key: str, args: Any,
+                 shared: Dict[Any, Any]) -> Tuple[Tuple[Tuple[str, Any], ...], ...]:
+    """Validate an ``argsN`` list and convert it to shared item tuples."""
+    if not isinstance(args, (list, tuple)):
+        raise BlockDefinitionError(f'{block_type}: {key} must be a list')
+
+    frozen = []
+    for position, arg in enumerate(args, 1):
+        if not isinstance(arg, dict) or not isinstance(arg.get('type'), str):
+            raise BlockDefinitionError(f'{block_type}: {key}[{position}] needs a type')
+        if arg['type'] in _NAMED_TYPES and not isinstance(arg.get('name'), str):
+            raise BlockDefinitionError(f'{block_type}: {key}[{position}] needs a name')
+
+        items = []
+        for name, value in arg.items():
+            if name == 'options':
+                value = _freeze_options(block_type, key, position, value, shared)
+            elif isinstance(value, (list, tuple)):
+                value = _share(shared, _freeze(value))
+            items.append((sys.intern(name), _intern(value)))
+        frozen.append(_share(shared, tuple(items)))
+
+    result: Tuple[Tuple[Tuple[str, Any], ...], ...] = _share(shared, tuple(frozen))
+    return result
+
+
+def _freeze_options(block_type: str, key: str, position: int, options: Any,
+                    shared: Dict[Any, Any]) -> Tuple[Tuple[str, str], ...]:
+    """Validate dropdown options and convert them to shared tuples."""
+    if not isinstance(options, (list, tuple)) or not options:
+        raise BlockDefinitionError(f'{block_type}: {key}[{position}] options must be a non-empty list')
+    for option in options:
+        if not isinstance(option, (list, tuple)) or len(option) != 2:
+            raise BlockDefinitionError(
+                f'{block_type}: {key}[{position}] options must be [label, value] pairs'
+            )
+    result: Tuple[Tuple[str, str], ...] = _share(shared, _freeze(options))
+    return result
+
+
+def _check_placeholders(block_type: str, key: str, message: str, args: Tuple) -> None:
+    """Check that every ``%N`` placeholder in a message has an argument."""
+    for match in _PLACEHOLDER.finditer(message):
+        index = int(match.group(1))
+        if index < 1 or index > len(args):
+            raise BlockDefinitionError(
+                f'{block_type}: {key} references %{index} but has {len(args)} arguments'
+            )
@@ -0,0 +1,365 @@
+"""
+Headless interpreter for R1 creation workspaces.
+
+Executes the workspace block graph directly, with the same semantics as the
+code produced by ``compiler.py``, against simulated device events and a
+virtual clock. Nothing runs in real time: ``advance`` jumps straight to the
+next timer or wait, so long scenarios finish in microseconds. Side effects
+(notifications, speech, storage writes and web requests) are recorded for
+assertions, and web requests are answered by a local stub.
+
+Example::
+
+    sim = Simulator(workspace_xml)
+    sim.start()
+    sim.voice_command('hello')
+    sim.advance(5000)
+    assert sim.speech == [{'time': 0, 'kind': 'speech', ...}]
+"""
+
+import heapq
+import itertools
+import math
+from typing import Any, Callable, Dict, Generator, List, Optional, Tuple, Union
+
+from .compiler import _interval_ms, hardware_button_event
+from .workspace import Block, parse_workspace
+
+# A running handler: yields the number of milliseconds to wait
+Task = Generator[float, None, None]
+
+# Web stub: (method, url) -> (status, body)
+WebStub = Callable[[str, str], Tuple[int, Any]]
+
+# Browsers clamp repeating timers; this also keeps ``advance`` finite
+MIN_INTERVAL_MS = 4.0
+
+
+class SimulationError(Exception):
+    """Raised when a workspace cannot be simulated."""
+
+
+def default_web_stub(method: str, url: str) -> Tuple[int, Any]:
+    """Answer every web request with an empty JSON object."""
+    return 200, {}
+
+
+def web_stub_from_dict(responses: Dict[str, Any], default: Any = None) -> WebStub:
+    """
+    Build a web stub from canned responses.
+
+    Keys are ``'METHOD url'`` or a bare ``url``; values are a body or a
+    ``(status, body)`` pair. Unmatched requests get ``default``, or a 404.
+    """
+    def stub(method: str, url: str) -> Tuple[int, Any]:
+        response = responses.get(f'{method} {url}', responses.get(url, default))
+        if response is None:
+            return 404, None
+        if isinstance(response, (list, tuple)) and len(response) == 2:
+            return int(response[0]), response[1]
+        return 200, response
+    return stub
+
+
+def _number(value: str, default: float) -> float:
+    """Parse a numeric field like the generated JavaScript would."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class Simulator:
+    """Run a workspace against simulated events in virtual time."""
+
+    def __init__(self, workspace: Union[str, List[Block]],
+                 web_stub: Optional[WebStub] = None):
+        self.stacks = parse_workspace(workspace) if isinstance(workspace, str) else workspace
+        self.web_stub = web_stub or default_web_stub
+        self.now = 0.0
+        self.started = False
+        self.effects: List[Dict[str, Any]] = []
+        self.storage: Dict[str, Dict[str, str]] = {'plain': {}, 'secure': {}}
+        self.unsupported: List[str] = []
+        self._listeners: Dict[str, List[Tuple[Block, Callable[..., bool]]]] = {}
+        self._queue: List[Tuple[float, int, Callable[[], None]]] = []
+        self._sequence = itertools.count()
+
+        self.triggers: Dict[str, Callable[[Block], None]] = {
+            'voice_command': self._register_voice_command,
+            'timer_trigger': self._register_timer,
+            'hardware_button': self._register_hardware_button,
+            'accelerometer_trigger': self._register_accelerometer,
+        }
+        self.actions: Dict[str, Callable[[Block], Optional[float]]] = {
+            'send_notification': self._send_notification,
+            'speak_text': self._speak_text,
+            'web_request': self._web_request,
+            'store_data': self._store_data,
+            'wait_block': self._wait,
+        }
+
+    # Recorded effects
+
+    def _record(self, kind: str, **data: Any):
+        self.effects.append(dict(time=self.now, kind=kind, **data))
+
+    def effects_of(self, kind: str) -> List[Dict[str, Any]]:
+        """Get the recorded effects of one kind, in order."""
+        return [effect for effect in self.effects if effect['kind'] == kind]
+
+    @property
+    def notifications(self) -> List[Dict[str, Any]]:
+        return self.effects_of('notification')
+
+    @property
+    def speech(self) -> List[Dict[str, Any]]:
+        return self.effects_of('speech')
+
+    @property
+    def storage_writes(self) -> List[Dict[str, Any]]:
+        return self.effects_of('storage_write')
+
+    @property
+    def web_requests(self) -> List[Dict[str, Any]]:
+        return self.effects_of('web_request')
+
+    # Scheduling
+
+    def _schedule(self, delay: float, callback: Callable[[], None]):
+        heapq.heappush(self._queue, (self.now + delay, next(self._sequence), callback))
+
+    def _run_task(self, task: Task):
+        """Run a task until it finishes or waits, scheduling its resumption."""
+        try:
+            delay = next(task)
+        except StopIteration:
+            return
+        self._schedule(delay, lambda: self._run_task(task))
+
+    def advance(self, milliseconds: float):
+        """Move virtual time forward, running every timer and wait that falls due."""
+        self.advance_to(self.now + milliseconds)
+
+    def advance_to(self, time: float):
+        """Move virtual time forward to ``time``."""
+        if not self.started:
+            self.start()
+        while self._queue and self._queue[0][0] <= time:
+            due, _, callback = heapq.heappop(self._queue)
+            self.now = due
+            callback()
+        self.now = max(self.now, time)
+
+    # Execution
+
+    def start(self):
+        """Run the program body: execute top-level stacks and register triggers."""
+        if self.started:
+            return
+        self.started = True
+        self._run_task(self._run_program())
+
+    def _run_program(self) -> Task:
+        # Top-level stacks run in order within one async function, so a wait
+        # in an early stack delays the stacks after it
+        for stack in self.stacks:
+            yield from self._run_chain(stack)
+
+    def _run_chain(self, block: Optional[Block]) -> Task:
+        for current in block.chain() if block else ():
+            register = self.triggers.get(current.type)
+            if register is not None:
+                # Triggers take the rest of their chain as the handler body
+                register(current)
+                return
+            action = self.actions.get(current.type)
+            if action is None:
+                if current.type not in self.unsupported:
+                    self.unsupported.append(current.type)
+                continue
+            delay = action(current)
+            if delay is not None:
+                yield delay
+
+    def _listen(self, event_name: str, block: Block, matches: Callable[..., bool]):
+        self._listeners.setdefault(event_name, []).append((block, matches))
+
+    def dispatch(self, event_name: str, **detail: Any) -> int:
+        """
+        Dispatch a window event, running matching handlers up to their first wait.
+
+        Returns the number of handlers that ran.
+        """
+        if not self.started:
+            self.start()
+        ran = 0
+        for block, matches in list(self._listeners.get(event_name, ())):
+            if matches(**detail):
+                ran += 1
+                self._run_task(self._run_chain(block.next))
+        return ran
+
+    # Triggers
+
+    def _register_voice_command(self, block: Block):
+        command = block.get_field('COMMAND', 'hello').lower()
+
+        def matches(command_text: str = '', **_: Any) -> bool:
+            return bool(command_text) and command in command_text.lower()
+        self._listen('voiceCommand', block, matches)
+
+    def _register_timer(self, block: Block):
+        interval = float(_interval_ms(
+            block.get_field('INTERVAL', '5'), block.get_field('UNIT', 'SECONDS'), 5
+        ))
+        interval = max(interval, MIN_INTERVAL_MS)
+
+        def tick():
+            self._run_task(self._run_chain(block.next))
+            self._schedule(interval, tick)
+        self._schedule(interval, tick)
+
+    def _register_hardware_button(self, block: Block):
+        event_name = hardware_button_event(
+            block.get_field('BUTTON', 'SIDE'), block.get_field('ACTION', 'CLICK')
+        )
+        self._listen(event_name, block, lambda **_: True)
+
+    def _register_accelerometer(self, block: Block):
+        direction = block.get_field('DIRECTION', 'LEFT')
+        threshold = _number(block.get_field('THRESHOLD', '0.5'), 0.5)
+
+        def matches(x: float = 0.0, y: float = 0.0, **_: Any) -> bool:
+            return ((direction == 'LEFT' and x < -threshold) or
+                    (direction == 'RIGHT' and x > threshold) or
+                    (direction == 'FORWARD' and y > threshold) or
+                    (direction == 'BACKWARD' and y < -threshold))
+        self._listen('accelerometer', block, matches)
+
+    # Actions
+
+    def _send_notification(self, block: Block) -> None:
+        self._record('notification', message=block.get_field('MESSAGE', 'Hello from R1!'))
+
+    def _speak_text(self, block: Block) -> None:
+        self._record(
+            'speech',
+            text=block.get_field('TEXT', 'Hello'),
+            save_to_journal=block.get_field('SAVE_TO_JOURNAL') == 'TRUE',
+        )
+
+    def _web_request(self, block: Block) -> None:
+        method = block.get_field('METHOD', 'GET')
+        url = block.get_field('URL', 'https://api.example.com')
+        status, body = self.web_stub(method, url)
+        # The request is not awaited, so it never delays the handler
+        self._record('web_request', method=method, url=url, status=status, response=body)
+
+    def _store_data(self, block: Block) -> None:
+        storage_type = block.get_field('STORAGE_TYPE', 'plain')
+        key = block.get_field('KEY', 'my_key')
+        value = block.get_field('VALUE', 'my data')
+        self.storage.setdefault(storage_type, {})[key] = value
+        self._record('storage_write', storage=storage_type, key=key, value=value)
+
+    def _wait(self, block: Block) -> float:
+        unit = 'MINUTES' if block.get_field('UNIT', 'SECONDS') == 'MINUTES' else 'SECONDS'
+        return float(_interval_ms(block.get_field('DURATION', '1'), unit, 1))
+
+    # Simulated device events
+
+    def voice_command(self, command: str) -> int:
+        """Simulate a recognised voice command."""
+        return self.dispatch('voiceCommand', command_text=command)
+
+    def side_click(self) -> int:
+        """Simulate a click on the side (PTT) button."""
+        return self.dispatch('sideClick')
+
+    def long_press_start(self) -> int:
+        return self.dispatch('longPressStart')
+
+    def long_press_end(self) -> int:
+        return self.dispatch('longPressEnd')
+
+    def scroll_up(self) -> int:
+        return self.dispatch('scrollUp')
+
+    def scroll_down(self) -> int:
+        return self.dispatch('scrollDown')
+
+    def accelerometer(self, x: float = 0.0, y: float = 0.0, z: float = 0.0) -> int:
+        """Deliver one accelerometer sample to subscribed triggers."""
+        return self.dispatch('accelerometer', x=x, y=y, z=z)
+
+
+def _step_number(value: Any, what: str) -> float:
+    """Check a numeric step value; raises ValueError naming ``what``."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f'{what} must be a finite number, got {value!r}')
+    return float(value)
+
+
+def _step_voice(sim: 'Simulator', value: Any) -> int:
+    if not isinstance(value, str):
+        raise ValueError(f'voice must be a string, got {value!r}')
+    return sim.voice_command(value)
+
+
+def _step_accelerometer(sim: 'Simulator', value: Any) -> int:
+    if not isinstance(value, dict):
+        raise ValueError('accelerometer must be an object with x, y and z')
+    unknown = sorted(set(value) - {'x', 'y', 'z'})
+    if unknown:
+        raise ValueError(f"accelerometer has unknown axes: {', '.join(map(str, unknown))}")
+    return sim.accelerometer(**{axis: _step_number(reading, f'accelerometer.{axis}')
+                                for axis, reading in value.items()})
+
+
+def _step_advance(sim: 'Simulator', value: Any):
+    milliseconds = _step_number(value, 'advance')
+    if milliseconds < 0:
+        raise ValueError(f'advance must not be negative, got {value!r}')
+    sim.advance(milliseconds)
+
+
+# Scenario step name -> handler taking the simulator and the step value
+SCENARIO_STEPS = {
+    'voice': _step_voice,
+    'side_click': lambda sim, value: sim.side_click(),
+    'long_press_start': lambda sim, value: sim.long_press_start(),
+    'long_press_end': lambda sim, value: sim.long_press_end(),
+    'scroll_up': lambda sim, value: sim.scroll_up(),
+    'scroll_down': lambda sim, value: sim.scroll_down(),
+    'accelerometer': _step_accelerometer,
+    'advance': _step_advance,
+}
+
+
+def run_scenario(workspace: Union[str, List[Block]], steps: List[Dict[str, Any]],
+                 web_stub: Optional[WebStub] = None) -> Simulator:
+    """
+    Run a scripted scenario and return the simulator with its recorded effects.
+
+    Each step is a one-key dict, e.g. ``{'voice': 'hello'}``,
+    ``{'advance': 5000}`` or ``{'accelerometer': {'x': -0.8}}``. Pass the
+    parsed stacks from ``parse_workspace`` to share one parse across many
+    scenarios.
+    """
+    if not isinstance(steps, list):
+        raise SimulationError('Scenario steps must be a list')
+    sim = Simulator(workspace, web_stub)
+    sim.start()
+    for position, step in enumerate(steps, 1):
+        if not isinstance(step, dict) or len(step) != 1:
+            raise SimulationError(f'Step {position} must be a single-key object')
+        (name, value), = step.items()
+        handler = SCENARIO_STEPS.get(name)
+        if handler is None:
+            raise SimulationError(f'Step {position}: unknown step {name!r}')
+        try:
+            handler(sim, value)
+        except ValueError as error:
+            raise SimulationError(f'Step {position}: {error}') from error
+    return sim
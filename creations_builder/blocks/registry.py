@@ -3,16 +3,34 @@ Block registry system for managing custom Blockly blocks.
 """
 
 import json
-from typing import Dict, List, Any
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Any, Optional
+
+from .definition import BlockDefinition, BlockDefinitionError
+
+# Bump when the snapshot layout changes
+SNAPSHOT_FORMAT = 1
+
+# Dict forms kept for ``get_block``; older ones are rebuilt on request
+DICT_CACHE_SIZE = 256
 
 
 class BlockRegistry:
     """Registry for managing custom Blockly blocks."""
     
-    def __init__(self):
+    def __init__(self, load_defaults: bool = True):
         """Initialize the block registry with default R1 creation blocks."""
-        self.blocks = {}
-        self._load_default_blocks()
+        # Flat type -> definition index, plus category -> types (in order)
+        self._index: Dict[str, BlockDefinition] = {}
+        self._categories: Dict[str, Dict[str, None]] = {}
+        # Argument/option tuples shared between definitions
+        self._shared: Dict[Any, Any] = {}
+        # Recently requested dict forms, at most DICT_CACHE_SIZE of them
+        self._dicts: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        # Bumped on every registration so derived artifacts can be rebuilt
+        self.revision = 0
+        if load_defaults:
+            self._load_default_blocks()
     
     def _load_default_blocks(self):
         """Load default blocks for R1 creations."""
@@ -353,24 +371,121 @@ function(block) {
         })
     
     def register_block(self, category: str, block_type: str, block_definition: Dict[str, Any]):
-        """Register a new block in the registry."""
-        if category not in self.blocks:
-            self.blocks[category] = {}
+        """
+        Register a new block in the registry.
+        
+        Raises BlockDefinitionError if the definition is malformed. Block types
+        are unique; registering an existing type replaces it.
+        """
+        definition = BlockDefinition.from_dict(category, block_type, block_definition, self._shared)
+        
+        previous = self._index.get(block_type)
+        if previous is not None and previous.category != category:
+            del self._categories[previous.category][block_type]
+            if not self._categories[previous.category]:
+                del self._categories[previous.category]
         
-        self.blocks[category][block_type] = block_definition
+        self._index[block_type] = definition
+        self._categories.setdefault(definition.category, {})[block_type] = None
+        self._dicts.pop(block_type, None)
+        self.revision += 1
+    
+    @property
+    def blocks(self) -> Dict[str, Dict[str, Any]]:
+        """All blocks as nested category -> type -> definition dicts."""
+        return self.get_all_blocks()
     
     def get_all_blocks(self) -> Dict[str, Dict[str, Any]]:
-        """Get all registered blocks."""
-        return self.blocks
+        """Get all registered blocks, as dicts built for this call."""
+        return {category: self.get_blocks_by_category(category) for category in self._categories}
     
     def get_blocks_by_category(self, category: str) -> Dict[str, Any]:
-        """Get blocks by category."""
-        return self.blocks.get(category, {})
+        """Get blocks by category, as dicts built for this call."""
+        index = self._index
+        return {
+            block_type: index[block_type].to_dict()
+            for block_type in self._categories.get(category, ())
+        }
     
     def get_block(self, category: str, block_type: str) -> Dict[str, Any]:
-        """Get a specific block definition."""
-        return self.blocks.get(category, {}).get(block_type, {})
+        """
+        Get a specific block definition.
+        
+        The most recently built dict forms are reused, so treat the result as
+        read-only. Internal callers should use ``get_definition``.
+        """
+        definition = self._index.get(block_type)
+        if definition is None or definition.category != category:
+            return {}
+        dicts = self._dicts
+        block = dicts.get(block_type)
+        if block is None:
+            block = dicts[block_type] = definition.to_dict()
+            while len(dicts) > DICT_CACHE_SIZE:
+                try:
+                    dicts.popitem(last=False)
+                except KeyError:
+                    break
+        return block
+    
+    def get_definition(self, block_type: str) -> Optional[BlockDefinition]:
+        """Get the compact definition for a block type, or None."""
+        return self._index.get(block_type)
+    
+    def iter_definitions(self) -> Iterator[BlockDefinition]:
+        """Iterate over all definitions in category order."""
+        index = self._index
+        for block_types in self._categories.values():
+            for block_type in block_types:
+                yield index[block_type]
     
     def get_categories(self) -> List[str]:
         """Get all available categories."""
-        return list(self.blocks.keys())
+        return list(self._categories.keys())
+    
+    def get_category_types(self, category: str) -> List[str]:
+        """Get the block types registered in a category."""
+        return list(self._categories.get(category, ()))
+    
+    def to_snapshot(self) -> Dict[str, Any]:
+        """Get every registered block as JSON-serializable snapshot data."""
+        return {
+            'format': SNAPSHOT_FORMAT,
+            'blocks': [
+                [definition.category, definition.type, definition.to_dict()]
+                for definition in self.iter_definitions()
+            ]
+        }
+    
+    def write_snapshot(self, path: str):
+        """Write a snapshot that ``from_snapshot`` can load."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_snapshot(), f, separators=(',', ':'))
+    
+    @classmethod
+    def from_snapshot(cls, path: str) -> 'BlockRegistry':
+        """
+        Load a registry from a snapshot file instead of the built-in definitions.
+        
+        Snapshots are written by ``write_snapshot`` (``creations-builder
+        build-blocks``) and can include blocks from packs registered at build time.
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_snapshot_data(json.load(f))
+    
+    @classmethod
+    def from_snapshot_data(cls, snapshot: Dict[str, Any]) -> 'BlockRegistry':
+        """Load a registry from snapshot data as returned by ``to_snapshot``."""
+        if snapshot.get('format') != SNAPSHOT_FORMAT:
+            raise BlockDefinitionError('Unsupported registry snapshot format')
+        
+        registry = cls(load_defaults=False)
+        for category, block_type, definition in snapshot['blocks']:
+            registry.register_block(category, block_type, definition)
+        return registry
+    
+    def __contains__(self, block_type: str) -> bool:
+        return block_type in self._index
+    
+    def __len__(self) -> int:
+        return len(self._index)
@@ -0,0 +1,241 @@
+"""
+Workspace parsing for Blockly XML and JSON serializations.
+
+The editor saves workspaces either as Blockly XML or, on newer Blockly
+versions, as the JSON produced by ``Blockly.serialization``. Both are
+normalized here into a small tree of ``Block`` objects that the server-side
+tools can walk without caring which format the client sent.
+
+Blocks nested inside other blocks' inputs are limited to ``MAX_NESTING``
+levels, so the recursive walks over inputs (here and in the compiler) stay
+far from the interpreter's recursion limit. ``next`` chains are unlimited.
+"""
+
+import json
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, Iterator, List, Optional
+
+# Deepest input nesting accepted from a workspace
+MAX_NESTING = 100
+
+
+class WorkspaceParseError(ValueError):
+    """Raised when workspace text is neither valid Blockly XML nor JSON."""
+
+
+class Block:
+    """A single block and the blocks attached below it."""
+
+    __slots__ = ('type', 'id', 'fields', 'inputs', 'next', 'x', 'y')
+
+    def __init__(self, block_type: str, block_id: str = '',
+                 fields: Optional[Dict[str, str]] = None,
+                 inputs: Optional[Dict[str, 'Block']] = None,
+                 next_block: Optional['Block'] = None,
+                 x: float = 0, y: float = 0):
+        self.type = block_type
+        self.id = block_id
+        self.fields = fields or {}
+        self.inputs = inputs or {}
+        self.next = next_block
+        self.x = x
+        self.y = y
+
+    def get_field(self, name: str, default: str = '') -> str:
+        """Get a field value, falling back to ``default`` when unset or empty."""
+        value = self.fields.get(name)
+        return value if value not in (None, '') else default
+
+    def chain(self) -> Iterator['Block']:
+        """Iterate over this block and every block connected after it."""
+        block: Optional[Block] = self
+        while block is not None:
+            yield block
+            block = block.next
+
+    def walk(self) -> Iterator['Block']:
+        """Iterate over every block in this subtree, depth first."""
+        for block in self.chain():
+            yield block
+            for name in sorted(block.inputs):
+                yield from block.inputs[name].walk()
+
+    def canonical(self) -> Any:
+        """
+        Get a position- and id-independent representation of the subtree.
+
+        Two stacks with the same canonical form generate the same code, so it
+        is what compile caches key on.
+        """
+        return [
+            [
+                block.type,
+                sorted(block.fields.items()),
+                [[name, block.inputs[name].canonical()] for name in sorted(block.inputs)],
+            ]
+            for block in self.chain()
+        ]
+
+    def __repr__(self) -> str:
+        return f'Block({self.type!r}, id={self.id!r})'
+
+
+def parse_workspace(workspace_text: str) -> List[Block]:
+    """Parse workspace XML or JSON into its top-level block stacks."""
+    text = (workspace_text or '').strip()
+    if not text:
+        return []
+
+    if text.startswith('{'):
+        try:
+            state = json.loads(text)
+        except (ValueError, RecursionError) as error:
+            # The json module recurses per nesting level, so very long
+            # ``next`` chains exceed the interpreter's recursion limit
+            raise WorkspaceParseError(f'Invalid workspace JSON: {error}') from error
+        blocks = _json_object(_json_object(state, 'workspace').get('blocks'), 'blocks').get('blocks') or []
+        if not isinstance(blocks, list):
+            raise WorkspaceParseError('Invalid workspace JSON: "blocks" must be a list')
+        return [_block_from_json(block) for block in blocks]
+
+    try:
+        root = ET.fromstring(text)
+    except ET.ParseError as error:
+        raise WorkspaceParseError(f'Invalid workspace XML: {error}') from error
+    return [
+        _block_from_xml(element)
+        for element in root
+        if _local_name(element.tag) == 'block'
+    ]
+
+
+def count_blocks(stacks: List[Block]) -> int:
+    """Count all blocks in a list of top-level stacks."""
+    return sum(1 for stack in stacks for _ in stack.walk())
+
+
+def _local_name(tag: str) -> str:
+    """Strip the XML namespace from a tag name."""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _check_nesting(depth: int):
+    if depth > MAX_NESTING:
+        raise WorkspaceParseError(f'Blocks are nested more than {MAX_NESTING} levels deep')
+
+
+def _coordinate(value: Any) -> float:
+    """Read a block's ``x`` or ``y`` position."""
+    if isinstance(value, bool):
+        raise WorkspaceParseError(f'Invalid block position: {value!r}')
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError) as error:
+        raise WorkspaceParseError(f'Invalid block position: {value!r}') from error
+
+
+def _block_from_xml(element: ET.Element, depth: int = 0) -> Block:
+    """Build a block chain from a ``<block>`` element."""
+    _check_nesting(depth)
+    # ``next`` chains are followed in a loop, so long stacks do not recurse
+    first: Optional[Block] = None
+    previous: Optional[Block] = None
+    current: Optional[ET.Element] = element
+    while current is not None:
+        block = Block(
+            current.get('type', ''),
+            current.get('id', ''),
+            x=_coordinate(current.get('x')),
+            y=_coordinate(current.get('y')),
+        )
+        if previous is None:
+            first = block
+        else:
+            previous.next = block
+        previous = block
+
+        next_element = None
+        for child in current:
+            tag = _local_name(child.tag)
+            if tag == 'field':
+                block.fields[child.get('name', '')] = child.text or ''
+            elif tag in ('value', 'statement'):
+                inner = _first_block(child)
+                if inner is not None:
+                    block.inputs[child.get('name', '')] = _block_from_xml(inner, depth + 1)
+            elif tag == 'next':
+                next_element = _first_block(child)
+        current = next_element
+
+    assert first is not None
+    return first
+
+
+def _first_block(element: ET.Element) -> Optional[ET.Element]:
+    """Get the ``<block>`` (or ``<shadow>``) child of a connection element."""
+    shadow = None
+    for child in element:
+        tag = _local_name(child.tag)
+        if tag == 'block':
+            return child
+        if tag == 'shadow' and shadow is None:
+            shadow = child
+    return shadow
+
+
+def _json_object(value: Any, what: str) -> Dict[str, Any]:
+    """Check that a part of a JSON workspace is an object (a missing one is empty)."""
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        raise WorkspaceParseError(f'Invalid workspace JSON: {what} must be an object')
+    return value
+
+
+def _block_from_json(state: Any, depth: int = 0) -> Block:
+    """Build a block chain from a Blockly JSON block state."""
+    _check_nesting(depth)
+    # ``next`` chains are followed in a loop, so long stacks do not recurse
+    first: Optional[Block] = None
+    previous: Optional[Block] = None
+    current: Optional[Dict[str, Any]] = _json_object(state, 'block')
+    while current:
+        block_type = current.get('type', '')
+        if not isinstance(block_type, str):
+            raise WorkspaceParseError('Invalid workspace JSON: block type must be a string')
+
+        fields = {}
+        for name, value in _json_object(current.get('fields'), 'fields').items():
+            if isinstance(value, bool):
+                value = 'TRUE' if value else 'FALSE'
+            elif isinstance(value, dict):
+                # Variable fields serialize as {"id": ...}
+                value = value.get('name') or value.get('id', '')
+            fields[name] = str(value)
+
+        inputs = {}
+        for name, connection in _json_object(current.get('inputs'), 'inputs').items():
+            connection = _json_object(connection, 'input')
+            inner = connection.get('block') or connection.get('shadow')
+            if inner:
+                inputs[name] = _block_from_json(inner, depth + 1)
+
+        block = Block(
+            block_type,
+            str(current.get('id', '')),
+            fields=fields,
+            inputs=inputs,
+            x=_coordinate(current.get('x')),
+            y=_coordinate(current.get('y')),
+        )
+        if previous is None:
+            first = block
+        else:
+            previous.next = block
+        previous = block
+
+        next_state = _json_object(current.get('next'), 'next')
+        current = _json_object(next_state.get('block') or next_state.get('shadow'), 'block')
+
+    assert first is not None
+    return first
@@ -0,0 +1,390 @@
+"""
+Incremental, reproducible builds of workspace directories.
+
+Every workspace file (``.xml`` or ``.json``) under a source directory is
+compiled and exported into the output directory, mirroring its relative path.
+A ``build-manifest.json`` records the hash of every input that affects an
+entry's output: the workspace file, the creation template, the block registry
+version and the build options. On the next run an entry is only rebuilt when
+one of those changed or its outputs are missing.
+
+Exports embed a creation timestamp. For byte-identical rebuilds the timestamp
+can be fixed, or taken from ``SOURCE_DATE_EPOCH`` (the Unix epoch when unset),
+so it never depends on when or where the sources were checked out.
+
+Workspaces using blocks the compiler cannot generate fail to build, since
+those blocks would be left out of the creation, unless unsupported blocks are
+explicitly allowed.
+
+With ``optimize_assets``, images referenced by HTML exports are optimized for
+the R1 screen (see ``creations_builder.assets``) and written to a shared
+``assets/`` directory; the optimized images are cached in ``.asset-cache``.
+"""
+
+import hashlib
+import json
+import os
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from .assets import DEFAULT_ASSET_ROOT, AssetPipeline, load_pillow
+from .exports import (
+    export_filename, load_creation_template, render_creation_html,
+    render_creation_json, render_creation_xml,
+)
+from .blocks.bundle import build_block_bundle
+from .blocks.compiler import StackCompiler
+from .blocks.registry import BlockRegistry
+from .blocks.workspace import parse_workspace
+
+MANIFEST_NAME = 'build-manifest.json'
+
+# Bump when the build output changes for identical inputs (e.g. generator changes)
+BUILD_FORMAT = '1'
+
+BUILD_FORMATS = ('html', 'json', 'xml')
+WORKSPACE_EXTENSIONS = ('.xml', '.json')
+
+# Timestamp of deterministic builds when SOURCE_DATE_EPOCH is not set
+DEFAULT_SOURCE_DATE_EPOCH = 0
+
+ASSET_DIR = 'assets'
+ASSET_CACHE_DIR = '.asset-cache'
+
+
+class BuildError(Exception):
+    """Raised when a build cannot proceed."""
+
+
+def sha256_bytes(data: bytes) -> str:
+    """Hex SHA-256 digest of ``data``."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def find_workspaces(source_dir: str, exclude: Iterable[str] = ()) -> List[str]:
+    """Find workspace files under ``source_dir``, as sorted relative paths."""
+    excluded = {os.path.abspath(path) for path in exclude}
+    found = []
+    for root, dirs, files in os.walk(source_dir):
+        dirs[:] = sorted(
+            name for name in dirs
+            if not name.startswith('.') and os.path.abspath(os.path.join(root, name)) not in excluded
+        )
+        for name in files:
+            if name == MANIFEST_NAME or not name.lower().endswith(WORKSPACE_EXTENSIONS):
+                continue
+            found.append(os.path.relpath(os.path.join(root, name), source_dir))
+    return sorted(found)
+
+
+def read_workspace_source(text: str, default_name: str) -> Tuple[str, str]:
+    """
+    Get ``(name, workspace_text)`` from a workspace file.
+
+    Accepts plain Blockly XML or JSON, as well as the ``/api/export/json`` and
+    ``/api/export/xml`` formats, which wrap the workspace with metadata.
+    """
+    stripped = text.strip()
+
+    if stripped.startswith('{'):
+        try:
+            data = json.loads(stripped)
+        except ValueError as error:
+            raise BuildError(f'Invalid JSON: {error}') from error
+        if isinstance(data, dict) and 'workspace_xml' in data:
+            return data.get('name') or default_name, data.get('workspace_xml') or ''
+        return default_name, stripped
+
+    if stripped.startswith('<?xml'):
+        stripped = stripped.split('?>', 1)[-1].strip()
+    try:
+        root = ET.fromstring(stripped)
+    except ET.ParseError as error:
+        raise BuildError(f'Invalid XML: {error}') from error
+    if root.tag == 'r1_creation':
+        workspace = root.find('workspace')
+        inner = list(workspace) if workspace is not None else []
+        workspace_text = ET.tostring(inner[0], encoding='unicode') if inner else ''
+        return root.get('name') or default_name, workspace_text
+    return default_name, stripped
+
+
+def resolve_timestamp(timestamp: Optional[str], deterministic: bool) -> Optional[str]:
+    """
+    Get the ``created_at`` value to embed in exports.
+
+    An explicit ``timestamp`` wins. In deterministic mode the timestamp comes
+    from ``SOURCE_DATE_EPOCH`` if set, else ``DEFAULT_SOURCE_DATE_EPOCH``, in
+    UTC. Otherwise returns None (the current time is used).
+    """
+    if timestamp:
+        return timestamp
+    if not deterministic:
+        return None
+
+    epoch = os.environ.get('SOURCE_DATE_EPOCH')
+    if epoch:
+        try:
+            seconds = int(epoch)
+        except ValueError as error:
+            raise BuildError(f'Invalid SOURCE_DATE_EPOCH: {epoch!r}') from error
+    else:
+        seconds = DEFAULT_SOURCE_DATE_EPOCH
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).isoformat()
+
+
+def load_manifest(output_dir: str) -> Dict[str, Any]:
+    """Load the previous build manifest, or an empty one."""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            manifest: Dict[str, Any] = json.load(f)
+    except (OSError, ValueError):
+        return {'entries': {}}
+    if not isinstance(manifest, dict):
+        return {'entries': {}}
+    if not isinstance(manifest.get('entries'), dict):
+        manifest['entries'] = {}
+    return manifest
+
+
+def write_manifest(output_dir: str, manifest: Dict[str, Any]):
+    """Write the build manifest with stable key order."""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+class Builder:
+    """Incrementally build a directory of workspaces into creation exports."""
+
+    def __init__(self, source_dir: str, output_dir: str,
+                 formats: Iterable[str] = BUILD_FORMATS,
+                 timestamp: Optional[str] = None, deterministic: bool = False,
+                 template_folder: Optional[str] = None,
+                 registry: Optional[BlockRegistry] = None,
+                 optimize_assets: bool = False, allow_unsupported: bool = False):
+        formats = tuple(sorted(set(formats)))
+        unknown = [fmt for fmt in formats if fmt not in BUILD_FORMATS]
+        if unknown:
+            raise BuildError(f"Unknown format(s): {', '.join(unknown)}")
+        if not os.path.isdir(source_dir):
+            raise BuildError(f'Source directory not found: {source_dir}')
+
+        self.source_dir = source_dir
+        self.output_dir = output_dir
+        self.formats = formats
+        self.timestamp = timestamp
+        self.deterministic = deterministic
+        self.template = load_creation_template(template_folder)
+        self.template_hash = sha256_bytes(self.template.encode('utf-8'))
+        self.registry_version = build_block_bundle(registry or BlockRegistry()).digest
+        self.compiler = StackCompiler()
+        self.allow_unsupported = allow_unsupported
+        self.asset_pipeline = None
+        if optimize_assets:
+            self.asset_pipeline = AssetPipeline(
+                os.path.join(output_dir, ASSET_CACHE_DIR),
+                asset_roots=[source_dir, DEFAULT_ASSET_ROOT]
+            )
+
+    def options(self) -> Dict[str, Any]:
+        """Build options that affect every entry's output."""
+        return {
+            'formats': list(self.formats),
+            'timestamp': self.timestamp,
+            'deterministic': self.deterministic,
+            'source_date_epoch': os.environ.get('SOURCE_DATE_EPOCH') if self.deterministic else None,
+            'assets': self.asset_options(),
+        }
+
+    def asset_options(self) -> Optional[Dict[str, Any]]:
+        """Asset optimization settings, or None when assets are left alone."""
+        if self.asset_pipeline is None:
+            return None
+        return {
+            'settings': self.asset_pipeline.settings_key(),
+            'inline_limit': self.asset_pipeline.inline_limit,
+            # Without Pillow images are passed through, so the output differs
+            'pillow': load_pillow() is not None,
+        }
+
+    def entry_inputs(self, source_hash: str, created_at: Optional[str]) -> Dict[str, Any]:
+        """Everything an entry's output depends on."""
+        return {
+            'source': source_hash,
+            'created_at': created_at,
+            'template': self.template_hash,
+            'registry': self.registry_version,
+            'build_format': BUILD_FORMAT,
+            'options': self.options(),
+        }
+
+    def is_current(self, entry: Optional[Dict[str, Any]], inputs: Dict[str, Any]) -> bool:
+        """Whether a manifest entry was built from ``inputs`` and its outputs are intact."""
+        if not entry or entry.get('inputs') != inputs:
+            return False
+        for relative_path, digest in (entry.get('outputs') or {}).items():
+            path = os.path.join(self.output_dir, relative_path)
+            try:
+                with open(path, 'rb') as f:
+                    if sha256_bytes(f.read()) != digest:
+                        return False
+            except OSError:
+                return False
+        # Referenced images are inputs too
+        for reference, digest in (entry.get('assets') or {}).items():
+            data = self.asset_pipeline.load(reference) if self.asset_pipeline else None
+            if data is None or sha256_bytes(data) != digest:
+                return False
+        return True
+
+    def render(self, relative_path: str, source_text: str,
+               created_at: Optional[str] = None) -> Tuple[Dict[str, Union[str, bytes]], Dict[str, str]]:
+        """
+        Compile one workspace and render its outputs, keyed by output path.
+
+        Also returns the images the outputs reference, as source digests keyed
+        by reference, when assets are optimized. Raises ``BuildError`` if the
+        workspace uses unsupported blocks and they are not allowed.
+        """
+        stem = os.path.splitext(os.path.basename(relative_path))[0]
+        name, workspace_text = read_workspace_source(source_text, stem)
+        if created_at is None:
+            created_at = datetime.now().isoformat()
+
+        stacks = parse_workspace(workspace_text)
+        unsupported = self.compiler.unsupported_types(stacks)
+        if unsupported and not self.allow_unsupported:
+            raise BuildError(f"Unsupported blocks: {', '.join(unsupported)}")
+        code = self.compiler.compile_stacks(stacks)['code']
+        subdir = os.path.dirname(relative_path)
+
+        rendered = {}
+        asset_sources: Dict[str, str] = {}
+        for fmt in self.formats:
+            if fmt == 'html':
+                content = render_creation_html(name, code, created_at, template_content=self.template)
+                if self.asset_pipeline is not None:
+                    # Assets are shared by all entries, at the top of the output directory
+                    asset_dir = '/'.join(['..'] * len(_split_path(subdir)) + [ASSET_DIR])
+                    content, assets, report = self.asset_pipeline.process_html(content, asset_dir)
+                    for path, data in assets.items():
+                        rendered[os.path.normpath(os.path.join(subdir, path)).replace(os.sep, '/')] = data
+                    asset_sources.update(
+                        (image['reference'], image['source_digest']) for image in report['images']
+                    )
+            elif fmt == 'json':
+                content = render_creation_json(name, workspace_text, code, created_at)
+            else:
+                content = render_creation_xml(name, workspace_text, created_at)
+            # Named after the source file so two workspaces never share an output
+            output_name = export_filename(stem, fmt)
+            rendered[os.path.join(subdir, output_name).replace(os.sep, '/')] = content
+        return rendered, asset_sources
+
+    def build(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Build every workspace, skipping entries whose inputs are unchanged.
+
+        Returns a summary with the built, skipped, removed and failed entries.
+        """
+        previous = load_manifest(self.output_dir)
+        previous_entries = previous['entries']
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        exclude = [self.output_dir] if _is_inside(self.output_dir, self.source_dir) else []
+        sources = find_workspaces(self.source_dir, exclude)
+        entries: Dict[str, Any] = {}
+        summary: Dict[str, Any] = {'built': [], 'skipped': [], 'removed': [], 'failed': {}}
+        created_at = resolve_timestamp(self.timestamp, self.deterministic)
+
+        claimed: Dict[str, str] = {}
+        for relative_path in sources:
+            key = relative_path.replace(os.sep, '/')
+            with open(os.path.join(self.source_dir, relative_path), 'rb') as f:
+                source_bytes = f.read()
+            inputs = self.entry_inputs(sha256_bytes(source_bytes), created_at)
+
+            entry = previous_entries.get(key)
+            if not force and self.is_current(entry, inputs):
+                entries[key] = entry
+                claimed.update((path, key) for path in entry['outputs'])
+                summary['skipped'].append(key)
+                continue
+
+            try:
+                rendered, asset_sources = self.render(relative_path, source_bytes.decode('utf-8'), created_at)
+            except (BuildError, ValueError) as error:
+                summary['failed'][key] = str(error)
+                continue
+
+            # Assets are named by content hash, so entries may share them
+            clash = next((path for path in rendered if path in claimed and not _is_asset(path)), None)
+            if clash:
+                summary['failed'][key] = f'Output {clash} is also produced by {claimed[clash]}'
+                continue
+
+            outputs = {}
+            for output_path, content in rendered.items():
+                data = content if isinstance(content, bytes) else content.encode('utf-8')
+                full_path = os.path.join(self.output_dir, output_path)
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                with open(full_path, 'wb') as f:
+                    f.write(data)
+                outputs[output_path] = sha256_bytes(data)
+                claimed[output_path] = key
+
+            entries[key] = {'inputs': inputs, 'outputs': outputs}
+            if asset_sources:
+                entries[key]['assets'] = asset_sources
+            summary['built'].append(key)
+
+        # Remove outputs of deleted sources and outputs no longer produced
+        for key, entry in previous_entries.items():
+            for output_path in entry.get('outputs') or {}:
+                if output_path in claimed:
+                    continue
+                try:
+                    os.remove(os.path.join(self.output_dir, output_path))
+                except OSError:
+                    pass
+            if key not in entries and key not in summary['failed']:
+                summary['removed'].append(key)
+
+        write_manifest(self.output_dir, {
+            'build_format': BUILD_FORMAT,
+            'template': self.template_hash,
+            'registry': self.registry_version,
+            'options': self.options(),
+            'entries': dict(sorted(entries.items())),
+        })
+        return summary
+
+
+def build_directory(source_dir: str, output_dir: str,
+                    formats: Iterable[str] = BUILD_FORMATS,
+                    timestamp: Optional[str] = None, deterministic: bool = False,
+                    force: bool = False, optimize_assets: bool = False,
+                    allow_unsupported: bool = False) -> Dict[str, Any]:
+    """Build a directory of workspaces; see ``Builder``."""
+    builder = Builder(source_dir, output_dir, formats, timestamp, deterministic,
+                      optimize_assets=optimize_assets, allow_unsupported=allow_unsupported)
+    return builder.build(force=force)
+
+
+def _is_inside(path: str, directory: str) -> bool:
+    """Whether ``path`` is ``directory`` or below it."""
+    path, directory = os.path.abspath(path), os.path.abspath(directory)
+    return os.path.commonpath([path, directory]) == directory
+
+
+def _split_path(path: str) -> List[str]:
+    """Split a relative path into its components."""
+    return [part for part in path.replace(os.sep, '/').split('/') if part]
+
+
+def _is_asset(output_path: str) -> bool:
+    """Whether an output path is a shared, content-addressed asset."""
+    return output_path.startswith(ASSET_DIR + '/')
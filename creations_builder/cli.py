@@ -1,43 +1,52 @@
 """
 Command-line interface for Creations Builder.
+
+Heavy modules (Flask, the app and its blueprints) are imported inside the
+commands that need them, so ``--help`` and build commands start quickly.
 """
 
+import os
 import sys
-import webbrowser
-from threading import Timer
 import click
-from .app import create_app
 
 
 def open_browser(url):
     """Open browser after a short delay to ensure server is running."""
+    import webbrowser
     webbrowser.open(url)
 
 
-@click.command()
+@click.group(invoke_without_command=True)
 @click.option('--host', default='127.0.0.1', help='Host to bind to')
 @click.option('--port', default=5000, help='Port to bind to')
 @click.option('--debug', is_flag=True, help='Enable debug mode')
 @click.option('--no-browser', is_flag=True, help='Don\'t open browser automatically')
-def main(host, port, debug, no_browser):
+@click.pass_context
+def main(ctx, host, port, debug, no_browser):
     """
     Launch the Creations Builder web interface.
-    
+
     This starts a local web server and opens the visual programming interface
     in your default browser.
     """
+    if ctx.invoked_subcommand is not None:
+        return
+
+    from threading import Timer
+    from .app import create_app
+
     app = create_app()
-    
+
     url = f"http://{host}:{port}"
-    
+
     if not no_browser:
         click.echo(f"Opening browser at {url}")
         Timer(1.5, open_browser, args=[url]).start()
     else:
         click.echo(f"Server running at {url}")
-    
+
     click.echo("Press Ctrl+C to stop the server")
-    
+
     try:
         app.run(host=host, port=port, debug=debug)
     except KeyboardInterrupt:
@@ -45,5 +54,169 @@ def main(host, port, debug, no_browser):
         sys.exit(0)
 
 
+@main.command('build-blocks')
+@click.option('--output', '-o', default='build/blocks', show_default=True,
+              help='Directory to write the bundle, manifest and registry snapshot to')
+def build_blocks(output):
+    """Compile the block registry into a content-hashed JS bundle and snapshot."""
+    from .blocks.bundle import write_block_bundle
+    from .blocks.registry import BlockRegistry
+
+    registry = BlockRegistry()
+    result = write_block_bundle(registry, output)
+    bundle = result['manifest']['bundle']
+    click.echo(f"Wrote {result['path']} ({bundle['size']} bytes)")
+
+    snapshot_path = os.path.join(output, 'registry.json')
+    registry.write_snapshot(snapshot_path)
+    click.echo(f"Wrote {snapshot_path} (load with BLOCK_REGISTRY_SNAPSHOT)")
+
+
+@main.command('build')
+@click.argument('source', type=click.Path(exists=True, file_okay=False))
+@click.option('--output', '-o', default='build/creations', show_default=True,
+              help='Directory to write exports and the build manifest to')
+@click.option('--format', '-f', 'formats', multiple=True, default=('html',), show_default=True,
+              type=click.Choice(['html', 'json', 'xml']), help='Export format (repeatable)')
+@click.option('--timestamp', default=None,
+              help='Fixed creation timestamp to embed in every export')
+@click.option('--deterministic', is_flag=True,
+              help='Embed SOURCE_DATE_EPOCH (default 0) as the timestamp, for reproducible output')
+@click.option('--force', is_flag=True, help='Rebuild every entry, even if unchanged')
+@click.option('--optimize-assets', is_flag=True,
+              help='Resize, inline and deduplicate images referenced by HTML exports')
+@click.option('--allow-unsupported', is_flag=True,
+              help='Build workspaces with blocks the compiler cannot generate (they are left out)')
+def build(source, output, formats, timestamp, deterministic, force, optimize_assets, allow_unsupported):
+    """Export every workspace in SOURCE, rebuilding only what changed."""
+    from .build import BuildError, build_directory
+
+    try:
+        summary = build_directory(source, output, formats, timestamp, deterministic, force,
+                                  optimize_assets, allow_unsupported)
+    except BuildError as error:
+        raise click.ClickException(str(error))
+
+    for key in summary['built']:
+        click.echo(f"Built {key}")
+    for key, message in summary['failed'].items():
+        click.echo(f"Failed {key}: {message}", err=True)
+    click.echo(
+        f"{len(summary['built'])} built, {len(summary['skipped'])} up to date, "
+        f"{len(summary['removed'])} removed, {len(summary['failed'])} failed"
+    )
+    if summary['failed']:
+        sys.exit(1)
+
+
+@main.command('optimize-images')
+@click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option('--output', '-o', default='build/images', show_default=True,
+              help='Directory to write optimized images to')
+@click.option('--size', default='240x282', show_default=True,
+              help='Maximum WIDTHxHEIGHT; larger images are downscaled')
+@click.option('--quality', default=80, show_default=True, help='JPEG quality')
+@click.option('--cache', 'cache_dir', default='build/asset-cache', show_default=True,
+              help='Directory to cache optimized images in')
+def optimize_images(paths, output, size, quality, cache_dir):
+    """
+    Downscale and recompress images, e.g. the editor's static/r1.png.
+
+    Each image is written to OUTPUT under its original name, with the
+    extension of the format it was recompressed to.
+    """
+    from .assets import AssetPipeline, MIME_EXTENSIONS, load_pillow
+
+    try:
+        width, height = (int(value) for value in size.lower().split('x'))
+    except ValueError:
+        raise click.BadParameter(f'expected WIDTHxHEIGHT, got {size!r}', param_hint='--size')
+    if load_pillow() is None:
+        click.echo('Pillow is not installed; images are copied unchanged '
+                   '(pip install creations-builder[images])', err=True)
+
+    pipeline = AssetPipeline(cache_dir, max_size=(width, height), quality=quality)
+    os.makedirs(output, exist_ok=True)
+    for path in paths:
+        image = pipeline.optimize_file(path)
+        if image is None:
+            click.echo(f"Skipped {path}: not a supported image", err=True)
+            continue
+        stem = os.path.splitext(os.path.basename(path))[0]
+        target = os.path.join(output, stem + MIME_EXTENSIONS[image.mime])
+        with open(target, 'wb') as f:
+            f.write(image.data)
+        click.echo(f"Wrote {target} ({image.source_size} -> {len(image.data)} bytes)")
+
+
+@main.command('simulate')
+@click.argument('workspace', type=click.Path(exists=True, dir_okay=False))
+@click.argument('scenario', type=click.Path(exists=True, dir_okay=False))
+def simulate(workspace, scenario):
+    """
+    Run WORKSPACE headlessly against the events scripted in SCENARIO.
+
+    SCENARIO is a JSON file with a list of ``steps`` and optional canned web
+    ``responses``. The recorded effects are printed as JSON.
+    """
+    import json
+    from .blocks.interpreter import SimulationError, run_scenario, web_stub_from_dict
+    from .blocks.workspace import WorkspaceParseError
+    from .build import BuildError, read_workspace_source
+
+    with open(workspace, 'r', encoding='utf-8') as f:
+        workspace_text = f.read()
+    with open(scenario, 'r', encoding='utf-8') as f:
+        try:
+            script = json.load(f)
+        except ValueError as error:
+            raise click.ClickException(f'Invalid scenario JSON: {error}')
+    if isinstance(script, list):
+        script = {'steps': script}
+    if not isinstance(script, dict):
+        raise click.ClickException('Scenario must be a list of steps or an object with "steps"')
+
+    try:
+        _, workspace_text = read_workspace_source(workspace_text, '')
+        sim = run_scenario(
+            workspace_text,
+            script.get('steps', []),
+            web_stub_from_dict(script.get('responses') or {}, default=script.get('default_response', {}))
+        )
+    except (BuildError, SimulationError, WorkspaceParseError) as error:
+        raise click.ClickException(str(error))
+
+    click.echo(json.dumps({
+        'time': sim.now,
+        'effects': sim.effects,
+        'storage': sim.storage,
+        'unsupported': sim.unsupported,
+    }, indent=2))
+
+
+@main.command('profile')
+@click.argument('profile_dir', default='profiles', type=click.Path(exists=True, file_okay=False))
+@click.option('--endpoint', '-e', 'endpoints', multiple=True, default=('export.', 'templates.'),
+              show_default=True, help='Only include requests to endpoints with this prefix (repeatable)')
+@click.option('--limit', '-n', default=20, show_default=True, help='Number of functions to show')
+@click.option('--sort', type=click.Choice(['tottime', 'cumtime', 'calls']), default='tottime',
+              show_default=True, help='Sort key')
+def profile(profile_dir, endpoints, limit, sort):
+    """Summarize the hottest functions across profiled requests in PROFILE_DIR."""
+    from .profiling import find_profiles, summarize_profiles
+
+    paths = find_profiles(profile_dir, endpoints)
+    if not paths:
+        raise click.ClickException(f'No matching .pstats files in {profile_dir}')
+
+    click.echo(f"{len(paths)} profiled request(s), sorted by {sort}\n")
+    click.echo(f"{'calls':>10} {'tottime':>10} {'cumtime':>10}  function")
+    for row in summarize_profiles(paths, limit, sort):
+        click.echo(
+            f"{row['calls']:>10} {row['tottime']:>10.4f} {row['cumtime']:>10.4f}  "
+            f"{row['function']} ({row['location']})"
+        )
+
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,389 @@
+"""
+Background jobs with state kept in a local SQLite file.
+
+Work that could outlast an HTTP request (batch exports, packaging) is
+submitted to a ``JobQueue`` and run by a fixed number of worker threads.
+Submissions beyond ``max_pending`` queued jobs are refused instead of
+growing the queue. Job status, progress and result artifacts are stored in a
+``JobStore``, so any worker process on the machine can report on a job,
+cancel it or stream its artifacts.
+
+Jobs run in the process that accepted them. When a process exits, the jobs it
+left queued or running are marked failed by the next process to open the
+store.
+
+Finished jobs are kept for ``retention`` seconds. Expired jobs are reported
+as missing at once and deleted, with their artifacts, by the queue's worker
+threads at most every ``purge_interval`` seconds.
+"""
+
+import hashlib
+import json
+import os
+import queue
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from functools import cached_property
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    message TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished);
+CREATE TABLE IF NOT EXISTS artifacts (
+    job_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    mimetype TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (job_id, name)
+);
+'''
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when it has been asked to stop."""
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted to a queue that is already full."""
+
+
+def process_owner() -> str:
+    """Identify this process, so its unfinished jobs can be found after it exits."""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _owner_alive(owner: str) -> bool:
+    """Whether the process behind ``owner`` still runs (other hosts are assumed alive)."""
+    host, _, pid = owner.rpartition(':')
+    if host != socket.gethostname():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        return True
+    return True
+
+
+class JobStore:
+    """Job state and artifacts in a SQLite file shared by all worker processes."""
+
+    def __init__(self, path: str, retention: float = 24 * 3600, purge_interval: float = 60):
+        self.path = path
+        self.retention = retention
+        self.purge_interval = purge_interval
+        self._local = threading.local()
+        self._purge_lock = threading.Lock()
+        self._last_purge = 0.0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        db = self._connect()
+        db.executescript(SCHEMA)
+        self.recover()
+        self.purge()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection (sqlite3 connections are per process and thread)."""
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = connection
+            self._local.pid = pid
+        db: sqlite3.Connection = self._local.db
+        return db
+
+    def _cutoff(self) -> float:
+        """Jobs finished before this time have expired."""
+        return time.time() - self.retention
+
+    def create(self, kind: str, params: Dict[str, Any]) -> str:
+        """Record a new queued job and return its id."""
+        job_id = uuid.uuid4().hex
+        self._connect().execute(
+            'INSERT INTO jobs (id, kind, status, params, owner, created) VALUES (?, ?, ?, ?, ?, ?)',
+            (job_id, kind, QUEUED, json.dumps(params), process_owner(), time.time())
+        )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job's state and its artifact list, or None."""
+        db = self._connect()
+        row = db.execute(
+            'SELECT id, kind, status, done, total, message, error, cancel_requested, '
+            'created, started, finished FROM jobs '
+            'WHERE id = ? AND (finished IS NULL OR finished >= ?)', (job_id, self._cutoff())
+        ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['cancel_requested'] = bool(job['cancel_requested'])
+        job['progress'] = job['done'] / job['total'] if job['total'] else (1.0 if job['status'] == SUCCEEDED else 0.0)
+        job['artifacts'] = self.artifacts(job_id)
+        return job
+
+    def params(self, job_id: str) -> Dict[str, Any]:
+        """Get the parameters a job was submitted with."""
+        row = self._connect().execute('SELECT params FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return json.loads(row['params']) if row else {}
+
+    def claim(self, job_id: str) -> bool:
+        """Move a queued job to running; False if it was cancelled or removed meanwhile."""
+        cursor = self._connect().execute(
+            'UPDATE jobs SET status = ?, started = ? WHERE id = ? AND status = ?',
+            (RUNNING, time.time(), job_id, QUEUED)
+        )
+        return cursor.rowcount == 1
+
+    def set_progress(self, job_id: str, done: int, total: int, message: Optional[str] = None) -> bool:
+        """Record progress; returns whether cancellation has been requested."""
+        db = self._connect()
+        db.execute('UPDATE jobs SET done = ?, total = ?, message = ? WHERE id = ?',
+                   (done, total, message, job_id))
+        row = db.execute('SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return row is None or bool(row['cancel_requested'])
+
+    def finish(self, job_id: str, status: str, error: Optional[str] = None):
+        """Record a job's final status."""
+        self._connect().execute(
+            'UPDATE jobs SET status = ?, error = ?, finished = ? WHERE id = ?',
+            (status, error, time.time(), job_id)
+        )
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        """
+        Cancel a job, returning its status afterwards (None if unknown).
+
+        Queued jobs are cancelled at once. Running jobs are asked to stop and
+        are cancelled when they next report progress.
+        """
+        db = self._connect()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute(
+                'SELECT status FROM jobs WHERE id = ? AND (finished IS NULL OR finished >= ?)',
+                (job_id, self._cutoff())
+            ).fetchone()
+            if row is None:
+                db.execute('COMMIT')
+                return None
+            status: str = row['status']
+            if status == QUEUED:
+                status = CANCELLED
+                db.execute('UPDATE jobs SET status = ?, cancel_requested = 1, finished = ? WHERE id = ?',
+                           (CANCELLED, time.time(), job_id))
+            elif status == RUNNING:
+                db.execute('UPDATE jobs SET cancel_requested = 1 WHERE id = ?', (job_id,))
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        return status
+
+    def add_artifact(self, job_id: str, name: str, data: bytes, mimetype: str):
+        """Store a job result file."""
+        self._connect().execute(
+            'INSERT OR REPLACE INTO artifacts (job_id, name, mimetype, size, sha256, data) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (job_id, name, mimetype, len(data), hashlib.sha256(data).hexdigest(), sqlite3.Binary(data))
+        )
+
+    def artifacts(self, job_id: str) -> List[Dict[str, Any]]:
+        """List a job's artifacts, without their contents."""
+        rows = self._connect().execute(
+            'SELECT name, mimetype, size, sha256 FROM artifacts '
+            'WHERE job_id = ? AND job_id NOT IN (SELECT id FROM jobs WHERE finished < ?) ORDER BY name',
+            (job_id, self._cutoff())
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def artifact(self, job_id: str, name: str) -> Optional[Dict[str, Any]]:
+        """Get one artifact's metadata, or None."""
+        row = self._connect().execute(
+            'SELECT name, mimetype, size, sha256 FROM artifacts '
+            'WHERE job_id = ? AND name = ? AND job_id NOT IN (SELECT id FROM jobs WHERE finished < ?)',
+            (job_id, name, self._cutoff())
+        ).fetchone()
+        return dict(row) if row else None
+
+    def read_artifact(self, job_id: str, name: str, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """Yield an artifact's contents in chunks, without loading it whole."""
+        db = self._connect()
+        expired = db.execute('SELECT 1 FROM jobs WHERE id = ? AND finished < ?',
+                             (job_id, self._cutoff())).fetchone()
+        if expired is not None:
+            return
+        offset = 1
+        while True:
+            # substr() on a BLOB counts bytes, from 1
+            row = db.execute(
+                'SELECT substr(data, ?, ?) FROM artifacts WHERE job_id = ? AND name = ?',
+                (offset, chunk_size, job_id, name)
+            ).fetchone()
+            if row is None or not row[0]:
+                return
+            yield bytes(row[0])
+            offset += chunk_size
+
+    def recover(self):
+        """Fail unfinished jobs whose process has exited."""
+        db = self._connect()
+        rows = db.execute('SELECT DISTINCT owner FROM jobs WHERE status IN (?, ?)', (QUEUED, RUNNING)).fetchall()
+        for row in rows:
+            if not _owner_alive(row['owner']):
+                db.execute(
+                    'UPDATE jobs SET status = ?, error = ?, finished = ? WHERE owner = ? AND status IN (?, ?)',
+                    (FAILED, 'Interrupted: the server process exited', time.time(), row['owner'], QUEUED, RUNNING)
+                )
+
+    def purge_if_due(self):
+        """Purge unless this store already did within ``purge_interval`` seconds."""
+        with self._purge_lock:
+            now = time.time()
+            if now - self._last_purge < self.purge_interval:
+                return
+            self._last_purge = now
+        self.purge()
+
+    def purge(self):
+        """Delete jobs, and their artifacts, finished more than ``retention`` seconds ago."""
+        db = self._connect()
+        cutoff = self._cutoff()
+        self._last_purge = time.time()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            db.execute('DELETE FROM artifacts WHERE job_id IN (SELECT id FROM jobs WHERE finished < ?)', (cutoff,))
+            db.execute('DELETE FROM jobs WHERE finished < ?', (cutoff,))
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+
+
+class JobContext:
+    """What a running job sees: its parameters, progress reporting and artifact output."""
+
+    def __init__(self, store: JobStore, job_id: str, kind: str, params: Dict[str, Any]):
+        self.store = store
+        self.id = job_id
+        self.kind = kind
+        self.params = params
+
+    def progress(self, done: int, total: int, message: Optional[str] = None):
+        """Report progress; raises ``JobCancelled`` if the job should stop."""
+        if self.store.set_progress(self.id, done, total, message):
+            raise JobCancelled()
+
+    def add_artifact(self, name: str, data: bytes, mimetype: str = 'application/octet-stream'):
+        self.store.add_artifact(self.id, name, data, mimetype)
+
+
+class JobQueue:
+    """Run submitted jobs on a fixed pool of background threads."""
+
+    def __init__(self, path: str, runner: Callable[[JobContext], None], workers: int = 2,
+                 max_pending: int = 32, retention: float = 24 * 3600, purge_interval: float = 60):
+        self.path = path
+        self.runner = runner
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retention = retention
+        self.purge_interval = purge_interval
+        self.rejected = 0
+        self._queue: 'queue.Queue[tuple]' = queue.Queue()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    @cached_property
+    def store(self) -> JobStore:
+        """The job store, opened on first use so idle servers create no file."""
+        return JobStore(self.path, self.retention, self.purge_interval)
+
+    def submit(self, kind: str, params: Dict[str, Any]) -> str:
+        """Queue a job and return its id; raises ``QueueFull`` when ``max_pending`` jobs wait."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise QueueFull()
+            self._pending += 1
+            # Threads start on first use, after any fork by the server
+            if not self._threads:
+                self._start()
+        try:
+            job_id = self.store.create(kind, params)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        self._queue.put((job_id, kind, params))
+        return job_id
+
+    def _start(self):
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f'job-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            try:
+                # Wake up while idle too, so expired jobs are purged
+                job_id, kind, params = self._queue.get(timeout=self.purge_interval)
+            except queue.Empty:
+                self.store.purge_if_due()
+                continue
+            with self._lock:
+                self._pending -= 1
+            if self.store.claim(job_id):
+                self._run(JobContext(self.store, job_id, kind, params))
+            self.store.purge_if_due()
+
+    def _run(self, job: JobContext):
+        try:
+            self.runner(job)
+        except JobCancelled:
+            self.store.finish(job.id, CANCELLED)
+        except Exception as error:
+            self.store.finish(job.id, FAILED, str(error) or error.__class__.__name__)
+        else:
+            self.store.finish(job.id, SUCCEEDED)
+
+    def stats(self) -> Dict[str, int]:
+        """Pool size, queued jobs and rejections in this process."""
+        return {
+            'workers': self.workers,
+            'pending': self._pending,
+            'max_pending': self.max_pending,
+            'rejected': self.rejected,
+        }
@@ -0,0 +1,174 @@
+"""
+Opt-in per-request profiling.
+
+A profiled request runs under ``cProfile`` while a background thread samples
+its stack. When it finishes, two files are written to the profile directory:
+
+- ``<name>.pstats``: the cProfile statistics, readable with ``pstats`` or
+  ``creations-builder profile``
+- ``<name>.collapsed``: sampled stacks in collapsed format
+  (``frame;frame;frame count``), ready for flamegraph.pl or speedscope
+
+Requests are profiled when profiling is enabled in config and the request is
+picked by the sample rate, or when it carries the trusted profiling header.
+Only one request is profiled at a time; others run normally.
+"""
+
+import cProfile
+import hmac
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+from flask import Flask, g, request
+
+PROFILE_HEADER = 'X-Profile-Request'
+
+
+class StackSampler:
+    """Sample one thread's Python stack at a fixed interval."""
+
+    def __init__(self, thread_id: int, interval: float = 0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}')
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        """Get the samples in collapsed-stack format."""
+        return ''.join(f'{stack} {count}\n' for stack, count in sorted(self.stacks.items()))
+
+
+class RequestProfiler:
+    """Profile selected requests to the given blueprints."""
+
+    def __init__(self, output_dir: str, blueprints: Iterable[str] = ('export', 'templates'),
+                 enabled: bool = False, sample_rate: float = 0.01,
+                 header_token: Optional[str] = None, sample_interval: float = 0.001):
+        self.output_dir = output_dir
+        self.blueprints = frozenset(blueprints)
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.header_token = header_token
+        self.sample_interval = sample_interval
+        self.captured = 0
+        self._busy = threading.Lock()
+        self._sequence = 0
+
+    def init_app(self, app: Flask):
+        """Install the profiling hooks on ``app``."""
+        app.before_request(self.start)
+        app.teardown_request(self.finish)
+
+    def wants_profile(self) -> bool:
+        """Whether the current request should be profiled."""
+        if request.blueprint not in self.blueprints:
+            return False
+        # The header only counts when a token is configured and matches
+        token = request.headers.get(PROFILE_HEADER)
+        if self.header_token and token is not None and hmac.compare_digest(
+                token.encode('utf-8'), self.header_token.encode('utf-8')):
+            return True
+        return self.enabled and random.random() < self.sample_rate
+
+    def start(self):
+        if not self.wants_profile():
+            return None
+        # cProfile allows a single active profiler per interpreter on newer
+        # Pythons; concurrent requests are simply not profiled
+        if not self._busy.acquire(blocking=False):
+            return None
+
+        sampler = StackSampler(threading.get_ident(), self.sample_interval)
+        profile = cProfile.Profile()
+        g.request_profile = (profile, sampler, time.perf_counter())
+        sampler.start()
+        profile.enable()
+        return None
+
+    def finish(self, error=None):
+        state = g.pop('request_profile', None)
+        if state is None:
+            return
+        profile, sampler, started = state
+        try:
+            profile.disable()
+            sampler.stop()
+            self.write(profile, sampler, time.perf_counter() - started)
+        finally:
+            self._busy.release()
+
+    def write(self, profile: cProfile.Profile, sampler: StackSampler, elapsed: float):
+        """Write a captured request's ``.pstats`` and ``.collapsed`` files."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._sequence += 1
+        endpoint = (request.endpoint or 'unknown').replace('/', '_')
+        name = f'{int(time.time() * 1000)}-{os.getpid()}-{self._sequence}-{endpoint}-{int(elapsed * 1000)}ms'
+        base = os.path.join(self.output_dir, name)
+
+        profile.dump_stats(base + '.pstats')
+        with open(base + '.collapsed', 'w', encoding='utf-8') as f:
+            f.write(sampler.collapsed())
+        self.captured += 1
+
+
+def find_profiles(profile_dir: str, endpoints: Iterable[str] = ()) -> List[str]:
+    """Get the ``.pstats`` files in ``profile_dir``, optionally filtered by endpoint prefix."""
+    prefixes = tuple(endpoints)
+    paths = []
+    for name in sorted(os.listdir(profile_dir)):
+        if not name.endswith('.pstats'):
+            continue
+        # <ms>-<pid>-<seq>-<endpoint>-<elapsed>ms.pstats
+        parts = name[:-len('.pstats')].split('-', 3)
+        endpoint = parts[3].rsplit('-', 1)[0] if len(parts) == 4 else ''
+        if prefixes and not endpoint.startswith(prefixes):
+            continue
+        paths.append(os.path.join(profile_dir, name))
+    return paths
+
+
+def summarize_profiles(paths: List[str], limit: int = 20, sort: str = 'tottime') -> List[Dict[str, Any]]:
+    """Merge captured profiles and get the hottest functions."""
+    stats = pstats.Stats(paths[0])
+    for path in paths[1:]:
+        stats.add(path)
+
+    rows = []
+    # ``Stats.stats`` is undocumented but stable, and missing from the type stubs
+    entries: Dict[Any, Any] = stats.stats  # type: ignore[attr-defined]
+    for (filename, line, function), (_, calls, tottime, cumtime, _) in entries.items():
+        rows.append({
+            'function': function,
+            'location': f'{filename}:{line}' if line else filename,
+            'calls': calls,
+            'tottime': tottime,
+            'cumtime': cumtime,
+        })
+    rows.sort(key=lambda row: row[sort], reverse=True)
+    return rows[:limit]
@@ -0,0 +1,156 @@
+"""
+Cross-process cache backed by a local SQLite file.
+
+Several server workers on one machine can share compiled code, registry
+snapshots and block bundles through one cache file, without an external
+service. SQLite handles locking between processes. The database is memory
+mapped (``PRAGMA mmap_size``), so hot pages are read from the operating
+system's page cache, which all workers share, instead of each worker holding
+its own copy.
+
+Entries are evicted least recently used first once the total size of the
+stored values exceeds ``max_bytes``. To keep reads cheap, an entry's access
+time is only rewritten when it is older than ``touch_interval`` seconds, so
+the LRU order is approximate at that granularity.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (name, value) VALUES ('total_size', 0);
+'''
+
+
+class SharedCache:
+    """Size-bounded LRU cache of bytes values in a SQLite file."""
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024,
+                 touch_interval: float = 5.0, mmap_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.touch_interval = touch_interval
+        self.mmap_bytes = mmap_bytes
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Get this thread's connection, opening it on first use.
+
+        sqlite3 connections must not be shared between threads, nor carried
+        into a forked worker, so connections are keyed by process and thread
+        and nothing is opened before the first query.
+        """
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(f'PRAGMA mmap_size={int(self.mmap_bytes)}')
+            connection.executescript(SCHEMA)
+            self._local.db = connection
+            self._local.pid = pid
+        db: sqlite3.Connection = self._local.db
+        return db
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Get a cached value, or None."""
+        db = self._connect()
+        row = db.execute('SELECT value, accessed FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+
+        value: bytes = row[0]
+        accessed: float = row[1]
+        now = time.time()
+        if now - accessed > self.touch_interval:
+            db.execute('UPDATE entries SET accessed = ? WHERE key = ?', (now, key))
+        return value
+
+    def put(self, key: str, value: bytes):
+        """Store a value, evicting least recently used entries to stay within ``max_bytes``."""
+        size = len(value)
+        if size > self.max_bytes:
+            return
+
+        db = self._connect()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute('SELECT size FROM entries WHERE key = ?', (key,)).fetchone()
+            delta = size - (row[0] if row else 0)
+            db.execute(
+                'INSERT OR REPLACE INTO entries (key, value, size, accessed) VALUES (?, ?, ?, ?)',
+                (key, sqlite3.Binary(value), size, time.time())
+            )
+            db.execute("UPDATE meta SET value = value + ? WHERE name = 'total_size'", (delta,))
+            self._evict(db)
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+
+    def _evict(self, db: sqlite3.Connection):
+        total = db.execute("SELECT value FROM meta WHERE name = 'total_size'").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        for key, size in db.execute('SELECT key, size FROM entries ORDER BY accessed').fetchall():
+            if total - freed <= self.max_bytes:
+                break
+            db.execute('DELETE FROM entries WHERE key = ?', (key,))
+            freed += size
+        db.execute("UPDATE meta SET value = value - ? WHERE name = 'total_size'", (freed,))
+
+    def delete(self, key: str):
+        """Remove an entry if present."""
+        db = self._connect()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute('SELECT size FROM entries WHERE key = ?', (key,)).fetchone()
+            if row:
+                db.execute('DELETE FROM entries WHERE key = ?', (key,))
+                db.execute("UPDATE meta SET value = value - ? WHERE name = 'total_size'", (row[0],))
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+
+    def clear(self):
+        """Remove every entry."""
+        db = self._connect()
+        db.execute('BEGIN IMMEDIATE')
+        db.execute('DELETE FROM entries')
+        db.execute("UPDATE meta SET value = 0 WHERE name = 'total_size'")
+        db.execute('COMMIT')
+
+    def stats(self) -> Dict[str, int]:
+        """Get entry count, stored size and this process's hit statistics."""
+        db = self._connect()
+        entries = db.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        total = db.execute("SELECT value FROM meta WHERE name = 'total_size'").fetchone()[0]
+        return {
+            'entries': entries,
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
@@ -289,7 +289,10 @@ function initializeBlockly() {
             theme: r1Theme
         });
 
-        // Add event listeners
+        // Add event listeners (stack tracking must run before code generation)
+        if (window.CodeGenerator && window.CodeGenerator.trackChanges) {
+            workspace.addChangeListener(window.CodeGenerator.trackChanges);
+        }
         workspace.addChangeListener(onWorkspaceChange);
         
         // Add resize listener
@@ -319,8 +322,9 @@ function onWorkspaceChange(event) {
         const blockCount = workspace.getAllBlocks().length;
         updateBlockCount(blockCount);
         
-        // Generate and display code
-        if (typeof generateCode === 'function') {
+        // Generate and display code (debounced off-thread once the app
+        // has set up its generation pipeline)
+        if (!window.generationPipeline && typeof generateCode === 'function') {
             generateCode();
         }
         
@@ -6,6 +6,15 @@
 let generatedCode = '';
 let lastGeneratedCode = '';
 
+// Incremental compilation state: compiled code for each top-level stack is
+// cached under a hash of the stack's XML, and each root block remembers the
+// hash it had when it was last compiled. Only stacks touched by an edit are
+// re-serialized, and only stacks whose XML actually changed are recompiled.
+const STACK_CACHE_LIMIT = 2048;
+const stackCodeCache = new Map();
+const stackKeys = new Map();
+const dirtyStacks = new Set();
+
 /**
  * Initialize code generators for custom blocks
  */
@@ -17,6 +26,9 @@ function initializeCodeGenerators() {
     
     // Define code generators for custom blocks
     defineR1CodeGenerators();
+    
+    // Cached stacks may have been compiled by older generators
+    clearCompileCache();
     console.log('R1 code generators initialized');
 }
 
@@ -359,27 +371,170 @@ console.log('Wait complete');
 }
 
 /**
- * Generate complete code from workspace
+ * Hash a string (53-bit cyrb53) for use as a stack cache key
  */
-function generateCode() {
-    if (!workspace) {
-        console.error('Workspace not available');
-        return '';
+function hashString(str) {
+    let h1 = 0xdeadbeef;
+    let h2 = 0x41c6ce57;
+    for (let i = 0; i < str.length; i++) {
+        const ch = str.charCodeAt(i);
+        h1 = Math.imul(h1 ^ ch, 2654435761);
+        h2 = Math.imul(h2 ^ ch, 1597334677);
+    }
+    h1 = Math.imul(h1 ^ (h1 >>> 16), 2246822507) ^ Math.imul(h2 ^ (h2 >>> 13), 3266489909);
+    h2 = Math.imul(h2 ^ (h2 >>> 16), 2246822507) ^ Math.imul(h1 ^ (h1 >>> 13), 3266489909);
+    return (4294967296 * (2097151 & h2) + (h1 >>> 0)).toString(36);
+}
+
+/**
+ * Get the cache key for a top-level stack
+ */
+function getStackKey(block) {
+    // Ids are left out so identical stacks share one cache entry
+    const xml = Blockly.Xml.blockToDom(block, true);
+    return hashString(Blockly.Xml.domToText(xml));
+}
+
+/**
+ * Mark the stacks touched by a workspace event as needing re-serialization
+ */
+function trackStackChanges(event) {
+    if (!workspace || event.isUiEvent) {
+        return;
     }
     
-    try {
-        // Handle both old and new Blockly JavaScript generator APIs
-        const jsGenerator = getJavaScriptGenerator();
+    if (!event.blockId) {
+        // Variable and workspace-level events can change any stack
+        stackKeys.clear();
+        return;
+    }
+    
+    [event.blockId, event.oldParentId, event.newParentId].forEach(id => {
+        const block = id && workspace.getBlockById(id);
+        if (block) {
+            dirtyStacks.add(block.getRootBlock().id);
+        }
+    });
+}
+
+/**
+ * Generate code for one top-level stack, reusing cached output when the
+ * stack is unchanged
+ */
+function generateStackCode(jsGenerator, block) {
+    let key = stackKeys.get(block.id);
+    if (key === undefined || dirtyStacks.has(block.id)) {
+        key = getStackKey(block);
+        stackKeys.set(block.id, key);
+    }
+    
+    let entry = stackCodeCache.get(key);
+    if (entry) {
+        // Refresh LRU position
+        stackCodeCache.delete(key);
+        stackCodeCache.set(key, entry);
+    } else {
+        // Record helper functions this stack pulls in so a cache hit can
+        // re-link them without regenerating the stack
+        const provideFunction = jsGenerator.provideFunction_;
+        const usedDefinitions = [];
+        jsGenerator.provideFunction_ = function(desiredName, code) {
+            usedDefinitions.push(desiredName);
+            return provideFunction.call(this, desiredName, code);
+        };
         
-        if (!jsGenerator) {
-            throw new Error('JavaScript generator not available');
+        let code;
+        try {
+            code = jsGenerator.blockToCode(block);
+        } finally {
+            jsGenerator.provideFunction_ = provideFunction;
+        }
+        
+        if (Array.isArray(code)) {
+            // Value blocks return [code, order]
+            code = code[0];
+        }
+        if (code && block.outputConnection) {
+            code = jsGenerator.scrubNakedValue(code);
         }
         
-        // Generate JavaScript code
-        const code = jsGenerator.workspaceToCode(workspace);
+        const definitions = {};
+        usedDefinitions.forEach(name => {
+            definitions[name] = jsGenerator.definitions_[name];
+        });
         
-        // Wrap in async function for await support
-        const wrappedCode = `
+        entry = { code: code || '', definitions };
+        stackCodeCache.set(key, entry);
+        if (stackCodeCache.size > STACK_CACHE_LIMIT) {
+            stackCodeCache.delete(stackCodeCache.keys().next().value);
+        }
+    }
+    
+    for (const [name, definition] of Object.entries(entry.definitions)) {
+        if (!jsGenerator.definitions_[name]) {
+            jsGenerator.definitions_[name] = definition;
+        }
+    }
+    
+    return entry.code;
+}
+
+/**
+ * Generate workspace code stack by stack, then link the results
+ */
+function generateWorkspaceCode(jsGenerator) {
+    jsGenerator.init(workspace);
+    
+    const stackCodes = [];
+    const liveStacks = new Set();
+    workspace.getTopBlocks(true).forEach(block => {
+        liveStacks.add(block.id);
+        const code = generateStackCode(jsGenerator, block);
+        if (code) {
+            stackCodes.push(code);
+        }
+    });
+    
+    dirtyStacks.clear();
+    for (const id of Array.from(stackKeys.keys())) {
+        if (!liveStacks.has(id)) {
+            stackKeys.delete(id);
+        }
+    }
+    
+    // Same post-processing as Blockly's workspaceToCode
+    let code = jsGenerator.finish(stackCodes.join('\n'));
+    code = code.replace(/^\s+\n/, '');
+    code = code.replace(/\n\s+$/, '\n');
+    code = code.replace(/[ \t]+\n/g, '\n');
+    return code;
+}
+
+/**
+ * Get incremental compilation cache statistics
+ */
+function getCompileCacheStats() {
+    return {
+        entries: stackCodeCache.size,
+        trackedStacks: stackKeys.size,
+        limit: STACK_CACHE_LIMIT
+    };
+}
+
+/**
+ * Drop all cached stack code
+ */
+function clearCompileCache() {
+    stackCodeCache.clear();
+    stackKeys.clear();
+    dirtyStacks.clear();
+}
+
+/**
+ * Wrap workspace code in the async creation program
+ */
+function wrapGeneratedCode(code) {
+    return `
 // Generated R1 Creation Code
 // Generated at: ${new Date().toLocaleString()}
 
@@ -395,6 +550,30 @@ function generateCode() {
     }
 })();
 `;
+}
+
+/**
+ * Generate complete code from workspace
+ */
+function generateCode() {
+    if (!workspace) {
+        console.error('Workspace not available');
+        return '';
+    }
+    
+    try {
+        // Handle both old and new Blockly JavaScript generator APIs
+        const jsGenerator = getJavaScriptGenerator();
+        
+        if (!jsGenerator) {
+            throw new Error('JavaScript generator not available');
+        }
+        
+        // Generate JavaScript code, recompiling only changed stacks
+        const code = generateWorkspaceCode(jsGenerator);
+        
+        // Wrap in async function for await support
+        const wrappedCode = wrapGeneratedCode(code);
         
         generatedCode = wrappedCode;
         displayGeneratedCode(wrappedCode);
@@ -428,6 +607,14 @@ function displayGeneratedCode(code) {
     }
 }
 
+/**
+ * Accept code generated elsewhere (e.g. by the code generation worker)
+ */
+function applyGeneratedCode(code) {
+    generatedCode = code;
+    displayGeneratedCode(code);
+}
+
 /**
  * Get the current generated code
  */
@@ -437,37 +624,53 @@ function getCurrentGeneratedCode() {
 
 /**
  * Format code for export
+ *
+ * Without ``code``, the workspace is regenerated first if the pipeline has
+ * not caught up with it yet.
  */
-function formatCodeForExport() {
-    if (!generatedCode) {
-        generateCode();
+function formatCodeForExport(code) {
+    if (code === undefined) {
+        // Exports must not pick up code from before a pending regeneration
+        const pipeline = typeof window !== 'undefined' ? window.generationPipeline : null;
+        if (!generatedCode || (pipeline && pipeline.isPending())) {
+            generateCode();
+        }
+        code = generatedCode;
     }
     
-    return generatedCode.replace(/^\s*\/\/ Generated R1 Creation Code[\s\S]*?\n\n/, '');
+    return code.replace(/^\s*\/\/ Generated R1 Creation Code[\s\S]*?\n\n/, '');
 }
 
-// Initialize when DOM is ready
-document.addEventListener('DOMContentLoaded', function() {
-    // Wait for Blockly to be available
-    const checkBlockly = setInterval(() => {
-        if (typeof Blockly !== 'undefined' && Blockly.JavaScript) {
-            initializeCodeGenerators();
+// The generators above are also loaded into the code generation worker,
+// which has no DOM and registers them on its own headless generator
+if (typeof document !== 'undefined') {
+    // Initialize when DOM is ready
+    document.addEventListener('DOMContentLoaded', function() {
+        // Wait for Blockly to be available
+        const checkBlockly = setInterval(() => {
+            if (typeof Blockly !== 'undefined' && Blockly.JavaScript) {
+                initializeCodeGenerators();
+                clearInterval(checkBlockly);
+            }
+        }, 100);
+    
+        // Timeout after 5 seconds
+        setTimeout(() => {
             clearInterval(checkBlockly);
-        }
-    }, 100);
-    
-    // Timeout after 5 seconds
-    setTimeout(() => {
-        clearInterval(checkBlockly);
-        if (typeof Blockly === 'undefined') {
-            console.error('Blockly failed to load within 5 seconds');
-        }
-    }, 5000);
-});
+            if (typeof Blockly === 'undefined') {
+                console.error('Blockly failed to load within 5 seconds');
+            }
+        }, 5000);
+    });
 
-// Export functions
-window.CodeGenerator = {
-    generate: generateCode,
-    getCurrent: getCurrentGeneratedCode,
-    formatForExport: formatCodeForExport
-};
+    // Export functions
+    window.CodeGenerator = {
+        generate: generateCode,
+        getCurrent: getCurrentGeneratedCode,
+        formatForExport: formatCodeForExport,
+        trackChanges: trackStackChanges,
+        cacheStats: getCompileCacheStats,
+        clearCache: clearCompileCache,
+        apply: applyGeneratedCode
+    };
+}
@@ -0,0 +1,146 @@
+/**
+ * Code generation worker for R1 Creations
+ *
+ * Runs the R1 block generators from code-generator.js against serialized
+ * workspace state so code generation stays off the UI thread.
+ */
+
+/**
+ * Adapter giving a serialized block state the parts of the Blockly.Block
+ * API the R1 generators use
+ */
+class StateBlock {
+    constructor(state) {
+        this.state = state;
+        this.type = state.type;
+        this.id = state.id;
+    }
+
+    getFieldValue(name) {
+        const value = (this.state.fields || {})[name];
+        if (typeof value === 'boolean') {
+            return value ? 'TRUE' : 'FALSE';
+        }
+        if (value && typeof value === 'object') {
+            // Variable fields serialize as {id: ...}
+            return value.name || value.id;
+        }
+        return value === undefined ? null : value;
+    }
+
+    getNextBlock() {
+        const next = this.state.next;
+        const state = next && (next.block || next.shadow);
+        return state ? new StateBlock(state) : null;
+    }
+
+    getInputTargetBlock(name) {
+        const input = (this.state.inputs || {})[name];
+        const state = input && (input.block || input.shadow);
+        return state ? new StateBlock(state) : null;
+    }
+}
+
+/**
+ * Headless stand-in for Blockly.JavaScript
+ */
+const HeadlessGenerator = {
+    forBlock: {},
+    unsupported: new Set(),
+
+    blockToCode(block) {
+        if (!block) {
+            return '';
+        }
+
+        const generator = this.forBlock[block.type];
+        if (!generator) {
+            this.unsupported.add(block.type);
+            return '';
+        }
+
+        // Statement blocks are followed by the code of the blocks after them,
+        // as in Blockly's scrub_
+        const code = generator.call(block, block, this);
+        return code + this.blockToCode(block.getNextBlock());
+    },
+
+    statementToCode(block, name) {
+        return this.blockToCode(block.getInputTargetBlock(name));
+    }
+};
+
+self.Blockly = { JavaScript: HeadlessGenerator };
+importScripts('code-generator.js');
+defineR1CodeGenerators();
+
+// Compiled stacks keyed by a hash of their position- and id-free state
+const workerStackCache = new Map();
+
+/**
+ * Serialize a stack state for hashing, leaving out block ids and positions
+ */
+function stackStateText(state) {
+    return JSON.stringify(state, function(key, value) {
+        if ((key === 'id' || key === 'x' || key === 'y') && typeof this.type === 'string') {
+            return undefined;
+        }
+        return value;
+    });
+}
+
+/**
+ * Generate code for one top-level stack state, reusing cached output
+ */
+function generateStateStack(state) {
+    const key = hashString(stackStateText(state));
+    const cached = workerStackCache.get(key);
+    if (cached !== undefined) {
+        workerStackCache.delete(key);
+        workerStackCache.set(key, cached);
+        return cached;
+    }
+
+    const unsupportedBefore = HeadlessGenerator.unsupported.size;
+    const code = HeadlessGenerator.blockToCode(new StateBlock(state));
+    if (HeadlessGenerator.unsupported.size === unsupportedBefore) {
+        workerStackCache.set(key, code);
+        if (workerStackCache.size > STACK_CACHE_LIMIT) {
+            workerStackCache.delete(workerStackCache.keys().next().value);
+        }
+    }
+    return code;
+}
+
+self.onmessage = function(event) {
+    const { seq, state } = event.data;
+
+    try {
+        HeadlessGenerator.unsupported.clear();
+
+        const stacks = (state && state.blocks && state.blocks.blocks) || [];
+        const stackCodes = [];
+        stacks.forEach(stackState => {
+            const code = generateStateStack(stackState);
+            if (code) {
+                stackCodes.push(code);
+            }
+        });
+
+        if (HeadlessGenerator.unsupported.size > 0) {
+            // Built-in Blockly blocks need the real generator on the page
+            self.postMessage({ seq, unsupported: Array.from(HeadlessGenerator.unsupported) });
+            return;
+        }
+
+        // Same post-processing as Blockly's workspaceToCode
+        let code = stackCodes.join('\n');
+        code = code.replace(/^\s+\n/, '');
+        code = code.replace(/\n\s+$/, '\n');
+        code = code.replace(/[ \t]+\n/g, '\n');
+
+        self.postMessage({ seq, code: wrapGeneratedCode(code) });
+    } catch (error) {
+        self.postMessage({ seq, error: error.message });
+    }
+};
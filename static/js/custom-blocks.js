@@ -242,6 +242,10 @@ function defineWaitBlock() {
 
 /**
  * Load custom blocks from server
+ *
+ * /api/blocks returns a small manifest; block definitions and generators
+ * come from the compiled, content-hashed bundle it points to, which the
+ * browser caches indefinitely.
  */
 async function loadCustomBlocksFromServer() {
     try {
@@ -250,17 +254,11 @@ async function loadCustomBlocksFromServer() {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
         
-        const blocks = await response.json();
-        console.log('Loaded custom blocks from server:', blocks);
+        const manifest = await response.json();
+        await loadBlockBundle(manifest.bundle.url);
+        console.log(`Loaded block bundle ${manifest.bundle.hash}:`, manifest.categories);
         
-        // Process server-defined blocks
-        for (const [category, categoryBlocks] of Object.entries(blocks)) {
-            for (const [blockType, blockDef] of Object.entries(categoryBlocks)) {
-                defineServerBlock(blockType, blockDef);
-            }
-        }
-        
-        return blocks;
+        return manifest;
     } catch (error) {
         console.error('Error loading custom blocks from server:', error);
         showToast('Failed to load custom blocks', 'warning');
@@ -269,78 +267,21 @@ async function loadCustomBlocksFromServer() {
 }
 
 /**
- * Define a block from server configuration
+ * Load the compiled block bundle script
  */
-function defineServerBlock(blockType, blockDef) {
-    try {
-        Blockly.Blocks[blockType] = {
-            init: function() {
-                // Parse message and args
-                if (blockDef.message0) {
-                    const input = this.appendDummyInput();
-                    
-                    // Simple parsing - in a full implementation, you'd want more sophisticated parsing
-                    let message = blockDef.message0;
-                    if (blockDef.args0) {
-                        blockDef.args0.forEach((arg, index) => {
-                            const placeholder = `%${index + 1}`;
-                            if (message.includes(placeholder)) {
-                                switch (arg.type) {
-                                    case 'field_input':
-                                        input.appendField(new Blockly.FieldTextInput(arg.text || ''), arg.name);
-                                        break;
-                                    case 'field_number':
-                                        input.appendField(new Blockly.FieldNumber(arg.value || 0, arg.min, arg.max), arg.name);
-                                        break;
-                                    case 'field_dropdown':
-                                        input.appendField(new Blockly.FieldDropdown(arg.options || []), arg.name);
-                                        break;
-                                    case 'field_checkbox':
-                                        input.appendField(new Blockly.FieldCheckbox(arg.checked ? 'TRUE' : 'FALSE'), arg.name);
-                                        break;
-                                }
-                                message = message.replace(placeholder, '');
-                            }
-                        });
-                    }
-                    
-                    // Add remaining text
-                    const textParts = message.split(/(%\d+)/);
-                    textParts.forEach(part => {
-                        if (part && !part.match(/%\d+/)) {
-                            input.appendField(part);
-                        }
-                    });
-                }
-                
-                // Set connections
-                if (blockDef.previousStatement !== undefined) {
-                    this.setPreviousStatement(true, blockDef.previousStatement);
-                }
-                if (blockDef.nextStatement !== undefined) {
-                    this.setNextStatement(true, blockDef.nextStatement);
-                }
-                if (blockDef.output !== undefined) {
-                    this.setOutput(true, blockDef.output);
-                }
-                
-                // Set appearance
-                if (blockDef.colour) {
-                    this.setColour(blockDef.colour);
-                }
-                if (blockDef.tooltip) {
-                    this.setTooltip(blockDef.tooltip);
-                }
-                if (blockDef.helpUrl) {
-                    this.setHelpUrl(blockDef.helpUrl);
-                }
-            }
-        };
+function loadBlockBundle(url) {
+    return new Promise((resolve, reject) => {
+        if (document.querySelector(`script[src="${url}"]`)) {
+            resolve();
+            return;
+        }
         
-        console.log(`Defined server block: ${blockType}`);
-    } catch (error) {
-        console.error(`Error defining server block ${blockType}:`, error);
-    }
+        const script = document.createElement('script');
+        script.src = url;
+        script.onload = () => resolve();
+        script.onerror = () => reject(new Error(`Failed to load block bundle ${url}`));
+        document.head.appendChild(script);
+    });
 }
 
 // Load server blocks when DOM is ready
@@ -0,0 +1,187 @@
+/**
+ * Live code generation pipeline for R1 Creations
+ *
+ * Collects bursts of workspace events, serializes the workspace once the
+ * burst settles, and generates code in a Web Worker. Results for anything but
+ * the latest edit are dropped, so only the newest code reaches the UI.
+ *
+ * The worker only knows the custom R1 blocks. When it reports block types it
+ * cannot generate (Blockly's built-in logic/math blocks), those types are
+ * remembered and the workspace is generated on the main thread while it
+ * still contains any of them, without a wasted worker round trip.
+ */
+
+// Quiet period after the last workspace event before regenerating
+const PIPELINE_DEBOUNCE_MS = 200;
+
+// Worker script lives next to this file
+const CODEGEN_WORKER_URL = document.currentScript
+    ? document.currentScript.src.replace(/generation-pipeline\.js(\?.*)?$/, 'codegen-worker.js')
+    : null;
+
+class GenerationPipeline {
+    constructor(workspace) {
+        this.workspace = workspace;
+        this.worker = null;
+        this.timer = null;
+        this.seq = 0;
+        this.inFlight = false;
+        this.listeners = [];
+        // Block types the worker reported it cannot generate
+        this.unsupportedTypes = new Set();
+        this.startWorker();
+    }
+
+    /**
+     * Start the code generation worker, if the browser supports it
+     */
+    startWorker() {
+        if (typeof Worker === 'undefined' || !CODEGEN_WORKER_URL ||
+            !(Blockly.serialization && Blockly.serialization.workspaces)) {
+            console.log('Code generation worker unavailable, generating on the main thread');
+            return;
+        }
+
+        try {
+            this.worker = new Worker(CODEGEN_WORKER_URL);
+            this.worker.onmessage = (e) => this.handleWorkerMessage(e.data);
+            this.worker.onerror = (e) => {
+                console.error('Code generation worker error:', e.message);
+                this.stopWorker();
+                this.schedule();
+            };
+        } catch (error) {
+            console.error('Failed to start code generation worker:', error);
+            this.worker = null;
+        }
+    }
+
+    /**
+     * Stop the worker and fall back to main-thread generation
+     */
+    stopWorker() {
+        if (this.worker) {
+            this.worker.terminate();
+            this.worker = null;
+        }
+        this.inFlight = false;
+    }
+
+    /**
+     * Schedule regeneration after a workspace event
+     */
+    schedule(event) {
+        if (event && event.isUiEvent) {
+            return;
+        }
+
+        clearTimeout(this.timer);
+        this.timer = setTimeout(() => this.run(), PIPELINE_DEBOUNCE_MS);
+    }
+
+    /**
+     * Regenerate immediately, skipping any pending debounce
+     */
+    flush() {
+        clearTimeout(this.timer);
+        this.run();
+    }
+
+    /**
+     * Whether generated code lags behind the workspace
+     */
+    isPending() {
+        return this.timer !== null || this.inFlight;
+    }
+
+    /**
+     * Serialize the workspace and hand it to the worker
+     */
+    run() {
+        this.timer = null;
+
+        if (this.workspace.isDragging()) {
+            // Wait for the drag to finish
+            this.schedule();
+            return;
+        }
+
+        const seq = ++this.seq;
+
+        if (!this.worker || this.hasUnsupportedBlocks()) {
+            this.publish(generateCode());
+            return;
+        }
+
+        try {
+            const state = Blockly.serialization.workspaces.save(this.workspace);
+            this.worker.postMessage({ seq, state });
+            this.inFlight = true;
+        } catch (error) {
+            console.error('Error serializing workspace:', error);
+            this.publish(generateCode());
+        }
+    }
+
+    /**
+     * Whether the workspace still uses a block type the worker cannot generate
+     */
+    hasUnsupportedBlocks() {
+        for (const type of this.unsupportedTypes) {
+            if (this.workspace.getBlocksByType(type, false).length > 0) {
+                return true;
+            }
+        }
+        // All of them were removed, the worker can take over again
+        this.unsupportedTypes.clear();
+        return false;
+    }
+
+    /**
+     * Handle generated code coming back from the worker
+     */
+    handleWorkerMessage(data) {
+        if (data.seq !== this.seq) {
+            // Stale result, a newer edit is already in flight
+            return;
+        }
+        this.inFlight = false;
+
+        if (data.error || data.unsupported) {
+            // Built-in Blockly blocks need the real generator
+            if (data.error) {
+                console.error('Code generation worker failed:', data.error);
+            } else {
+                data.unsupported.forEach(type => this.unsupportedTypes.add(type));
+            }
+            this.publish(generateCode());
+            return;
+        }
+
+        CodeGenerator.apply(data.code);
+        this.publish(data.code);
+    }
+
+    /**
+     * Register a listener for freshly generated code
+     */
+    onCode(listener) {
+        this.listeners.push(listener);
+    }
+
+    /**
+     * Notify listeners of freshly generated code
+     */
+    publish(code) {
+        this.listeners.forEach(listener => {
+            try {
+                listener(code);
+            } catch (error) {
+                console.error('Generation listener error:', error);
+            }
+        });
+    }
+}
+
+// Export for global access
+window.GenerationPipeline = GenerationPipeline;
@@ -28,6 +28,9 @@ function initializeApp() {
             throw new Error('Failed to initialize Blockly workspace');
         }
         
+        // Set up off-thread code generation and live preview refresh
+        setupGenerationPipeline();
+        
         // Set up workspace change listeners
         setupWorkspaceListeners();
         
@@ -202,6 +205,26 @@ function setupCreationNameInput() {
     }
 }
 
+/**
+ * Set up the code generation pipeline
+ */
+function setupGenerationPipeline() {
+    if (!AppState.workspace || typeof GenerationPipeline === 'undefined') {
+        return;
+    }
+    
+    const pipeline = new GenerationPipeline(AppState.workspace);
+    
+    // Keep an open preview in sync with the latest edit
+    pipeline.onCode((code) => {
+        if (window.creationPreviewer) {
+            window.creationPreviewer.refreshPreview(code);
+        }
+    });
+    
+    window.generationPipeline = pipeline;
+}
+
 /**
  * Set up workspace change listeners
  */
@@ -215,6 +238,11 @@ function setupWorkspaceListeners() {
                 
                 AppState.isDirty = true;
                 updateLastSaved('Unsaved changes');
+                
+                // Bursts of events collapse into a single regeneration
+                if (window.generationPipeline) {
+                    window.generationPipeline.schedule(event);
+                }
             }
         });
     }
@@ -5,6 +5,14 @@
 class CreationPreviewer {
     constructor() {
         this.previewFrame = null;
+        this.previewRequest = null;
+        
+        // Live preview stream state
+        this.liveStream = null;
+        this.liveSessionId = null;
+        this.liveHtml = null;
+        this.liveRevision = 0;
+        
         this.setupEventListeners();
     }
     
@@ -109,6 +117,10 @@ class CreationPreviewer {
                 window.initializeEmulatorForPreview();
             }
             
+            // Open the live stream before the first render so it is
+            // delivered over the stream
+            await this.openLiveStream();
+            
             // Generate preview
             await this.generatePreview();
         }
@@ -123,7 +135,9 @@ class CreationPreviewer {
             modal.classList.remove('show');
             document.body.style.overflow = '';
             
-            // Clean up preview
+            // Cancel any in-flight refresh and clean up preview
+            this.cancelPreviewRequest();
+            this.closeLiveStream();
             this.cleanupPreview();
         }
     }
@@ -141,14 +155,15 @@ class CreationPreviewer {
             showLoading('Generating preview...');
             
             const creationName = document.getElementById('creationName')?.value || 'Preview Creation';
-            const workspaceXml = BlocklyConfig.getXml();
             const generatedCode = CodeGenerator.formatForExport();
             
             // Generate HTML for preview
-            const previewHtml = await this.generatePreviewHtml(creationName, generatedCode);
+            const previewHtml = await this.renderPreview(creationName, generatedCode);
             
-            // Load into iframe
-            this.loadPreviewIntoFrame(previewHtml);
+            // Load into iframe (live stream updates load themselves)
+            if (previewHtml) {
+                this.loadPreviewIntoFrame(previewHtml);
+            }
             
         } catch (error) {
             console.error('Preview generation error:', error);
@@ -158,10 +173,175 @@ class CreationPreviewer {
         }
     }
     
+    /**
+     * Refresh an open preview with the latest generated code
+     *
+     * Any refresh still in flight is cancelled, so only the latest edit is
+     * rendered. ``code`` is the code the generation pipeline just published;
+     * without it the workspace is regenerated on the main thread if needed.
+     */
+    async refreshPreview(code) {
+        const modal = document.getElementById('previewModal');
+        if (!modal || !modal.classList.contains('show')) {
+            return;
+        }
+        
+        this.cancelPreviewRequest();
+        const request = new AbortController();
+        this.previewRequest = request;
+        
+        try {
+            const creationName = document.getElementById('creationName')?.value || 'Preview Creation';
+            const generatedCode = CodeGenerator.formatForExport(code);
+            const previewHtml = await this.renderPreview(creationName, generatedCode, request.signal);
+            
+            if (previewHtml && this.previewRequest === request) {
+                this.loadPreviewIntoFrame(previewHtml);
+            }
+        } catch (error) {
+            if (error.name !== 'AbortError') {
+                console.error('Preview refresh error:', error);
+            }
+        } finally {
+            if (this.previewRequest === request) {
+                this.previewRequest = null;
+            }
+        }
+    }
+    
+    /**
+     * Render a preview, over the live stream when one is open
+     *
+     * Returns the HTML to load, or null when the stream will deliver it.
+     */
+    async renderPreview(creationName, generatedCode, signal) {
+        if (this.liveStream) {
+            try {
+                await this.pushLiveUpdate(creationName, generatedCode, signal);
+                return null;
+            } catch (error) {
+                if (error.name === 'AbortError') {
+                    throw error;
+                }
+                console.warn('Live preview update failed, falling back to one-shot preview:', error);
+                this.closeLiveStream();
+            }
+        }
+        
+        return this.generatePreviewHtml(creationName, generatedCode, signal);
+    }
+    
+    /**
+     * Open a live preview session and its server-sent event stream
+     */
+    async openLiveStream() {
+        if (this.liveStream || typeof EventSource === 'undefined') {
+            return;
+        }
+        
+        try {
+            const response = await fetch('/api/preview/sessions', { method: 'POST' });
+            const result = await response.json();
+            if (!response.ok || !result.success) {
+                throw new Error(result.error || `HTTP ${response.status}`);
+            }
+            
+            this.liveSessionId = result.session_id;
+            this.liveHtml = null;
+            this.liveRevision = 0;
+            
+            const stream = new EventSource(`/api/preview/${result.session_id}/stream`);
+            
+            // Full page, sent first and again after every reconnect
+            stream.addEventListener('html', (e) => {
+                const data = JSON.parse(e.data);
+                this.liveHtml = data.html;
+                this.liveRevision = data.revision;
+                this.loadPreviewIntoFrame(data.html);
+            });
+            
+            // Changed span relative to the previous revision
+            stream.addEventListener('patch', (e) => {
+                const data = JSON.parse(e.data);
+                if (this.liveHtml === null || data.base !== this.liveRevision) {
+                    console.warn('Live preview out of sync, closing stream');
+                    this.closeLiveStream();
+                    return;
+                }
+                
+                this.liveHtml = this.liveHtml.slice(0, data.start) + data.text + this.liveHtml.slice(data.end);
+                this.liveRevision = data.revision;
+                this.loadPreviewIntoFrame(this.liveHtml);
+            });
+            
+            stream.onerror = () => {
+                // EventSource reconnects on its own unless the server refused it
+                if (stream.readyState === EventSource.CLOSED && this.liveStream === stream) {
+                    this.closeLiveStream();
+                }
+            };
+            
+            this.liveStream = stream;
+        } catch (error) {
+            console.warn('Live preview unavailable, using one-shot previews:', error);
+            this.closeLiveStream();
+        }
+    }
+    
+    /**
+     * Push the latest creation code to the live preview session
+     */
+    async pushLiveUpdate(creationName, generatedCode, signal) {
+        const response = await fetch(`/api/preview/${this.liveSessionId}/update`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                name: creationName,
+                generated_code: generatedCode
+            }),
+            signal: signal
+        });
+        
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+        }
+    }
+    
+    /**
+     * Close the live preview stream and its session
+     */
+    closeLiveStream() {
+        if (this.liveStream) {
+            this.liveStream.close();
+            this.liveStream = null;
+        }
+        
+        if (this.liveSessionId) {
+            fetch(`/api/preview/${this.liveSessionId}`, { method: 'DELETE', keepalive: true })
+                .catch(() => {});
+            this.liveSessionId = null;
+        }
+        
+        this.liveHtml = null;
+        this.liveRevision = 0;
+    }
+    
+    /**
+     * Cancel the in-flight preview refresh, if any
+     */
+    cancelPreviewRequest() {
+        if (this.previewRequest) {
+            this.previewRequest.abort();
+            this.previewRequest = null;
+        }
+    }
+    
     /**
      * Generate HTML for preview
      */
-    async generatePreviewHtml(creationName, generatedCode) {
+    async generatePreviewHtml(creationName, generatedCode, signal) {
         const exportData = {
             name: creationName,
             workspace_xml: BlocklyConfig.getXml(),
@@ -174,7 +354,8 @@ class CreationPreviewer {
                 headers: {
                     'Content-Type': 'application/json'
                 },
-                body: JSON.stringify(exportData)
+                body: JSON.stringify(exportData),
+                signal: signal
             });
             
             if (!response.ok) {
@@ -188,6 +369,9 @@ class CreationPreviewer {
             
             return result.html_content;
         } catch (error) {
+            if (error.name === 'AbortError') {
+                throw error;
+            }
             console.error('Error generating preview HTML:', error);
             
             // Fallback to basic HTML
@@ -0,0 +1,20 @@
+"""Shared fixtures."""
+
+import pytest
+
+from creations_builder.app import create_app
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """An app with per-test state files and export rate limits off."""
+    monkeypatch.setenv('EXPORT_RATE_LIMIT', '0')
+    monkeypatch.setenv('EXPORT_JOBS_DB', str(tmp_path / 'export-jobs.sqlite3'))
+    monkeypatch.setenv('ASSET_CACHE_DIR', str(tmp_path / 'asset-cache'))
+    monkeypatch.setenv('PROFILE_DIR', str(tmp_path / 'profiles'))
+    return create_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
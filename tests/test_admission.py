@@ -0,0 +1,107 @@
+import pytest
+
+from creations_builder.admission import TokenBucketStore
+
+SPEAK = '<block type="speak_text" id="s"><field name="TEXT">hello</field></block>'
+WORKSPACE = f'<xml xmlns="https://developers.google.com/blockly/xml">{SPEAK}</xml>'
+
+
+def test_token_bucket_refills_at_the_rate_up_to_the_burst():
+    buckets = TokenBucketStore(rate=2, burst=2)
+    assert buckets.take('a', now=0) == 0
+    assert buckets.take('a', now=0) == 0
+    assert buckets.take('a', now=0) == pytest.approx(0.5)
+    # Half a token has accrued; the failed take keeps it
+    assert buckets.take('a', now=0.25) == pytest.approx(0.25)
+    assert buckets.take('a', now=0.5) == 0
+    # A long idle period refills to the burst, not beyond
+    assert buckets.take('a', now=100) == 0
+    assert buckets.take('a', now=100) == 0
+    assert buckets.take('a', now=100) > 0
+    # Clients have separate buckets
+    assert buckets.take('b', now=100) == 0
+
+
+def test_token_bucket_forgets_least_recently_seen_clients():
+    buckets = TokenBucketStore(rate=1, burst=1, max_clients=2)
+    for client in ('a', 'b', 'c'):
+        assert buckets.take(client, now=0) == 0
+    assert len(buckets) == 2
+    # 'a' was dropped, so it starts again with a full bucket
+    assert buckets.take('a', now=0) == 0
+    assert buckets.take('c', now=0) > 0
+
+
+@pytest.fixture
+def limited(app):
+    """The app with a bucket of one request, refilling every two seconds."""
+    app.admission.buckets = TokenBucketStore(rate=0.5, burst=1)
+    return app
+
+
+@pytest.mark.parametrize('path, body', [
+    ('/api/export/xml', {'workspace_xml': WORKSPACE}),
+    ('/api/compile', {'workspace_xml': WORKSPACE}),
+    ('/api/preview/sessions', None),
+])
+def test_rate_limited_endpoints_answer_429_with_retry_after(limited, path, body):
+    client = limited.test_client()
+    assert client.post(path, json=body or {}).status_code in (200, 202)
+
+    response = client.post(path, json=body or {})
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '2'
+    assert limited.admission.stats()['rate_limited'] == 1
+
+
+def test_preview_updates_are_rate_limited_but_streams_are_not(limited):
+    client = limited.test_client()
+    session_id = client.post('/api/preview/sessions').get_json()['session_id']
+
+    response = client.post(f'/api/preview/{session_id}/update', json={'generated_code': ''})
+    assert response.status_code == 429
+
+    stream = client.get(f'/api/preview/{session_id}/stream', buffered=False)
+    assert stream.status_code == 200
+    stream.close()
+
+
+def test_export_jobs_are_not_rate_limited(limited):
+    client = limited.test_client()
+    for _ in range(2):
+        response = client.post('/api/export/jobs', json={
+            'creations': [{'name': 'Hello', 'workspace_xml': WORKSPACE}],
+        })
+        assert response.status_code == 202
+
+
+def test_busy_worker_answers_503(app, client):
+    slots = app.admission._slots
+    for _ in range(app.admission.max_concurrent):
+        slots.acquire()
+    try:
+        response = client.post('/api/compile', json={'workspace_xml': WORKSPACE})
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+    finally:
+        for _ in range(app.admission.max_concurrent):
+            slots.release()
+    assert client.post('/api/compile', json={'workspace_xml': WORKSPACE}).status_code == 200
+    assert app.admission.stats()['active'] == 0
+
+
+def test_oversized_body_answers_413(app, client):
+    app.config['MAX_CONTENT_LENGTH'] = 100
+    response = client.post('/api/export/xml', json={'workspace_xml': 'x' * 200})
+    assert response.status_code == 413
+
+
+def test_one_client_cannot_fill_the_preview_hub(app, client):
+    hub = app.preview_hub
+    for _ in range(hub.max_sessions_per_client):
+        assert client.post('/api/preview/sessions').status_code == 200
+    assert client.post('/api/preview/sessions').status_code == 503
+
+    other = app.test_client()
+    response = other.post('/api/preview/sessions', environ_base={'REMOTE_ADDR': '10.0.0.2'})
+    assert response.status_code == 200
@@ -0,0 +1,75 @@
+import json
+import os
+
+from click.testing import CliRunner
+
+from creations_builder.build import Builder, MANIFEST_NAME
+from creations_builder.cli import main
+
+SPEAK = '<block type="speak_text" id="s"><field name="TEXT">hello</field></block>'
+
+
+def workspace(blocks):
+    return f'<xml xmlns="https://developers.google.com/blockly/xml">{blocks}</xml>'
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_deterministic_build_ignores_source_mtime(tmp_path, monkeypatch):
+    monkeypatch.delenv('SOURCE_DATE_EPOCH', raising=False)
+    source = tmp_path / 'src'
+    write(str(source / 'hello.xml'), workspace(SPEAK))
+    output = str(tmp_path / 'out')
+
+    Builder(str(source), output, ['html'], deterministic=True).build()
+    first = read(os.path.join(output, 'hello.html'))
+    assert b'1970-01-01T00:00:00+00:00' in first
+
+    os.utime(source / 'hello.xml', (1577836800, 1577836800))
+    incremental = Builder(str(source), output, ['html'], deterministic=True).build()
+    assert incremental['skipped'] == ['hello.xml']
+    Builder(str(source), output, ['html'], deterministic=True).build(force=True)
+    assert read(os.path.join(output, 'hello.html')) == first
+
+
+def test_source_date_epoch_change_rebuilds(tmp_path, monkeypatch):
+    source = tmp_path / 'src'
+    write(str(source / 'hello.xml'), workspace(SPEAK))
+    output = str(tmp_path / 'out')
+
+    monkeypatch.setenv('SOURCE_DATE_EPOCH', '1577836800')
+    Builder(str(source), output, ['html'], deterministic=True).build()
+    monkeypatch.setenv('SOURCE_DATE_EPOCH', '1609459200')
+    summary = Builder(str(source), output, ['html'], deterministic=True).build()
+    assert summary['built'] == ['hello.xml']
+    assert b'2021-01-01T00:00:00+00:00' in read(os.path.join(output, 'hello.html'))
+
+    with open(os.path.join(output, MANIFEST_NAME), encoding='utf-8') as f:
+        entry = json.load(f)['entries']['hello.xml']
+    assert entry['inputs']['created_at'] == '2021-01-01T00:00:00+00:00'
+
+
+def test_unsupported_blocks_fail_the_build(tmp_path):
+    source = tmp_path / 'src'
+    write(str(source / 'branch.xml'), workspace(
+        f'<block type="controls_if" id="if"><statement name="DO0">{SPEAK}</statement></block>'
+    ))
+    output = str(tmp_path / 'out')
+
+    result = CliRunner().invoke(main, ['build', str(source), '-o', output])
+    assert result.exit_code == 1
+    assert 'Unsupported blocks: controls_if' in result.output
+    assert not os.path.exists(os.path.join(output, 'branch.html'))
+
+    result = CliRunner().invoke(main, ['build', str(source), '-o', output, '--allow-unsupported'])
+    assert result.exit_code == 0
+    assert os.path.exists(os.path.join(output, 'branch.html'))
@@ -0,0 +1,32 @@
+from creations_builder.blocks.bundle import PAGE_BLOCK_TYPES, build_block_bundle
+from creations_builder.blocks.registry import BlockRegistry
+
+CUSTOM_BLOCK = {
+    'type': 'flash_screen',
+    'message0': 'flash the screen',
+    'previousStatement': None,
+    'nextStatement': None,
+    'colour': 30,
+    'code_generator': "function(block) {\n    return 'flash();\\n';\n}",
+}
+
+
+def test_bundle_leaves_out_blocks_the_page_defines():
+    registry = BlockRegistry()
+    bundle = build_block_bundle(registry)
+    for block_type in PAGE_BLOCK_TYPES:
+        assert block_type in registry
+        assert f'"{block_type}"' not in bundle.content
+    # The manifest still lists them for the toolbox
+    listed = {block_type for types in bundle.categories.values() for block_type in types}
+    assert PAGE_BLOCK_TYPES <= listed
+
+
+def test_bundle_includes_registry_only_blocks():
+    registry = BlockRegistry()
+    before = build_block_bundle(registry)
+    registry.register_block('actions', 'flash_screen', CUSTOM_BLOCK)
+    bundle = build_block_bundle(registry)
+    assert bundle.digest != before.digest
+    assert '"flash_screen":function(block)' in bundle.content
+    assert '"type":"flash_screen"' in bundle.content
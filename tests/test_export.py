@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+from creations_builder.assets import DEFAULT_ASSET_ROOT
+
+SPEAK = '<block type="speak_text" id="s"><field name="TEXT">hello</field></block>'
+WORKSPACE = f'<xml xmlns="https://developers.google.com/blockly/xml">{SPEAK}</xml>'
+
+
+@pytest.mark.parametrize('budgets', [
+    'tight',
+    [1, 2],
+    {'unknown_budget': 1},
+    {'output_bytes': -1},
+    {'output_bytes': '100'},
+    {'listeners': True},
+    {'listeners': float('nan')},
+])
+def test_invalid_budgets_are_rejected(client, budgets):
+    for endpoint in ('/api/export/analyze', '/api/export/html'):
+        response = client.post(endpoint, json={
+            'workspace_xml': WORKSPACE, 'analyze': True, 'budgets': budgets,
+        })
+        assert response.status_code == 400, endpoint
+        assert response.get_json()['success'] is False
+
+
+def test_budget_overrides_apply(client):
+    response = client.post('/api/export/analyze', json={
+        'workspace_xml': WORKSPACE,
+        'budgets': {'output_bytes': 0, 'listeners': None},
+    })
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['analysis']['budgets']['listeners'] is None
+    assert [item['metric'] for item in body['analysis']['violations']] == ['output_bytes']
+
+
+def test_optimized_html_export_is_self_contained(client, app):
+    app.config['EXPORT_OPTIMIZE_ASSETS'] = True
+    assert os.path.getsize(os.path.join(DEFAULT_ASSET_ROOT, 'r1.png')) > app.config['ASSET_INLINE_LIMIT']
+
+    response = client.post('/api/export/html', json={
+        'workspace_xml': WORKSPACE,
+        'generated_code': 'document.body.innerHTML = \'<img src="/static/r1.png">\';',
+    })
+    assert response.status_code == 200
+    body = response.get_json()
+    html = body['html_content']
+    assert 'assets/' not in html
+    assert '/static/r1.png' not in html
+    assert 'data:image/png;base64,' in html
+    assert 'assets' not in body
+    assert body['asset_report']['files'] == 0
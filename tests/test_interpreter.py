@@ -0,0 +1,44 @@
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from creations_builder.blocks.interpreter import SimulationError, run_scenario
+from creations_builder.cli import main
+
+WORKSPACE = ('<xml xmlns="https://developers.google.com/blockly/xml">'
+             '<block type="voice_command" id="v"><field name="COMMAND">hello</field>'
+             '<next><block type="speak_text" id="s"><field name="TEXT">hi</field></block></next>'
+             '</block></xml>')
+
+
+def test_valid_scenario_runs():
+    sim = run_scenario(WORKSPACE, [{'voice': 'hello'}, {'advance': 1000},
+                                   {'accelerometer': {'x': 0.5}}])
+    assert sim.speech
+
+
+@pytest.mark.parametrize('step, message', [
+    ({'advance': 'soon'}, 'Step 2: advance must be a finite number'),
+    ({'advance': -5}, 'Step 2: advance must not be negative'),
+    ({'accelerometer': {'x': 'up'}}, 'Step 2: accelerometer.x must be a finite number'),
+    ({'accelerometer': {'w': 1}}, 'Step 2: accelerometer has unknown axes: w'),
+    ({'accelerometer': [1, 2, 3]}, 'Step 2: accelerometer must be an object'),
+    ({'voice': None}, 'Step 2: voice must be a string'),
+    ({}, 'Step 2 must be a single-key object'),
+])
+def test_malformed_steps_name_the_step(step, message):
+    with pytest.raises(SimulationError, match=message):
+        run_scenario(WORKSPACE, [{'voice': 'hello'}, step])
+
+
+def test_simulate_reports_malformed_steps_without_traceback(tmp_path):
+    workspace = tmp_path / 'w.xml'
+    workspace.write_text(WORKSPACE)
+    scenario = tmp_path / 's.json'
+    scenario.write_text(json.dumps([{'advance': {'ms': 5}}]))
+
+    result = CliRunner().invoke(main, ['simulate', str(workspace), str(scenario)])
+    assert result.exit_code == 1
+    assert 'Step 1: advance must be a finite number' in result.output
+    assert not isinstance(result.exception, (TypeError, ValueError, KeyError))
@@ -0,0 +1,45 @@
+import time
+
+from creations_builder import jobs
+
+SPEAK = '<block type="speak_text" id="s"><field name="TEXT">hello</field></block>'
+WORKSPACE = f'<xml xmlns="https://developers.google.com/blockly/xml">{SPEAK}</xml>'
+
+
+def wait_for_job(client, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f'/api/export/jobs/{job_id}').get_json()['job']
+        if job['status'] in jobs.FINISHED_STATUSES:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f'job {job_id} did not finish')
+
+
+def test_jobs_expire_on_a_live_queue(app, client, monkeypatch):
+    response = client.post('/api/export/jobs', json={'creations': [{'name': 'Hello', 'workspace_xml': WORKSPACE}]})
+    assert response.status_code == 202
+    job_id = response.get_json()['job']['id']
+    job = wait_for_job(client, job_id)
+    assert job['status'] == jobs.SUCCEEDED
+    artifact_url = job['artifacts'][0]['url']
+    assert client.get(artifact_url).status_code == 200
+
+    queue = app.export_jobs
+    later = time.time() + queue.retention + 1
+    monkeypatch.setattr(jobs.time, 'time', lambda: later)
+
+    # Expired jobs are missing before the next purge runs
+    assert client.get(f'/api/export/jobs/{job_id}').status_code == 404
+    assert client.get(artifact_url).status_code == 404
+    assert client.post(f'/api/export/jobs/{job_id}/cancel').status_code == 404
+
+    # The next job a worker runs purges them, without the store being reopened
+    response = client.post('/api/export/jobs', json={'creations': [{'name': 'Next', 'workspace_xml': WORKSPACE}]})
+    wait_for_job(client, response.get_json()['job']['id'])
+    deadline = time.monotonic() + 10
+    while queue.store._last_purge != later and time.monotonic() < deadline:
+        time.sleep(0.02)
+    db = queue.store._connect()
+    assert db.execute('SELECT COUNT(*) FROM jobs WHERE id = ?', (job_id,)).fetchone()[0] == 0
+    assert db.execute('SELECT COUNT(*) FROM artifacts WHERE job_id = ?', (job_id,)).fetchone()[0] == 0
@@ -0,0 +1,41 @@
+import json
+
+from creations_builder.api.preview import PreviewSession, diff_text
+
+
+def apply_patch(html, start, end, text):
+    """Apply a patch like the editor does, with UTF-16 String.slice offsets."""
+    units = html.encode('utf-16-le')
+    return (units[:start * 2] + text.encode('utf-16-le') + units[end * 2:]).decode('utf-16-le')
+
+
+def read_event(stream):
+    event = next(stream)
+    while event.startswith((':', 'retry:')):
+        event = next(stream)
+    name, data = event.strip().split('\n', 1)
+    return name[len('event: '):], json.loads(data[len('data: '):])
+
+
+def test_diff_offsets_count_utf16_units():
+    old = 'name 🎉 one 𝄞 end'
+    new = 'name 🎉 two 𝄞 end'
+    start, end, text = diff_text(old, new)
+    assert apply_patch(old, start, end, text) == new
+
+
+def test_live_patch_applies_after_emoji_name(app):
+    with app.app_context():
+        session = PreviewSession('test')
+        session.update('Party 🎉 Time', 'console.log("one");')
+        stream = session.stream()
+        name, data = read_event(stream)
+        assert name == 'html'
+        html = data['html']
+
+        session.update('Party 🎉 Time', 'console.log("two 🚀");')
+        name, data = read_event(stream)
+        assert name == 'patch'
+        assert data['base'] == 1
+        assert apply_patch(html, data['start'], data['end'], data['text']) == session.html
+        session.close()
@@ -0,0 +1,17 @@
+import pytest
+
+from creations_builder.profiling import PROFILE_HEADER
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('secret-token', True),
+    ('secret-tokex', False),
+    ('secret', False),
+    ('sécret-token', False),
+    (None, False),
+])
+def test_profile_header_must_match_the_token(app, header, expected):
+    app.profiler.header_token = 'secret-token'
+    headers = {PROFILE_HEADER: header} if header is not None else {}
+    with app.test_request_context('/api/export/xml', method='POST', headers=headers):
+        assert app.profiler.wants_profile() is expected
@@ -0,0 +1,46 @@
+from creations_builder.blocks.registry import DICT_CACHE_SIZE, BlockRegistry
+
+
+def first_block(registry):
+    category = registry.get_categories()[0]
+    return category, registry.get_category_types(category)[0]
+
+
+def test_get_block_reuses_dict_forms_until_the_block_changes():
+    registry = BlockRegistry()
+    category, block_type = first_block(registry)
+
+    block = registry.get_block(category, block_type)
+    assert registry.get_block(category, block_type) is block
+    assert registry.get_blocks_by_category(category)[block_type] == block
+    assert registry.get_all_blocks()[category][block_type] == block
+
+    changed = dict(block, colour=42)
+    registry.register_block(category, block_type, changed)
+    assert registry.get_block(category, block_type)['colour'] == 42
+    assert registry.get_all_blocks()[category][block_type]['colour'] == 42
+
+
+def test_dict_forms_are_not_retained_beyond_the_cache_size():
+    registry = BlockRegistry()
+    template = registry.get_block(*first_block(registry))
+    for index in range(DICT_CACHE_SIZE * 2):
+        registry.register_block('extra', f'extra_{index}', dict(template, type=f'extra_{index}'))
+
+    registry.get_all_blocks()
+    assert len(registry._dicts) == 1
+    for index in range(DICT_CACHE_SIZE * 2):
+        assert registry.get_block('extra', f'extra_{index}')['type'] == f'extra_{index}'
+    assert len(registry._dicts) == DICT_CACHE_SIZE
+    assert registry.get_block('other', 'extra_0') == {}
+
+
+def test_moving_a_block_invalidates_its_old_category():
+    registry = BlockRegistry()
+    category, block_type = first_block(registry)
+    definition = registry.get_block(category, block_type)
+
+    registry.register_block('moved', block_type, definition)
+    assert registry.get_block(category, block_type) == {}
+    assert block_type not in registry.get_blocks_by_category(category)
+    assert registry.get_block('moved', block_type)['type'] == block_type
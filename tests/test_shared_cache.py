@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+from creations_builder.shared_cache import SharedCache
+
+
+def test_no_connection_until_first_use(tmp_path):
+    path = tmp_path / 'cache' / 'shared.sqlite3'
+    cache = SharedCache(str(path))
+    assert not path.exists()
+    assert getattr(cache._local, 'db', None) is None
+
+    cache.put('key', b'value')
+    assert cache.get('key') == b'value'
+    assert path.exists()
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork')
+def test_forked_worker_opens_its_own_connection(tmp_path):
+    cache = SharedCache(str(tmp_path / 'shared.sqlite3'))
+    cache.put('parent', b'1')
+    parent_db = cache._connect()
+
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            if cache._connect() is not parent_db and cache.get('parent') == b'1':
+                cache.put('child', b'2')
+                status = 0
+        finally:
+            os._exit(status)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert cache._connect() is parent_db
+    assert cache.get('child') == b'2'
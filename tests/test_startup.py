@@ -0,0 +1,44 @@
+"""
+Import-time regression test for the CLI.
+
+``benchmarks/bench_startup.py`` covers more scenarios in detail; set
+``STARTUP_BUDGET_SCALE`` to loosen the budget on slow machines.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+CLI_BUDGET_MS = 60 * float(os.environ.get('STARTUP_BUDGET_SCALE', 1.0))
+RUNS = 5
+
+PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+import creations_builder.cli
+elapsed = time.perf_counter() - started
+print(json.dumps({"ms": elapsed * 1000, "modules": sorted(sys.modules)}))
+'''
+
+
+def import_cli():
+    """Import the CLI in a fresh interpreter; returns the time and loaded modules."""
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_cli_import_is_fast_and_does_not_load_flask():
+    results = [import_cli() for _ in range(RUNS)]
+
+    modules = set(results[0]['modules'])
+    assert 'flask' not in modules
+    assert 'creations_builder.app' not in modules
+
+    median = statistics.median(result['ms'] for result in results)
+    assert median <= CLI_BUDGET_MS, f'CLI import took {median:.1f} ms, budget {CLI_BUDGET_MS:.0f} ms'
@@ -0,0 +1,94 @@
+import pytest
+
+from creations_builder.blocks.compiler import StackCompiler
+from creations_builder.blocks.workspace import (
+    MAX_NESTING, WorkspaceParseError, count_blocks, parse_workspace,
+)
+
+DEPTH = 5000
+# The json module itself nests two levels per chained block
+JSON_DEPTH = 400
+
+
+def chained_xml(depth):
+    xml = ''
+    for index in reversed(range(depth)):
+        next_xml = f'<next>{xml}</next>' if xml else ''
+        xml = (f'<block type="speak_text" id="b{index}">'
+               f'<field name="TEXT">line {index}</field>{next_xml}</block>')
+    return f'<xml xmlns="https://developers.google.com/blockly/xml">{xml}</xml>'
+
+
+def chained_json(depth):
+    # Built as text, since json.dumps would recurse as deeply as the parser
+    state = ''
+    for index in reversed(range(depth)):
+        next_json = f', "next": {{"block": {state}}}' if state else ''
+        state = (f'{{"type": "speak_text", "id": "b{index}", '
+                 f'"fields": {{"TEXT": "line {index}"}}{next_json}}}')
+    return f'{{"blocks": {{"languageVersion": 0, "blocks": [{state}]}}}}'
+
+
+def test_deep_xml_chain_parses_and_compiles():
+    text = chained_xml(DEPTH)
+    stacks = parse_workspace(text)
+    assert len(stacks) == 1
+    assert count_blocks(stacks) == DEPTH
+    assert [block.id for block in stacks[0].chain()][-1] == f'b{DEPTH - 1}'
+
+    code = StackCompiler().compile(text)['code']
+    assert f'line {DEPTH - 1}' in code
+
+
+def test_deep_json_chain_parses_and_compiles():
+    text = chained_json(JSON_DEPTH)
+    stacks = parse_workspace(text)
+    assert count_blocks(stacks) == JSON_DEPTH
+    assert stacks[0].canonical() == parse_workspace(chained_xml(JSON_DEPTH))[0].canonical()
+    assert f'line {JSON_DEPTH - 1}' in StackCompiler().compile(text)['code']
+
+
+def test_json_nested_beyond_decoder_limit_is_a_parse_error():
+    with pytest.raises(WorkspaceParseError):
+        parse_workspace(chained_json(DEPTH))
+
+
+def test_deep_chain_export_endpoint(client):
+    response = client.post('/api/compile', json={'workspace_xml': chained_xml(DEPTH)})
+    assert response.status_code == 200
+    assert response.get_json()['success']
+
+
+def nested_xml(depth):
+    xml = ''
+    for index in reversed(range(depth)):
+        inner = f'<statement name="DO">{xml}</statement>' if xml else ''
+        xml = f'<block type="speak_text" id="n{index}">{inner}</block>'
+    return f'<xml xmlns="https://developers.google.com/blockly/xml">{xml}</xml>'
+
+
+def test_nesting_up_to_the_limit_parses():
+    stacks = parse_workspace(nested_xml(MAX_NESTING + 1))
+    assert count_blocks(stacks) == MAX_NESTING + 1
+    assert stacks[0].canonical()
+
+
+@pytest.mark.parametrize('text', [
+    nested_xml(MAX_NESTING + 2),
+    nested_xml(400),
+    '{"blocks": ["a"]}',
+    '{"blocks": []}',
+    '{"blocks": {"blocks": "a"}}',
+    '{"blocks": {"blocks": [{"type": "speak_text", "fields": []}]}}',
+    '{"blocks": {"blocks": [{"type": "speak_text", "inputs": {"DO": 1}}]}}',
+    '{"blocks": {"blocks": [{"type": "speak_text", "next": []}]}}',
+    '{"blocks": {"blocks": [{"type": 1}]}}',
+    '{"blocks": {"blocks": [{"type": "speak_text", "x": "abc"}]}}',
+    '["a"]',
+    '<xml><block type="speak_text" x="abc"></block></xml>',
+])
+def test_malformed_workspace_is_a_parse_error(client, text):
+    with pytest.raises(WorkspaceParseError):
+        parse_workspace(text)
+    response = client.post('/api/compile', json={'workspace_xml': text})
+    assert response.status_code == 400